@@ -0,0 +1,309 @@
+"""
+[Admission Control]
+Backpressure for LLM-bound work.
+
+- TokenBucket: request rate limit per upstream (Gemini, Voyage, MCP layout calls).
+  Callers reserve a token and sleep until it is due, so bursts are smoothed
+  instead of turning into rate-limit storms.
+- AdmissionController: bounds the number of pages in flight across all requests.
+  Requests wait in a bounded queue for at most max_wait seconds; beyond that
+  they fail fast with Overloaded, which the API turns into 429 + Retry-After.
+- CircuitBreaker: stops calling an upstream after consecutive failures and lets
+  a single probe call through once reset_timeout has passed.
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
+
+class Overloaded(Exception):
+    """Capacity exhausted; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter (rate tokens/sec, up to `burst` stored).
+
+    Reservation happens under a thread lock and the wait happens outside it,
+    so the bucket can be shared by several event loops / threads.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float):
+        """
+        Args:
+            rate: sustained requests per second (<= 0 disables limiting)
+            burst: requests allowed back to back when the bucket is full
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "delayed": 0, "rejected": 0, "wait_time_total": 0.0, "wait_time_max": 0.0}
+
+    def _reserve(self, tokens: float, max_wait: Optional[float]) -> float:
+        """Take tokens (possibly going into debt) and return how long to wait for them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (tokens - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                self.stats["rejected"] += 1
+                raise Overloaded(f"{self.name} rate limit: {wait:.1f}s wait exceeds {max_wait:.1f}s", retry_after=wait)
+            self.tokens -= tokens
+            self.stats["acquired"] += 1
+            if wait > 0:
+                self.stats["delayed"] += 1
+                self.stats["wait_time_total"] += wait
+                self.stats["wait_time_max"] = max(self.stats["wait_time_max"], wait)
+            return wait
+
+    async def acquire(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> float:
+        """Wait until `tokens` are available. Raises Overloaded if that would exceed max_wait."""
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve(tokens, max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update(rate=self.rate, burst=self.capacity, tokens=round(self.tokens, 2))
+        return stats
+
+
+class CircuitOpen(Overloaded):
+    """The upstream's circuit is open; calls fail fast until it is probed again."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls pass; `failure_threshold` failures in a row open the circuit.
+    open: calls raise CircuitOpen until `reset_timeout` seconds have passed.
+    half_open: one probe call passes; success closes the circuit, failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CircuitBreaker.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return CircuitBreaker.HALF_OPEN
+        return CircuitBreaker.OPEN
+
+    def _before_call(self):
+        with self._lock:
+            state = self.state
+            if state == CircuitBreaker.CLOSED:
+                return
+            if state == CircuitBreaker.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.stats["rejected"] += 1
+            remaining = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            raise CircuitOpen(f"{self.name} circuit is {state}", retry_after=remaining or 1.0)
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.stats["opened"] += 1
+                    print(f"⛔ [Circuit] {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    @contextmanager
+    def guard(self):
+        """Wrap one upstream call. Raises CircuitOpen without calling when the circuit is open."""
+        self._before_call()
+        try:
+            yield
+        except Overloaded:
+            # Local capacity ran out before the call: not an upstream failure
+            with self._lock:
+                self._probing = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled: says nothing about the upstream, just free the probe slot
+            with self._lock:
+                self._probing = False
+            raise
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update(state=self.state, consecutive_failures=self.failures)
+        return stats
+
+
+class AdmissionController:
+    """Global bound on pages in flight, with a bounded, time-limited wait queue."""
+
+    def __init__(self, max_inflight_pages: int = 8, max_queue: int = 16, max_wait: float = 10.0):
+        """
+        Args:
+            max_inflight_pages: pages rendering at once across all requests
+            max_queue: requests allowed to wait for capacity (beyond this: reject immediately)
+            max_wait: seconds a request may wait before it is rejected
+        """
+        self.max_inflight_pages = max_inflight_pages
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition: Optional[asyncio.Condition] = None
+        # Moving average of how long admitted work holds its slots (for Retry-After)
+        self._hold_avg = max_wait
+        self.stats = {"admitted": 0, "rejected": 0, "queued": 0, "queue_time_total": 0.0, "queue_time_max": 0.0}
+
+    @asynccontextmanager
+    async def admit(self, pages: int = 1, max_wait: Any = "default", bounded: bool = True):
+        """
+        Hold `pages` in-flight slots for the duration of the block.
+
+        Args:
+            max_wait: seconds to wait for capacity (None = no limit, "default" = self.max_wait)
+            bounded: count against max_queue (set False for callers that are queued elsewhere)
+        Raises:
+            Overloaded: queue full or no capacity within max_wait
+        """
+        if max_wait == "default":
+            max_wait = self.max_wait
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        pages = max(1, min(pages, self.max_inflight_pages))
+
+        start = time.monotonic()
+        async with self._condition:
+            if self.waiting > 0 or self.in_flight + pages > self.max_inflight_pages:
+                if bounded and self.waiting >= self.max_queue:
+                    self.stats["rejected"] += 1
+                    raise Overloaded(f"Admission queue full ({self.waiting} waiting)", retry_after=self._hold_avg)
+                self.waiting += 1
+                self.stats["queued"] += 1
+                try:
+                    await asyncio.wait_for(
+                        self._condition.wait_for(lambda: self.in_flight + pages <= self.max_inflight_pages),
+                        timeout=max_wait
+                    )
+                except asyncio.TimeoutError:
+                    self.stats["rejected"] += 1
+                    raise Overloaded(f"No capacity within {max_wait:g}s", retry_after=self._hold_avg)
+                finally:
+                    self.waiting -= 1
+            self.in_flight += pages
+
+        queue_time = time.monotonic() - start
+        self.stats["admitted"] += 1
+        self.stats["queue_time_total"] += queue_time
+        self.stats["queue_time_max"] = max(self.stats["queue_time_max"], queue_time)
+
+        held = time.monotonic()
+        try:
+            yield
+        finally:
+            self._hold_avg = 0.8 * self._hold_avg + 0.2 * (time.monotonic() - held)
+            async with self._condition:
+                self.in_flight -= pages
+                self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        admitted = stats["admitted"]
+        stats.update(
+            in_flight_pages=self.in_flight,
+            max_inflight_pages=self.max_inflight_pages,
+            waiting=self.waiting,
+            queue_time_avg=stats["queue_time_total"] / admitted if admitted else 0.0
+        )
+        return stats
+
+
+# Global instances
+# <UPSTREAM>_RPS: sustained requests/sec, <UPSTREAM>_BURST: back-to-back allowance
+gemini_bucket = TokenBucket("gemini", float(os.getenv("GEMINI_RPS", "5")), float(os.getenv("GEMINI_BURST", "10")))
+voyage_bucket = TokenBucket("voyage", float(os.getenv("VOYAGE_RPS", "10")), float(os.getenv("VOYAGE_BURST", "20")))
+# One MCP layout call fans out into several Gemini Pro calls inside the MCP server
+mcp_bucket = TokenBucket("mcp", float(os.getenv("MCP_RPS", "1")), float(os.getenv("MCP_BURST", "4")))
+
+# CIRCUIT_FAILURES consecutive failures open a circuit for CIRCUIT_RESET seconds
+_circuit_failures = int(os.getenv("CIRCUIT_FAILURES", "5"))
+_circuit_reset = float(os.getenv("CIRCUIT_RESET", "30"))
+gemini_breaker = CircuitBreaker("gemini", _circuit_failures, _circuit_reset)
+voyage_breaker = CircuitBreaker("voyage", _circuit_failures, _circuit_reset)
+mcp_breaker = CircuitBreaker("mcp", _circuit_failures, _circuit_reset)
+
+admission_controller = AdmissionController(
+    max_inflight_pages=int(os.getenv("MAX_INFLIGHT_PAGES", "8")),
+    max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "16")),
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "10"))
+)
+
+
+def share_upstream_limits(workers: int):
+    """
+    Split the upstream rate limits across `workers` processes (called in each forked worker).
+    <UPSTREAM>_RPS / _BURST are per-deployment quotas; page admission stays per worker.
+    """
+    if workers <= 1:
+        return
+    for bucket in (gemini_bucket, voyage_bucket, mcp_bucket):
+        with bucket._lock:
+            bucket.rate /= workers
+            bucket.capacity = max(1.0, bucket.capacity / workers)
+            bucket.tokens = min(bucket.tokens, bucket.capacity)
+
+
+def admission_stats() -> Dict[str, Any]:
+    return {
+        "pages": admission_controller.snapshot(),
+        "upstreams": {bucket.name: bucket.snapshot() for bucket in (gemini_bucket, voyage_bucket, mcp_bucket)},
+        "circuits": {breaker.name: breaker.snapshot() for breaker in (gemini_breaker, voyage_breaker, mcp_breaker)}
+    }
+
+
+def circuit_states() -> Dict[str, str]:
+    return {breaker.name: breaker.state for breaker in (gemini_breaker, voyage_breaker, mcp_breaker)}
@@ -0,0 +1,120 @@
+"""
+[Asset Cache]
+In-memory cache for static pages and canned HTML.
+
+Each file is read once and kept with precomputed gzip (and brotli, when the
+optional `brotli` package is installed) variants and ETags. Responses negotiate
+Content-Encoding from Accept-Encoding and answer conditional GETs with 304.
+Entries are reloaded when the file's mtime or size changes.
+"""
+
+import os
+import gzip
+import hashlib
+import threading
+from typing import Dict, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Asset:
+    def __init__(self, path: str, data: bytes, stat: os.stat_result, media_type: str):
+        self.path = path
+        self.media_type = media_type
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        # encoding -> (body, etag); each variant needs its own strong ETag
+        self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (data, f'"{digest}"')}
+        gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(gzipped) < len(data):
+            self.variants["gzip"] = (gzipped, f'"{digest}-gz"')
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=11)
+            if len(compressed) < len(data):
+                self.variants["br"] = (compressed, f'"{digest}-br"')
+
+    @property
+    def text(self) -> str:
+        return self.variants["identity"][0].decode("utf-8")
+
+    @property
+    def etags(self):
+        return {etag for _, etag in self.variants.values()}
+
+
+class AssetCache:
+    """Loads files once, precompresses them and serves them with ETag / 304 support."""
+
+    CACHE_CONTROL = "no-cache"  # always revalidate; a 304 costs no body
+
+    def __init__(self):
+        self._assets: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def get(self, path: str, media_type: str = "text/html; charset=utf-8") -> Asset:
+        """Cached asset for path, reloaded if the file changed on disk. Raises OSError if missing."""
+        stat = os.stat(path)
+        asset = self._assets.get(path)
+        if asset is not None and asset.signature == (stat.st_mtime_ns, stat.st_size):
+            self.stats["hits"] += 1
+            return asset
+
+        with self._lock:
+            asset = self._assets.get(path)
+            if asset is None or asset.signature != (stat.st_mtime_ns, stat.st_size):
+                with open(path, "rb") as f:
+                    data = f.read()
+                asset = Asset(path, data, stat, media_type)
+                self._assets[path] = asset
+                self.stats["misses"] += 1
+                sizes = ", ".join(f"{enc} {len(body) / 1024:.1f}KB" for enc, (body, _) in asset.variants.items())
+                print(f"📦 [Assets] Loaded {path} ({sizes})")
+        return asset
+
+    def text(self, path: str) -> str:
+        return self.get(path).text
+
+    def response(self, path: str, request: Request, media_type: str = "text/html; charset=utf-8") -> Response:
+        """Serve a cached file, choosing the smallest encoding the client accepts."""
+        asset = self.get(path, media_type)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or tags & asset.etags:
+                etag = next(iter(tags & asset.etags), asset.variants["identity"][1])
+                self.stats["not_modified"] += 1
+                return Response(status_code=304, headers=self._headers(etag))
+
+        encoding = self._negotiate(request.headers.get("accept-encoding", ""), asset)
+        body, etag = asset.variants[encoding]
+        headers = self._headers(etag)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=asset.media_type, headers=headers)
+
+    def _negotiate(self, accept_encoding: str, asset: Asset) -> str:
+        accepted = set()
+        for part in accept_encoding.split(","):
+            name, _, params = part.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(name.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in asset.variants and (encoding in accepted or "*" in accepted):
+                return encoding
+        return "identity"
+
+    def _headers(self, etag: str) -> Dict[str, str]:
+        return {"ETag": etag, "Cache-Control": self.CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+
+# Global instance
+asset_cache = AssetCache()
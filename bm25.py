@@ -0,0 +1,85 @@
+"""
+[Lexical Index]
+In-process Okapi BM25 over the layout texts, fused with dense search in rag_voyage.
+
+Kept free of the vector-store and API client dependencies so it can be built and
+tested on its own (numpy only).
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class BM25Index:
+    """
+    In-process Okapi BM25 index over the layout texts.
+    
+    Restores the lexical channel the BGE-M3 sparse vectors used to provide, so exact
+    terms (brand names, OCR'd headlines) rank well. Per-(term, doc) BM25 weights are
+    precomputed into flat posting arrays; scoring a query is a single np.bincount.
+    """
+    TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.num_docs = len(texts)
+        self.vocab: Dict[str, int] = {}
+        
+        postings = defaultdict(list)  # term_id -> [(doc_idx, tf), ...]
+        doc_len = np.zeros(self.num_docs, dtype=np.float32)
+        for doc_idx, text in enumerate(texts):
+            tokens = self.tokenize(text)
+            doc_len[doc_idx] = len(tokens)
+            counts = defaultdict(int)
+            for token in tokens:
+                counts[token] += 1
+            for token, tf in counts.items():
+                term_id = self.vocab.setdefault(token, len(self.vocab))
+                postings[term_id].append((doc_idx, tf))
+        
+        # Flatten postings (CSR layout): term t lives in [offsets[t], offsets[t+1])
+        self._offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        doc_idx_parts, tf_parts = [], []
+        for term_id in range(len(self.vocab)):
+            entries = postings[term_id]
+            self._offsets[term_id + 1] = self._offsets[term_id] + len(entries)
+            doc_idx_parts.append(np.fromiter((d for d, _ in entries), dtype=np.int32, count=len(entries)))
+            tf_parts.append(np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries)))
+        self._doc_idx = np.concatenate(doc_idx_parts) if doc_idx_parts else np.zeros(0, dtype=np.int32)
+        tf = np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.float32)
+        
+        # Precompute BM25 weights
+        df = np.diff(self._offsets).astype(np.float32)
+        idf = np.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+        avgdl = doc_len.mean() if self.num_docs else 1.0
+        term_of_posting = np.repeat(np.arange(len(self.vocab)), np.diff(self._offsets))
+        norm = k1 * (1 - b + b * doc_len[self._doc_idx] / max(avgdl, 1e-6))
+        self._weights = (idf[term_of_posting] * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        return cls.TOKEN_PATTERN.findall(text.lower())
+
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every document for the query."""
+        term_ids = {self.vocab[t] for t in self.tokenize(query) if t in self.vocab}
+        if not term_ids:
+            return np.zeros(self.num_docs, dtype=np.float32)
+        
+        slices = [slice(self._offsets[t], self._offsets[t + 1]) for t in term_ids]
+        doc_idx = np.concatenate([self._doc_idx[sl] for sl in slices])
+        weights = np.concatenate([self._weights[sl] for sl in slices])
+        return np.bincount(doc_idx, weights=weights, minlength=self.num_docs).astype(np.float32)
+
+    def top_n(self, query: str, n: int, mask: Optional[np.ndarray] = None) -> List[int]:
+        """Indices of the n best-scoring documents (only those allowed by mask, with score > 0)."""
+        scores = self.score(query)
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+        n = min(n, int(np.count_nonzero(scores)))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        return top[np.argsort(-scores[top])].tolist()
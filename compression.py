@@ -0,0 +1,176 @@
+"""
+[Compression Middleware]
+gzip for large rendered-HTML / JSON responses on selected routes.
+
+- Only responses at or above `minimum_size` with a compressible content type
+  and no existing Content-Encoding are compressed.
+- Whole responses are compressed in a worker thread so a multi-MB body doesn't
+  block the event loop; streamed responses are compressed chunk by chunk
+  (sync-flushed, so the client still receives each chunk as it is produced).
+- Each compressed response reports its ratio in the X-Compression-Ratio header
+  (one-shot responses) and in the log.
+"""
+
+import os
+import time
+import zlib
+import asyncio
+from typing import Iterable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+# Chunks smaller than this are compressed inline; larger ones in a worker thread
+THREAD_THRESHOLD = 64 * 1024
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: Iterable[str] = ("/",),
+        minimum_size: int = 1024,
+        level: int = 6
+    ):
+        """
+        Args:
+            paths: path prefixes to compress (e.g. "/analyze", "/jobs")
+            minimum_size: smaller responses are sent as-is
+            level: zlib level 1 (fast) - 9 (small)
+        """
+        self.app = app
+        self.paths = tuple(paths)
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        if "gzip" not in Headers(scope=scope).get("accept-encoding", "").lower():
+            await self.app(scope, receive, send)
+            return
+
+        responder = _GzipResponder(self, scope["path"], send)
+        await self.app(scope, receive, responder)
+
+
+class _GzipResponder:
+    def __init__(self, middleware: CompressionMiddleware, path: str, send: Send):
+        self.middleware = middleware
+        self.path = path
+        self.send = send
+        self.start_message: Message = None
+        self.active = None  # None = undecided, True = compressing, False = passthrough
+        self.streaming = False
+        self.compressor = None
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.started = 0.0
+
+    async def __call__(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Hold the headers until the first body chunk tells us the size
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.active is None:
+            self.active = self._should_compress(body, more_body)
+            if not self.active:
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.started = time.perf_counter()
+            if more_body:
+                await self._start_stream()
+            else:
+                await self._send_whole(body)
+                return
+        elif not self.active:
+            await self.send(message)
+            return
+
+        await self._send_chunk(body, more_body)
+
+    def _should_compress(self, body: bytes, more_body: bool) -> bool:
+        headers = Headers(raw=self.start_message["headers"])
+        if "content-encoding" in headers:
+            return False  # already encoded (e.g. precompressed assets)
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        if more_body:
+            # Streaming: trust Content-Length if present, otherwise compress
+            length = headers.get("content-length")
+            return length is None or int(length) >= self.middleware.minimum_size
+        return len(body) >= self.middleware.minimum_size
+
+    async def _send_whole(self, body: bytes):
+        level = self.middleware.level
+        if len(body) >= THREAD_THRESHOLD:
+            compressed = await asyncio.to_thread(_gzip, body, level)
+        else:
+            compressed = _gzip(body, level)
+
+        ratio = len(body) / len(compressed) if compressed else 1.0
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(len(compressed))
+        headers["X-Compression-Ratio"] = f"{ratio:.2f}"
+        headers.add_vary_header("Accept-Encoding")
+
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed})
+        self._report(len(body), len(compressed))
+
+    async def _start_stream(self):
+        self.streaming = True
+        self.compressor = zlib.compressobj(self.middleware.level, zlib.DEFLATED, 31)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = "gzip"
+        del headers["Content-Length"]
+        headers.add_vary_header("Accept-Encoding")
+        await self.send(self.start_message)
+
+    async def _send_chunk(self, body: bytes, more_body: bool):
+        self.raw_bytes += len(body)
+        if len(body) >= THREAD_THRESHOLD:
+            chunk = await asyncio.to_thread(self._compress_chunk, body, more_body)
+        else:
+            chunk = self._compress_chunk(body, more_body)
+        self.sent_bytes += len(chunk)
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        if not more_body:
+            self._report(self.raw_bytes, self.sent_bytes)
+
+    def _compress_chunk(self, body: bytes, more_body: bool) -> bytes:
+        # Sync flush keeps streamed pages arriving progressively
+        flush_mode = zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH
+        return self.compressor.compress(body) + self.compressor.flush(flush_mode)
+
+    def _report(self, raw: int, compressed: int):
+        ratio = raw / compressed if compressed else 1.0
+        elapsed = (time.perf_counter() - self.started) * 1000
+        mode = "stream" if self.streaming else "whole"
+        print(f"🗜️ [gzip] {self.path}: {raw / 1024:.1f}KB -> {compressed / 1024:.1f}KB "
+              f"({ratio:.1f}x, {mode}, {elapsed:.1f}ms)")
+
+
+def compression_settings() -> dict:
+    """Middleware options from COMPRESS_MIN_SIZE / COMPRESS_LEVEL."""
+    return {
+        "minimum_size": int(os.getenv("COMPRESS_MIN_SIZE", "1024")),
+        "level": int(os.getenv("COMPRESS_LEVEL", "6"))
+    }
@@ -35,10 +35,10 @@ echo ""
 echo "⏳ Waiting for service to be ready..."
 sleep 5
 
-# Health check
+# Readiness check (retriever loaded, MCP session warm)
 for i in {1..10}; do
-    if curl -s http://localhost:8000/ > /dev/null 2>&1; then
-        echo "✅ Service is healthy!"
+    if curl -fs http://localhost:8000/readyz > /dev/null 2>&1; then
+        echo "✅ Service is ready!"
         break
     fi
     if [ $i -eq 10 ]; then
@@ -1,11 +1,47 @@
-import time
-import random
-import asyncio 
-import json
-from concurrent.futures import ThreadPoolExecutor
+import os
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from tool.mcp_client import mcp_client
+from admission import CircuitOpen
+from media_store import media_store
+from image_validator import ImageDeduplicator, ImageSource
 
-def generate_single_article(a_id, article):
+# 동시에 생성하는 기사 수 (MCP 호출은 세션 풀 크기와 mcp_bucket으로도 제한됨)
+PUBLISH_CONCURRENCY = int(os.getenv("PUBLISH_CONCURRENCY", "5"))
+MAX_RETRIES = 3
+
+HTML_HEAD = """<!DOCTYPE html>
+<html class="bg-gray-200">
+<head>
+    <meta charset="UTF-8">
+    <script src="https://cdn.tailwindcss.com"></script>
+    <style>@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:ital,wght@0,400;0,700;1,400&family=Lato:wght@300;400;700&display=swap');</style>
+</head>
+<body class="flex flex-col items-center py-10 space-y-10">
+"""
+HTML_TAIL = """
+</body>
+</html>"""
+
+def _image_url(src, dedup=None):
+    """
+    이미지 src를 미디어 URL로 변환. dedup이 있으면 유사 이미지는 먼저 저장된 URL을 재사용
+    이미지가 아닌 데이터는 저장하지 않고 빈 src를 반환
+    """
+    try:
+        if dedup is None or src.startswith(("http://", "https://", "/")):
+            return media_store.url_for_src(src)
+        try:
+            canonical_id = dedup.canonical_id(ImageSource.from_base64(src))
+        except Exception:
+            return media_store.url_for_src(src)
+        return dedup.memo(canonical_id, lambda: media_store.url_for_src(src))
+    except ValueError as e:
+        print(f"⚠️ [NanoBanana] Image skipped: {e}")
+        return ""
+
+async def agenerate_single_article(a_id, article, dedup=None):
+    """기사 1개의 레이아웃 생성 (현재 이벤트 루프에서 실행 → 상주 MCP 세션 풀을 공유)"""
     print(f"🍌 [NanoBanana] Outsourcing Article {a_id}...")
     
     manuscript = article.get("manuscript", {})
@@ -33,102 +69,115 @@ def generate_single_article(a_id, article):
     plan_json = str(article.get("plan", {}))
     layout_override = article.get("layout_override", "None")
 
-    max_retries = 3
-    for attempt in range(max_retries):
+    for attempt in range(MAX_RETRIES):
         try:
             # MCP Call (리스트 전달)
-            html_code = asyncio.run(
-                mcp_client.generate_layout(
-                    headline=headline,
-                    body=body,
-                    image_data=placeholder_list, # 리스트를 넘김
-                    layout_override=layout_override,
-                    vision_json=vision_json,
-                    design_json=design_json,
-                    plan_json=plan_json
-                )
+            html_code = await mcp_client.generate_layout(
+                headline=headline,
+                body=body,
+                image_data=placeholder_list, # 리스트를 넘김
+                layout_override=layout_override,
+                vision_json=vision_json,
+                design_json=design_json,
+                plan_json=plan_json
             )
             
             html_code = html_code.replace("```html", "").replace("```", "")
             
             # [Multi-Image Injection]
-            if isinstance(real_image_src, list):
-                for i, src in enumerate(real_image_src):
-                    target = f"{{{{IMAGE_PLACEHOLDER_{i}}}}}"
-                    if target in html_code:
-                        # Base64 처리 필요 시 여기서 수행
-                        final_src = src if src.startswith("data:") or src.startswith("http") else f"data:image/png;base64,{src}"
-                        html_code = html_code.replace(target, final_src)
-            else:
-                # 단일 이미지
-                target = "{{IMAGE_PLACEHOLDER_0}}"
+            # Base64 / data URI는 미디어 저장소에 올리고 URL로 참조 (디코딩/해시는 스레드에서)
+            sources = real_image_src if isinstance(real_image_src, list) else [real_image_src]
+            for i, src in enumerate(sources):
+                target = f"{{{{IMAGE_PLACEHOLDER_{i}}}}}"
                 if target in html_code:
-                     final_src = real_image_src if real_image_src.startswith("data:") or real_image_src.startswith("http") else f"data:image/png;base64,{real_image_src}"
-                     html_code = html_code.replace(target, final_src)
+                    html_code = html_code.replace(target, await asyncio.to_thread(_image_url, src, dedup))
             
             return html_code
             
+        except CircuitOpen as e:
+            # 회로가 열려 있으면 재시도해도 즉시 실패하므로 중단
+            print(f"⛔ [NanoBanana] {a_id} skipped: {e}")
+            break
         except Exception as e:
             print(f"⚠️ [NanoBanana] Attempt {attempt+1} failed: {e}")
-            time.sleep(1)
+            await asyncio.sleep(1)
             
     return f"<div>Generation Failed: {a_id}</div>"
 
-def run_publisher(state):
-    print("--- [Publisher] Orchestrating Multi-Image Generation ---")
-    
+def generate_single_article(a_id, article, dedup=None):
+    """동기 버전 (자체 이벤트 루프에서 실행)"""
+    return asyncio.run(agenerate_single_article(a_id, article, dedup))
+
+def target_articles(state) -> List[Tuple[str, Dict[str, Any]]]:
+    """생성할 기사 목록 (페이지 순서). 분할된 기사(_partN)는 원본 기사의 디자인 정보를 상속"""
     pages = state.get("pages")
     all_articles = state.get("articles", {})
-    target_articles = {}
     
-    if pages:
-        for page in pages:
-            for art in page['articles']:
-                a_id = art['id']
-                if not art.get("design_spec"):
-                    parent_id = a_id.split("_part")[0]
-                    parent_art = all_articles.get(parent_id)
-                    if parent_art:
-                        art["design_spec"] = parent_art.get("design_spec")
-                        art["vision_analysis"] = parent_art.get("vision_analysis")
-                        art["plan"] = parent_art.get("plan")
-                target_articles[a_id] = art
-    else:
-        target_articles = all_articles
+    if not pages:
+        return list(all_articles.items())
+    
+    targets = []
+    for page in pages:
+        for art in page['articles']:
+            a_id = art['id']
+            if not art.get("design_spec"):
+                parent_id = a_id.split("_part")[0]
+                parent_art = all_articles.get(parent_id)
+                if parent_art:
+                    art["design_spec"] = parent_art.get("design_spec")
+                    art["vision_analysis"] = parent_art.get("vision_analysis")
+                    art["plan"] = parent_art.get("plan")
+            targets.append((a_id, art))
+    return targets
 
-    final_pages = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_id = {
-            executor.submit(generate_single_article, a_id, article): a_id 
-            for a_id, article in target_articles.items()
-        }
-        
-        results_map = {}
-        # Wait for completion
-        for future in future_to_id:
-             pass # just wait or check results below
+def _page_div(index: int, html: str) -> str:
+    return f"    <div class='shadow-2xl bg-white relative w-[210mm] h-[297mm] overflow-hidden' id='page-{index}'>{html}</div>\n"
 
-    for future, a_id in future_to_id.items():
-        try:
-            html = future.result()
-            results_map[a_id] = html
-        except Exception as e:
-            results_map[a_id] = f"Error: {e}"
+async def stream_publication(state, concurrency: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    매거진 HTML을 조각 단위로 생성 (async generator)
+    
+    <html> 셸을 먼저 내보내고, 기사들은 concurrency개까지 동시에 생성하면서
+    page-{i} div를 페이지 순서대로 (앞 페이지가 모두 끝나는 즉시) 내보냅니다.
+    소비자가 중간에 끊으면 남은 생성 작업은 취소됩니다.
+    """
+    print("--- [Publisher] Orchestrating Multi-Image Generation ---")
+    articles = target_articles(state)
+    limit = asyncio.Semaphore(concurrency or PUBLISH_CONCURRENCY)
+    # 여러 기사에 같은 사진이 있으면 한 번만 저장하고 같은 URL을 참조
+    dedup = ImageDeduplicator()
+    
+    async def generate(a_id, article):
+        async with limit:
+            try:
+                return await agenerate_single_article(a_id, article, dedup)
+            except Exception as e:
+                return f"Error: {e}"
+    
+    tasks = [asyncio.create_task(generate(a_id, article)) for a_id, article in articles]
+    try:
+        yield HTML_HEAD
+        for i, task in enumerate(tasks):
+            yield _page_div(i, await task)
+        yield HTML_TAIL
+    finally:
+        for task in tasks:
+            task.cancel()
 
-    sorted_ids = sorted(results_map.keys())
-    for a_id in sorted_ids:
-        final_pages.append(results_map[a_id])
+async def apublish(state, concurrency: Optional[int] = None) -> str:
+    """stream_publication의 조각을 모아 전체 HTML 반환"""
+    return "".join([chunk async for chunk in stream_publication(state, concurrency)])
 
-    full_html = """<!DOCTYPE html>
-<html class="bg-gray-200">
-<head>
-    <meta charset="UTF-8">
-    <script src="https://cdn.tailwindcss.com"></script>
-    <style>@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:ital,wght@0,400;0,700;1,400&family=Lato:wght@300;400;700&display=swap');</style>
-</head>
-<body class="flex flex-col items-center py-10 space-y-10">
-""" + "\n".join([f"    <div class='shadow-2xl bg-white relative w-[210mm] h-[297mm] overflow-hidden' id='page-{i}'>{page}</div>" for i, page in enumerate(final_pages)]) + """
-</body>
-</html>"""
+def run_publisher(state):
+    """동기 진입점: 자체 이벤트 루프에서 apublish 실행 (이 루프에서 시작한 MCP 세션 풀은 끝나면 닫음)"""
+    async def publish():
+        pool = mcp_client.pool
+        owns_pool = pool is not None and pool.loop is None
+        try:
+            return await apublish(state)
+        finally:
+            if owns_pool:
+                await pool.close()
     
-    return {"html_code": full_html, "logs": []}
\ No newline at end of file
+    full_html = asyncio.run(publish())
+    return {"html_code": full_html, "logs": []}
@@ -8,11 +8,481 @@
 3. 이미지 품질 검증
 """
 
-from PIL import Image
+from PIL import Image, features
+import numpy as np
 import io
+import os
+import json
+import time
 import base64
+import asyncio
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Tuple, Optional, Dict, Any, List, Union
 
+from metrics import observe_image
+
+
+# dHash 격자 크기 (DHASH_SIZE x DHASH_SIZE 비트)
+DHASH_SIZE = 8
+
+
+class ImageSource:
+    """
+    한 번만 디코딩되는 입력 이미지 객체
+    
+    Base64 문자열/bytes/UploadFile을 한 번만 디코딩하여 보관하고,
+    슬롯 크기 계산 → 검증 → 맞춤 → 인코딩 전 과정에 같은 객체를 전달합니다.
+    크기/포맷/모드는 헤더만으로 제공되며, 픽셀 디코딩은 `image` 최초 접근 시 1회 수행됩니다.
+    """
+    
+    def __init__(self, data: Optional[bytes] = None, image: Optional[Image.Image] = None):
+        """
+        Args:
+            data: 원본 인코딩 바이트 (PNG/JPEG 등)
+            image: 이미 열린 PIL Image (data가 없을 때)
+        """
+        if data is None and image is None:
+            raise ValueError("data 또는 image 중 하나는 필요합니다")
+        self.data = data
+        # Image.open은 헤더만 읽음 (픽셀은 load() 시점에 디코딩)
+        self._image = image if image is not None else Image.open(io.BytesIO(data))
+        self._decoded = False
+        self._sha256: Optional[str] = None
+        self._dhash: Optional[int] = None
+        self.format = self._image.format
+        self.mode = self._image.mode
+        self.width, self.height = self._image.size
+    
+    @classmethod
+    def from_base64(cls, b64_string: str) -> "ImageSource":
+        """Base64 문자열 또는 data URI에서 생성"""
+        if b64_string.startswith("data:"):
+            b64_string = b64_string.split(",", 1)[1]
+        return cls(data=base64.b64decode(b64_string))
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ImageSource":
+        return cls(data=data)
+    
+    @classmethod
+    async def from_upload(cls, upload, max_bytes: Optional[int] = None) -> "ImageSource":
+        """
+        FastAPI UploadFile 스트림에서 생성 (Base64 왕복 없이 바이트 그대로 사용)
+        
+        Args:
+            max_bytes: 최대 업로드 크기 (초과 시 전체를 읽기 전에 ValueError)
+        """
+        if max_bytes is None:
+            return cls(data=await upload.read())
+        
+        chunks, total = [], 0
+        while True:
+            chunk = await upload.read(1024 * 1024)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > max_bytes:
+                raise ValueError(f"이미지 파일이 너무 큽니다 (최대 {max_bytes // (1024 * 1024)}MB)")
+            chunks.append(chunk)
+        return cls(data=b"".join(chunks))
+    
+    @classmethod
+    def from_any(cls, image: Union["ImageSource", Image.Image, str, bytes]) -> "ImageSource":
+        if isinstance(image, ImageSource):
+            return image
+        if isinstance(image, str):
+            return cls.from_base64(image)
+        if isinstance(image, bytes):
+            return cls.from_bytes(image)
+        return cls(image=image)
+    
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+    
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+    
+    @property
+    def byte_size(self) -> Optional[int]:
+        return len(self.data) if self.data is not None else None
+    
+    @property
+    def sha256(self) -> Optional[str]:
+        """원본 바이트의 SHA-256 (캐시 키). PIL Image로 생성된 경우 None"""
+        if self._sha256 is None and self.data is not None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+    
+    @property
+    def dhash(self) -> int:
+        """
+        64비트 difference hash (재인코딩/리사이즈된 같은 사진은 해밍 거리가 작음)
+        최초 접근 시 한 번 계산하며 중복 제거(ImageDeduplicator.canonical_id)에서만 사용합니다.
+        JPEG는 별도 핸들에서 1/8 축소 디코딩으로 계산하고, 그 외 포맷은 공유 디코딩 결과를 사용합니다.
+        """
+        if self._dhash is None:
+            if self.data is not None and self.format == "JPEG" and not self._decoded:
+                with Image.open(io.BytesIO(self.data)) as img:
+                    img.draft("L", (DHASH_SIZE * 4, DHASH_SIZE * 4))
+                    small = img.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.BILINEAR)
+            else:
+                small = self.image.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.BILINEAR)
+            pixels = np.asarray(small, dtype=np.int16)
+            bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+            self._dhash = int("".join("1" if bit else "0" for bit in bits), 2)
+        return self._dhash
+    
+    def thumbnail(self, max_size: int) -> Image.Image:
+        """
+        분석용 축소 이미지 (RGB). 공유 디코딩 상태를 건드리지 않도록 별도 핸들에서 축소 디코딩합니다.
+        이미 디코딩된 경우에는 디코딩 결과에서 축소합니다.
+        """
+        if self.data is not None and not self._decoded:
+            with Image.open(io.BytesIO(self.data)) as img:
+                img.draft("RGB", (max_size, max_size))
+                thumb = img.convert("RGB")
+        else:
+            thumb = self.image.convert("RGB")
+        thumb.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        return thumb
+    
+    @property
+    def image(self) -> Image.Image:
+        """디코딩된 PIL Image (최초 접근 시 1회 디코딩)"""
+        if not self._decoded:
+            self._image.load()
+            self._decoded = True
+        return self._image
+    
+    def decode(self, draft_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """
+        필요한 크기 근처로 축소 디코딩
+        
+        JPEG는 draft()로 DCT 단계에서 1/2, 1/4, 1/8 스케일로 바로 디코딩합니다.
+        결과 크기는 항상 draft_size 이상이므로 이후 고품질 리샘플링의 화질은 유지됩니다.
+        이미 디코딩된 경우에는 기존 이미지를 그대로 반환합니다.
+        
+        Args:
+            draft_size: 최종 리샘플링 전에 필요한 최소 크기 (width, height)
+        """
+        if draft_size and self.data is not None and self.format == "JPEG" and not self._decoded:
+            self._image.draft(self._image.mode, draft_size)
+        return self.image
+    
+    def release(self):
+        """디코딩된 픽셀 메모리 해제 (원본 바이트는 유지)"""
+        if self.data is not None:
+            self._image.close()
+            self._image = Image.open(io.BytesIO(self.data))
+            self._decoded = False
+    
+    def to_data_uri(self) -> str:
+        """원본 그대로의 data URI (처리 실패 시 폴백용)"""
+        if self.data is None:
+            buffered = io.BytesIO()
+            self._image.save(buffered, format="PNG")
+            return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode()}"
+        mime = Image.MIME.get(self.format, "image/png")
+        return f"data:{mime};base64,{base64.b64encode(self.data).decode()}"
+
+
+class ImageCache:
+    """
+    처리된 이미지 캐시 (메모리 LRU + 선택적 디스크 계층)
+    
+    키는 (원본 SHA-256, 슬롯 너비/높이, fit_mode, 출력 포맷) 조합이며,
+    값은 인코딩된 바이트와 메타데이터(포맷, 크기, 검증 결과 등)입니다.
+    메모리 계층은 바이트 총량 기준으로 제한되고, 디스크 계층은 재시작 후에도 재사용됩니다.
+    디스크 계층도 disk_max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다
+    (사용 순서는 파일 mtime으로 기록하므로 재시작 후에도 유지).
+    min_age를 주면 마지막 계층(디스크, 없으면 메모리)은 최근 min_age초 안에 쓰인 항목을
+    한도를 넘어도 삭제하지 않습니다 (URL로 참조 중인 항목 보호, 한도는 일시적으로 초과 가능).
+    """
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: Optional[int] = None, min_age: float = 0.0):
+        """
+        Args:
+            max_bytes: 메모리 계층 최대 바이트 수
+            disk_dir: 디스크 계층 디렉토리 (None이면 메모리만 사용)
+            disk_max_bytes: 디스크 계층 최대 바이트 수 (None이면 제한 없음)
+            min_age: 마지막 계층에서 삭제하지 않는 최근 사용 기간 (초)
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.min_age = min_age
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        
+        self._entries: "OrderedDict[str, Tuple[bytes, Dict[str, Any]]]" = OrderedDict()
+        self._used: Dict[str, float] = {}  # 메모리 항목 key -> 마지막 사용 시각
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+        
+        # 디스크 항목 key -> 바이트 수 (오래 사용하지 않은 순서), key -> 마지막 사용 시각
+        self._disk_entries: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_used: Dict[str, float] = {}
+        self.disk_bytes = 0
+        if disk_dir and disk_max_bytes is not None:
+            self._scan_disk()
+    
+    @staticmethod
+    def make_key(source_hash: str, width: int, height: int, fit_mode: str, output_format: str, *extra: Any) -> str:
+        raw = "|".join(str(part) for part in (source_hash, width, height, fit_mode, output_format) + extra)
+        return hashlib.sha256(raw.encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._used[key] = time.time()
+                self.stats["hits"] += 1
+                return entry
+        
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+        self._put_memory(key, entry)
+        return entry
+    
+    def put(self, key: str, data: bytes, meta: Dict[str, Any]):
+        entry = (data, meta)
+        self._put_memory(key, entry)
+        self._write_disk(key, entry)
+    
+    def contains(self, key: str) -> bool:
+        """적중/미스 통계나 LRU 순서를 바꾸지 않는 존재 확인 (저장 전 중복 검사용)"""
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.disk_dir) and os.path.exists(os.path.join(self.disk_dir, key + ".json"))
+    
+    def hit_rate(self) -> float:
+        with self._lock:
+            hits = self.stats["hits"] + self.stats["disk_hits"]
+            total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+    
+    def _recently_used(self, used: Dict[str, float], key: str) -> bool:
+        return time.time() - used.get(key, 0.0) < self.min_age
+    
+    def _put_memory(self, key: str, entry: Tuple[bytes, Dict[str, Any]]):
+        size = len(entry[0])
+        # 메모리가 마지막 계층이면 (디스크 없음) 보호 기간 중인 항목은 한도를 넘어도 유지
+        last_tier = not self.disk_dir
+        if size > self.max_bytes and not (last_tier and self.min_age):
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old[0])
+            self._entries[key] = entry
+            self._used[key] = time.time()
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                if last_tier and self._recently_used(self._used, oldest):
+                    break
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._used.pop(oldest, None)
+                self.current_bytes -= len(evicted)
+                self.stats["evictions"] += 1
+    
+    def _read_disk(self, key: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        if not self.disk_dir:
+            return None
+        data_path = os.path.join(self.disk_dir, key)
+        try:
+            with open(data_path + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(data_path, "rb") as f:
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+        if self.disk_max_bytes is not None:
+            self._touch_disk(key, len(data))
+        return data, meta
+    
+    def _write_disk(self, key: str, entry: Tuple[bytes, Dict[str, Any]]):
+        if not self.disk_dir:
+            return
+        data, meta = entry
+        data_path = os.path.join(self.disk_dir, key)
+        try:
+            self._replace_file(data_path, data)
+            self._replace_file(data_path + ".json", json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️ [ImageCache] Disk write failed: {e}")
+            return
+        if self.disk_max_bytes is not None:
+            self._track_disk(key, len(data))
+    
+    def _replace_file(self, path: str, data: bytes):
+        """
+        임시 파일에 쓴 뒤 교체하여 동시 접근 시에도 불완전한 파일을 읽지 않도록 함
+        (임시 파일 이름은 프로세스/스레드 간에 겹치지 않음 - 여러 워커가 같은 디렉터리 공유)
+        """
+        f = tempfile.NamedTemporaryFile(dir=self.disk_dir, prefix=".", suffix=".tmp", delete=False)
+        try:
+            with f:
+                f.write(data)
+            os.replace(f.name, path)
+        except BaseException:
+            try:
+                os.unlink(f.name)
+            except OSError:
+                pass
+            raise
+    
+    def _scan_disk(self):
+        """기존 디스크 항목을 mtime 순으로 등록하고 예산을 넘으면 정리"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            try:
+                stat = os.stat(os.path.join(self.disk_dir, key))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, key, stat.st_size))
+        for mtime, key, size in sorted(entries):
+            self._disk_entries[key] = size
+            self._disk_used[key] = mtime
+            self.disk_bytes += size
+        self._evict_disk()
+    
+    def _touch_disk(self, key: str, size: int):
+        """디스크 적중: 최근 사용으로 표시 (mtime 갱신으로 재시작 후에도 순서 유지)"""
+        try:
+            os.utime(os.path.join(self.disk_dir, key))
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._disk_entries:
+                self._disk_entries.move_to_end(key)
+                self._disk_used[key] = time.time()
+                return
+        # 다른 프로세스가 쓴 항목
+        self._track_disk(key, size)
+    
+    def _track_disk(self, key: str, size: int):
+        with self._lock:
+            old = self._disk_entries.pop(key, None)
+            if old is not None:
+                self.disk_bytes -= old
+            self._disk_entries[key] = size
+            self._disk_used[key] = time.time()
+            self.disk_bytes += size
+        self._evict_disk()
+    
+    def _evict_disk(self):
+        """disk_max_bytes 이하가 될 때까지 가장 오래 사용하지 않은 항목 삭제
+        (여러 프로세스가 같은 디렉토리를 쓰면 각자 본 항목 기준이므로 한도는 근사치)
+        min_age 안에 사용된 항목에 도달하면 한도를 넘어도 중단"""
+        while True:
+            with self._lock:
+                if self.disk_bytes <= self.disk_max_bytes or not self._disk_entries:
+                    return
+                if self._recently_used(self._disk_used, next(iter(self._disk_entries))):
+                    return
+                key, size = self._disk_entries.popitem(last=False)
+                self._disk_used.pop(key, None)
+                self.disk_bytes -= size
+                self.stats["disk_evictions"] += 1
+            data_path = os.path.join(self.disk_dir, key)
+            # 메타데이터를 먼저 지워 읽는 쪽이 데이터 없는 항목을 보지 않도록 함
+            for path in (data_path + ".json", data_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class ImageDeduplicator:
+    """
+    요청 단위 유사 이미지 중복 제거
+    
+    여러 페이지에 같은 사진(재인코딩/리사이즈 포함)이 올라오면 dHash 해밍 거리와 비율로 묶어
+    같은 canonical id를 부여합니다. (canonical id, 슬롯) 단위로 처리 결과를 공유하면
+    디코딩/리사이징/인코딩을 한 번만 수행하고 HTML은 같은 URL을 참조합니다.
+    """
+    
+    def __init__(self, threshold: int = 6, aspect_tolerance: float = 0.02):
+        """
+        Args:
+            threshold: 같은 이미지로 볼 최대 해밍 거리 (64비트 중)
+            aspect_tolerance: 같은 이미지로 볼 최대 비율 차이 (크롭된 사진은 다른 이미지로 취급)
+        """
+        self.threshold = threshold
+        self.aspect_tolerance = aspect_tolerance
+        self._entries: List[Tuple[int, float]] = []
+        self._memo: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {"images": 0, "duplicates": 0}
+    
+    def canonical_id(self, source: ImageSource) -> int:
+        """유사 이미지가 이미 등록되어 있으면 그 id, 아니면 새 id"""
+        dhash = source.dhash
+        aspect = source.width / source.height
+        with self._lock:
+            self.stats["images"] += 1
+            for idx, (other_hash, other_aspect) in enumerate(self._entries):
+                if (bin(dhash ^ other_hash).count("1") <= self.threshold
+                        and abs(aspect - other_aspect) <= self.aspect_tolerance * other_aspect):
+                    self.stats["duplicates"] += 1
+                    return idx
+            self._entries.append((dhash, aspect))
+            return len(self._entries) - 1
+    
+    def memo(self, key: Any, factory) -> Any:
+        """
+        key별로 factory()를 한 번만 호출하여 결과를 공유 (처리 결과, URL 등)
+        
+        factory는 락 밖에서 실행되므로 (인코딩/디스크 I/O) 다른 key의 조회를 막지 않으며,
+        같은 key를 동시에 요청한 스레드는 먼저 시작한 호출의 결과를 기다립니다.
+        factory가 실패하면 대기 중인 호출도 같은 예외를 받고, 이후 호출은 다시 시도합니다.
+        """
+        with self._lock:
+            entry = self._memo.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._memo[key] = Future()
+        if not owner:
+            return entry.result()
+        try:
+            value = factory()
+        except BaseException as e:
+            self.forget(key, entry)
+            entry.set_exception(e)
+            raise
+        entry.set_result(value)
+        return value
+    
+    def claim(self, key: Any, value: Any) -> Any:
+        """key에 값이 없으면 value를 등록하고, 등록된 값을 반환 (asyncio Future 공유용, 계산 없음)"""
+        with self._lock:
+            return self._memo.setdefault(key, value)
+    
+    def forget(self, key: Any, value: Any):
+        """key에 value가 등록되어 있으면 제거 (실패/취소된 작업을 다음 요청이 다시 수행하도록)"""
+        with self._lock:
+            if self._memo.get(key) is value:
+                del self._memo[key]
+
+
 class ImageValidator:
     """
     이미지 검수 및 처리 클래스
@@ -35,22 +505,64 @@ class ImageValidator:
     MAX_WIDTH = 4000
     MAX_HEIGHT = 4000
     
-    def __init__(self, default_quality: int = 95):
+    # 처리 한도 (초과 시 디코딩하지 않고 거부): 픽셀 수 (압축 폭탄 방지)와 원본 파일 크기
+    # 40MP RGB 디코딩 ≈ 120MB이므로 동시 업로드 시 워커 메모리를 보호
+    MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))
+    MAX_SOURCE_BYTES = int(os.getenv("IMAGE_MAX_SOURCE_MB", "25")) * 1024 * 1024
+    
+    # 축소 디코딩 시 목표 크기 대비 여유 배율 (최종 LANCZOS 리샘플링 품질 확보)
+    DRAFT_OVERSAMPLE = 2
+    
+    # 출력 인코딩: 슬롯 픽셀당 목표 바이트 수와 품질 탐색 단계
+    TARGET_BYTES_PER_PIXEL = 0.25
+    QUALITY_STEPS = (95, 85, 75, 65, 55, 45)
+    # 썸네일 기준 색상 수가 이 값 이하이면 단색/그래픽 이미지로 보고 PNG 사용
+    FLAT_GRAPHIC_MAX_COLORS = 64
+    
+    # 스마트 크롭/초점 계산용 saliency 프록시 최대 크기
+    SALIENCY_PROXY_SIZE = 128
+    
+    # 시각 특징 추출: 썸네일 크기, 팔레트 색상 수, k-means 반복 횟수
+    FEATURE_THUMB_SIZE = 64
+    PALETTE_SIZE = 5
+    KMEANS_ITERATIONS = 10
+    # 피부색 픽셀 비율이 이 값 이상이면 인물(얼굴) 영역 힌트 제공
+    SKIN_MIN_RATIO = 0.02
+    
+    def __init__(
+        self,
+        default_quality: int = 95,
+        reducing_gap: Optional[float] = 2.0,
+        output_format: str = "auto",
+        max_workers: Optional[int] = None,
+        cache: Optional[ImageCache] = None
+    ):
         """
         Args:
-            default_quality: JPEG 저장 시 기본 품질 (1-100)
+            default_quality: JPEG/WebP 저장 시 최대 품질 (1-100)
+            reducing_gap: 리사이징 시 reduce()로 먼저 정수배 축소하는 기준 (None이면 전체 해상도 LANCZOS)
+            output_format: "auto" (사진은 WebP/JPEG, 투명/그래픽은 PNG), "webp", "jpeg", "png"
+            max_workers: batch_prepare 병렬 처리 스레드 수 (None이면 IMAGE_WORKERS 환경변수 또는 CPU 수)
+            cache: 처리 결과 캐시 (None이면 캐시하지 않음)
         """
         self.default_quality = default_quality
+        self.reducing_gap = reducing_gap
+        self.output_format = output_format
+        self.webp_available = features.check("webp")
+        # Pillow는 디코딩/리사이징/인코딩 중 GIL을 해제하므로 스레드 풀로 병렬 처리 가능
+        self.max_workers = max_workers or int(os.getenv("IMAGE_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.cache = cache
     
-    def validate_image(self, image: Image.Image) -> Dict[str, Any]:
+    def validate_image(self, image: Union[ImageSource, Image.Image]) -> Dict[str, Any]:
         """
-        이미지 유효성 검사
+        이미지 유효성 검사 (크기만 사용하므로 디코딩 전 ImageSource 헤더로도 가능)
         
         Args:
-            image: PIL Image 객체
+            image: ImageSource 또는 PIL Image 객체
             
         Returns:
-            검증 결과 딕셔너리
+            검증 결과 딕셔너리 (처리 한도 초과 시 is_valid=False, errors에 사유)
         """
         width, height = image.size
         
@@ -71,6 +583,20 @@ class ImageValidator:
                 f"최소 권장: {self.MIN_WIDTH}x{self.MIN_HEIGHT}"
             )
         
+        # 처리 한도 체크 (픽셀 수 / 파일 크기)
+        if width * height > self.MAX_PIXELS:
+            result["errors"].append(
+                f"이미지 픽셀 수가 한도를 초과합니다 ({width}x{height} = {width * height / 1e6:.1f}MP, "
+                f"최대 {self.MAX_PIXELS / 1e6:.0f}MP)"
+            )
+        byte_size = getattr(image, "byte_size", None)
+        if byte_size is not None and byte_size > self.MAX_SOURCE_BYTES:
+            result["errors"].append(
+                f"이미지 파일이 너무 큽니다 ({byte_size / 1024 / 1024:.1f}MB, "
+                f"최대 {self.MAX_SOURCE_BYTES // (1024 * 1024)}MB)"
+            )
+        result["is_valid"] = not result["errors"]
+        
         # 최대 해상도 체크
         if width > self.MAX_WIDTH or height > self.MAX_HEIGHT:
             result["warnings"].append(
@@ -96,6 +622,50 @@ class ImageValidator:
         else:
             return "square"
     
+    def probe(
+        self,
+        source: ImageSource,
+        target: Optional[Tuple[int, int, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        헤더만으로 이미지 정보 확인 및 디코딩 전략 결정 (픽셀 데이터는 읽지 않음)
+        
+        Args:
+            source: ImageSource (Image.open 헤더만 읽힌 상태)
+            target: (slot_width, slot_height, fit_mode)
+            
+        Returns:
+            {
+                "format", "mode", "width", "height", "pixels", "bytes",
+                "validation": validate_image 결과 (is_valid=False이면 디코딩하지 말 것),
+                "decode_strategy": "draft" (JPEG 축소 디코딩) | "full",
+                "draft_size": 축소 디코딩 목표 크기 또는 None
+            }
+            (전체 디코딩 후 큰 축소는 _resize의 reducing_gap이 처리하고,
+             중복 제거용 dHash는 ImageDeduplicator가 필요할 때만 계산)
+        """
+        info = {
+            "format": source.format,
+            "mode": source.mode,
+            "width": source.width,
+            "height": source.height,
+            "pixels": source.pixels,
+            "bytes": source.byte_size,
+            "validation": self.validate_image(source),
+            "decode_strategy": "full",
+            "draft_size": None
+        }
+        if not info["validation"]["is_valid"]:
+            return info
+        
+        if target:
+            draft_size = self._required_source_size(source.size, *target)
+            scale = min(source.width / draft_size[0], source.height / draft_size[1])
+            if source.format == "JPEG" and source.data is not None and scale >= 2:
+                info["decode_strategy"] = "draft"
+                info["draft_size"] = draft_size
+        return info
+    
     def fit_to_slot(
         self, 
         image: Image.Image, 
@@ -129,6 +699,28 @@ class ImageValidator:
         else:
             return self._contain_fit(image, slot_width, slot_height)
     
+    def _resize(self, image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+        """
+        고품질 리사이징
+        큰 축소 비율은 reduce()(박스 필터 정수배 축소)로 먼저 줄인 뒤 LANCZOS로 마무리합니다.
+        """
+        return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=self.reducing_gap)
+    
+    def _required_source_size(
+        self,
+        source_size: Tuple[int, int],
+        slot_width: int,
+        slot_height: int,
+        mode: str = "contain"
+    ) -> Tuple[int, int]:
+        """슬롯 맞춤에 필요한 최소 디코딩 크기 (리사이징 직전 크기 × DRAFT_OVERSAMPLE)"""
+        orig_width, orig_height = source_size
+        width_ratio = slot_width / orig_width
+        height_ratio = slot_height / orig_height
+        ratio = max(width_ratio, height_ratio) if mode in ("cover", "smart_crop") else min(width_ratio, height_ratio)
+        ratio = min(1.0, ratio * self.DRAFT_OVERSAMPLE)
+        return max(1, int(orig_width * ratio)), max(1, int(orig_height * ratio))
+    
     def _contain_fit(
         self, 
         image: Image.Image, 
@@ -152,7 +744,7 @@ class ImageValidator:
         new_height = int(orig_height * ratio)
         
         # 고품질 리사이징
-        resized = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        resized = self._resize(image, (new_width, new_height))
         
         return resized
     
@@ -178,7 +770,7 @@ class ImageValidator:
         new_height = int(orig_height * ratio)
         
         # 리사이징
-        resized = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        resized = self._resize(image, (new_width, new_height))
         
         # 중앙 크롭
         left = (new_width - target_width) // 2
@@ -198,9 +790,8 @@ class ImageValidator:
     ) -> Image.Image:
         """
         스마트 크롭: 이미지의 중요한 부분을 유지하면서 크롭
-        - 인물 사진: 얼굴/상체 중심
-        - 풍경 사진: 중앙 중심
-        - 세로 이미지: 상단 1/3 지점 중심 (황금비)
+        ~128px 프록시에서 계산한 saliency(그라디언트 에너지)를 가장 많이 보존하는 위치로 크롭
+        (얼굴/피사체처럼 디테일이 많은 영역이 잘리지 않도록 함)
         """
         orig_width, orig_height = image.size
         
@@ -214,20 +805,10 @@ class ImageValidator:
         new_height = int(orig_height * ratio)
         
         # 리사이징
-        resized = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # 스마트 크롭 위치 계산
-        # 세로 이미지의 경우 상단 1/3 지점 중심 (인물 사진 대비)
-        if new_height > new_width:
-            # 세로 이미지: 상단 1/3 지점 중심
-            center_y = new_height // 3
-            top = max(0, center_y - target_height // 2)
-            top = min(top, new_height - target_height)
-        else:
-            # 가로 이미지: 중앙 중심
-            top = (new_height - target_height) // 2
+        resized = self._resize(image, (new_width, new_height))
         
-        left = (new_width - target_width) // 2
+        # 스마트 크롭 위치 계산: 축소 프록시의 saliency를 가장 많이 포함하는 창 선택
+        left, top = self._best_crop_offset(resized, target_width, target_height)
         right = left + target_width
         bottom = top + target_height
         
@@ -235,9 +816,152 @@ class ImageValidator:
         
         return cropped
     
+    def _saliency_map(self, image: Image.Image) -> np.ndarray:
+        """
+        축소 프록시의 saliency 맵 (그라디언트 에너지 + 약한 중앙 가중치)
+        
+        Returns:
+            프록시 해상도 (최대 SALIENCY_PROXY_SIZE px)의 float32 2차원 배열
+        """
+        proxy = image.convert('L')
+        proxy.thumbnail((self.SALIENCY_PROXY_SIZE, self.SALIENCY_PROXY_SIZE), Image.Resampling.BILINEAR)
+        gray = np.asarray(proxy, dtype=np.float32)
+        
+        energy = np.zeros_like(gray)
+        energy[:, :-1] += np.abs(np.diff(gray, axis=1))
+        energy[:-1, :] += np.abs(np.diff(gray, axis=0))
+        
+        # 중앙 가중치: 디테일이 비슷하면 중앙 쪽을 선호 (단색 이미지에서는 중앙 크롭과 동일)
+        h, w = gray.shape
+        yy = (np.arange(h, dtype=np.float32) - (h - 1) / 2) / max(h, 1)
+        xx = (np.arange(w, dtype=np.float32) - (w - 1) / 2) / max(w, 1)
+        center_prior = np.exp(-(yy[:, None] ** 2 + xx[None, :] ** 2) * 4)
+        return energy + center_prior * (energy.mean() * 0.5 + 1e-3)
+    
+    def _best_crop_offset(self, image: Image.Image, crop_width: int, crop_height: int) -> Tuple[int, int]:
+        """
+        saliency 합이 최대가 되는 크롭 창의 좌상단 좌표
+        적분 영상(summed-area table)으로 모든 창 위치를 한 번에 평가합니다.
+        """
+        width, height = image.size
+        if crop_width >= width and crop_height >= height:
+            return 0, 0
+        
+        saliency = self._saliency_map(image)
+        ph, pw = saliency.shape
+        win_w = min(pw, max(1, round(pw * crop_width / width)))
+        win_h = min(ph, max(1, round(ph * crop_height / height)))
+        
+        integral = np.pad(saliency.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+        window_sums = (
+            integral[win_h:, win_w:] - integral[:-win_h, win_w:]
+            - integral[win_h:, :-win_w] + integral[:-win_h, :-win_w]
+        )
+        best_y, best_x = np.unravel_index(int(np.argmax(window_sums)), window_sums.shape)
+        
+        # 프록시 좌표 → 원본 좌표 (창이 이미지 밖으로 나가지 않도록 보정)
+        left = int(round(best_x * width / pw))
+        top = int(round(best_y * height / ph))
+        left = max(0, min(left, width - crop_width))
+        top = max(0, min(top, height - crop_height))
+        return left, top
+    
+    def compute_focal_point(self, image: Image.Image) -> Tuple[float, float]:
+        """
+        이미지의 초점 (saliency 가중 중심), 0~1 비율 좌표
+        브라우저가 object-cover로 자를 때 CSS object-position으로 사용합니다.
+        """
+        saliency = self._saliency_map(image)
+        # 상위 saliency 영역만 사용하여 배경 텍스처의 영향을 줄임
+        weights = np.clip(saliency - np.percentile(saliency, 75), 0, None)
+        total = weights.sum()
+        if total <= 0:
+            return 0.5, 0.5
+        ph, pw = saliency.shape
+        fy = float((weights.sum(axis=1) * (np.arange(ph) + 0.5)).sum() / total / ph)
+        fx = float((weights.sum(axis=0) * (np.arange(pw) + 0.5)).sum() / total / pw)
+        return round(fx, 3), round(fy, 3)
+    
+    def extract_features(self, image: Image.Image) -> Dict[str, Any]:
+        """
+        로컬 시각 특징 추출 (LLM 호출 없이 색상/타이포그래피 결정에 사용)
+        
+        Returns:
+            {
+                "palette": [{"hex": "#rrggbb", "ratio": float}, ...] (비중 내림차순),
+                "brightness": float (0~1, 평균 휘도),
+                "contrast": float (0~1, 휘도 표준편차),
+                "orientation": "landscape" | "portrait" | "square",
+                "face_hint": {"box": [x0, y0, x1, y1] (0~1 비율), "ratio": float} 또는 None
+            }
+        """
+        thumb = image.convert('RGB')
+        thumb.thumbnail((self.FEATURE_THUMB_SIZE, self.FEATURE_THUMB_SIZE), Image.Resampling.BILINEAR)
+        pixels = np.asarray(thumb, dtype=np.float32)
+        flat = pixels.reshape(-1, 3)
+        
+        luminance = flat @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        
+        return {
+            "palette": self._kmeans_palette(flat),
+            "brightness": round(float(luminance.mean()) / 255, 3),
+            "contrast": round(float(luminance.std()) / 255, 3),
+            "orientation": self._get_orientation(*image.size),
+            "face_hint": self._skin_region(pixels)
+        }
+    
+    def _kmeans_palette(self, flat: np.ndarray) -> List[Dict[str, Any]]:
+        """썸네일 픽셀 (N x 3) k-means 팔레트. 초기 중심은 휘도 분위수로 정해 결과가 결정적"""
+        k = min(self.PALETTE_SIZE, len(flat))
+        order = np.argsort(flat.sum(axis=1))
+        centers = flat[order[np.linspace(0, len(flat) - 1, k).astype(int)]].copy()
+        
+        for _ in range(self.KMEANS_ITERATIONS):
+            distances = ((flat[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+            labels = distances.argmin(axis=1)
+            counts = np.bincount(labels, minlength=k)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, flat)
+            nonempty = counts > 0
+            new_centers = centers.copy()
+            new_centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+            if np.allclose(new_centers, centers, atol=0.5):
+                centers = new_centers
+                break
+            centers = new_centers
+        
+        palette = []
+        for idx in np.argsort(-counts):
+            if counts[idx] == 0:
+                continue
+            r, g, b = (int(round(c)) for c in centers[idx])
+            palette.append({"hex": f"#{r:02x}{g:02x}{b:02x}", "ratio": round(float(counts[idx]) / len(flat), 3)})
+        return palette
+    
+    def _skin_region(self, pixels: np.ndarray) -> Optional[Dict[str, Any]]:
+        """YCbCr 피부색 범위 기반 인물 영역 힌트 (얼굴 검출기가 아닌 근사치)"""
+        r, g, b = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+        cb = 128 - 0.168736 * r - 0.331264 * g + 0.5 * b
+        cr = 128 + 0.5 * r - 0.418688 * g - 0.081312 * b
+        mask = (cb >= 77) & (cb <= 127) & (cr >= 133) & (cr <= 173)
+        
+        ratio = float(mask.mean())
+        if ratio < self.SKIN_MIN_RATIO:
+            return None
+        
+        ys, xs = np.nonzero(mask)
+        h, w = mask.shape
+        # 흩어진 피부색 픽셀의 영향을 줄이기 위해 5~95 분위 범위 사용
+        x0, x1 = (float(v) for v in np.percentile(xs, [5, 95]))
+        y0, y1 = (float(v) for v in np.percentile(ys, [5, 95]))
+        return {
+            "box": [round(x0 / w, 3), round(y0 / h, 3), round((x1 + 1) / w, 3), round((y1 + 1) / h, 3)],
+            "ratio": round(ratio, 3)
+        }
+    
     def prepare_for_layout(
         self, 
-        image: Union[Image.Image, str, bytes],
+        image: Union[ImageSource, Image.Image, str, bytes],
         layout_type: str = "magazine_full",
         slot_info: Optional[Dict] = None
     ) -> Dict[str, Any]:
@@ -245,17 +969,27 @@ class ImageValidator:
         레이아웃용 이미지 준비 (메인 API)
         
         Args:
-            image: PIL Image, Base64 문자열, 또는 bytes
+            image: ImageSource, PIL Image, Base64 문자열, 또는 bytes
             layout_type: 레이아웃 타입 (portrait, landscape, square, magazine_full 등)
-            slot_info: 슬롯 정보 딕셔너리 {"width": px, "height": px, "position": str}
+            slot_info: 슬롯 정보 딕셔너리 {"width": px, "height": px, "position": str,
+                       "fit_mode": str, "format": str, "target_bytes": int}
             
         Returns:
             {
                 "success": bool,
                 "processed_image": PIL Image,
+                "data": bytes (인코딩된 이미지),
+                "format": str ("WEBP", "JPEG", "PNG"),
+                "mime": str,
                 "base64": str (data URI),
                 "validation": dict,
-                "adjustments": list of str
+                "adjustments": list of str,
+                "cache_hit": bool (캐시 적중 시 True, processed_image는 None),
+                "focal_point": [x, y] (0~1 비율),
+                "object_position": str (CSS object-position 값),
+                "probe": dict (헤더 정보 및 디코딩 전략),
+                "features": dict (extract_features 결과: 팔레트, 밝기, 대비, 방향, 인물 영역 힌트),
+                "rejected": bool (처리 한도 초과로 디코딩 없이 거부된 경우 True)
             }
         """
         result = {
@@ -263,27 +997,77 @@ class ImageValidator:
             "processed_image": None,
             "base64": None,
             "validation": None,
-            "adjustments": []
+            "adjustments": [],
+            "cache_hit": False,
+            "rejected": False
         }
+        started = time.perf_counter()
+        bytes_in = 0
         
         try:
-            # 이미지 로드
-            if isinstance(image, str):
-                # Base64 문자열인 경우
-                if image.startswith("data:"):
-                    # data URI에서 base64 부분 추출
-                    base64_data = image.split(",")[1]
+            # 이미지 로드 (ImageSource로 전달된 경우 이미 디코딩된 객체를 재사용)
+            source = ImageSource.from_any(image)
+            bytes_in = source.byte_size or 0
+            
+            # 목표 슬롯 결정 (디코딩 전에 결정해야 축소 디코딩이 가능)
+            target = None
+            if slot_info:
+                target = (
+                    slot_info.get("width", 800),
+                    slot_info.get("height", 600),
+                    slot_info.get("fit_mode", "contain")
+                )
+            elif layout_type in self.ASPECT_RATIOS:
+                target_w, target_h = self.ASPECT_RATIOS[layout_type]
+                
+                # 기본 매거진 크기 (A4 기준)
+                if layout_type == "magazine_full":
+                    target = (794, 1123, "contain")  # A4 at 96dpi
+                elif layout_type == "magazine_half":
+                    target = (794, 561, "contain")
                 else:
-                    base64_data = image
-                image_bytes = base64.b64decode(base64_data)
-                img = Image.open(io.BytesIO(image_bytes))
-            elif isinstance(image, bytes):
-                img = Image.open(io.BytesIO(image))
-            else:
-                img = image
+                    # 비율에 맞게 800px 기준으로 계산
+                    target = (800, int(800 * target_h / target_w), "contain")
             
+            output_format = (slot_info or {}).get("format", self.output_format)
+            target_bytes = (slot_info or {}).get("target_bytes")
+            
+            # 캐시 조회: 같은 원본 + 같은 슬롯이면 Pillow 작업 전체를 건너뜀
+            cache_key = None
+            if self.cache is not None and target and source.sha256:
+                cache_key = ImageCache.make_key(source.sha256, *target, output_format, target_bytes, layout_type)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    data, meta = cached
+                    result.update(meta)
+                    result["data"] = data
+                    result["base64"] = f"data:{meta['mime']};base64,{base64.b64encode(data).decode()}"
+                    result["cache_hit"] = True
+                    result["success"] = True
+                    return result
+            
+            # 헤더만으로 한도 검사 및 디코딩 전략 결정 (픽셀 데이터를 읽기 전)
+            probe = self.probe(source, target)
+            validation = probe["validation"]
+            result["probe"] = probe
+            result["validation"] = validation
+            if not validation["is_valid"]:
+                result["rejected"] = True
+                result["error"] = "; ".join(validation["errors"])
+                return result
+            
+            # 축소 디코딩: JPEG는 draft()로 목표 크기 근처까지 바로 디코딩
+            img = source.decode(draft_size=probe["draft_size"])
+            if img.size != source.size:
+                result["adjustments"].append(f"축소 디코딩: {source.size} -> {img.size}")
+            
+            # 실제 투명 영역이 있는 이미지는 자동 포맷일 때 알파를 유지 (PNG로 저장)
+            if img.mode in ('RGBA', 'LA', 'P') and output_format in ("auto", "png") and self._has_transparency(img):
+                if img.mode != 'RGBA':
+                    img = img.convert('RGBA')
+                result["adjustments"].append("투명 영역 유지 (RGBA)")
             # RGB 모드 변환 (RGBA인 경우)
-            if img.mode == 'RGBA':
+            elif img.mode == 'RGBA':
                 # 흰색 배경에 합성
                 background = Image.new('RGB', img.size, (255, 255, 255))
                 background.paste(img, mask=img.split()[3])
@@ -293,66 +1077,154 @@ class ImageValidator:
                 img = img.convert('RGB')
                 result["adjustments"].append(f"{img.mode}를 RGB로 변환")
             
-            # 유효성 검사
-            validation = self.validate_image(img)
-            result["validation"] = validation
-            
             # 슬롯 정보가 있는 경우 해당 크기에 맞게 조정
             if slot_info:
-                slot_width = slot_info.get("width", 800)
-                slot_height = slot_info.get("height", 600)
-                fit_mode = slot_info.get("fit_mode", "contain")
+                slot_width, slot_height, fit_mode = target
                 
                 processed = self.fit_to_slot(img, slot_width, slot_height, mode=fit_mode)
                 result["adjustments"].append(
-                    f"슬롯에 맞게 조정: {img.size} -> {processed.size} ({fit_mode})"
+                    f"슬롯에 맞게 조정: {source.size} -> {processed.size} ({fit_mode})"
                 )
-            else:
+            elif target:
                 # 레이아웃 타입에 따른 기본 처리
-                if layout_type in self.ASPECT_RATIOS:
-                    target_ratio = self.ASPECT_RATIOS[layout_type]
-                    target_w, target_h = target_ratio
-                    
-                    # 기본 매거진 크기 (A4 기준)
-                    if layout_type == "magazine_full":
-                        slot_width, slot_height = 794, 1123  # A4 at 96dpi
-                    elif layout_type == "magazine_half":
-                        slot_width, slot_height = 794, 561
-                    else:
-                        # 비율에 맞게 800px 기준으로 계산
-                        slot_width = 800
-                        slot_height = int(800 * target_h / target_w)
-                    
-                    processed = self.fit_to_slot(img, slot_width, slot_height, mode="contain")
-                    result["adjustments"].append(
-                        f"{layout_type} 비율로 조정: {img.size} -> {processed.size}"
-                    )
-                else:
-                    processed = img
+                slot_width, slot_height, fit_mode = target
+                processed = self.fit_to_slot(img, slot_width, slot_height, mode=fit_mode)
+                result["adjustments"].append(
+                    f"{layout_type} 비율로 조정: {source.size} -> {processed.size}"
+                )
+            else:
+                processed = img
             
             result["processed_image"] = processed
             result["success"] = True
             
-            # Base64 변환
-            buffered = io.BytesIO()
-            processed.save(buffered, format="PNG", quality=self.default_quality)
-            base64_str = base64.b64encode(buffered.getvalue()).decode()
-            result["base64"] = f"data:image/png;base64,{base64_str}"
+            # 초점 (HTML에서 object-position으로 사용)
+            focal_x, focal_y = self.compute_focal_point(processed)
+            result["focal_point"] = [focal_x, focal_y]
+            result["object_position"] = f"{focal_x * 100:.0f}% {focal_y * 100:.0f}%"
+            
+            # 로컬 시각 특징 (vision_context의 색상/밝기 정보)
+            result["features"] = self.extract_features(processed)
+            
+            # 인코딩 (슬롯 크기 기반 바이트 예산) 후 Base64 변환
+            if target_bytes is None:
+                target_bytes = int(processed.width * processed.height * self.TARGET_BYTES_PER_PIXEL)
+            data, fmt = self.encode_image(processed, target_bytes=target_bytes, output_format=output_format)
+            mime = Image.MIME[fmt]
+            result["data"] = data
+            result["format"] = fmt
+            result["mime"] = mime
+            result["adjustments"].append(f"{fmt} 인코딩: {len(data) / 1024:.1f}KB (목표 {target_bytes / 1024:.1f}KB)")
+            base64_str = base64.b64encode(data).decode()
+            result["base64"] = f"data:{mime};base64,{base64_str}"
+            
+            if cache_key:
+                self.cache.put(cache_key, data, {
+                    "format": fmt,
+                    "mime": mime,
+                    "validation": validation,
+                    "adjustments": result["adjustments"],
+                    "processed_size": list(processed.size),
+                    "focal_point": result["focal_point"],
+                    "object_position": result["object_position"],
+                    "features": result["features"]
+                })
             
         except Exception as e:
             result["success"] = False
             result["error"] = str(e)
+        finally:
+            # 처리 시간 및 입출력 바이트 (/metrics)
+            if result["cache_hit"]:
+                outcome = "cache_hit"
+            elif result["rejected"]:
+                outcome = "rejected"
+            else:
+                outcome = "ok" if result["success"] else "error"
+            observe_image(time.perf_counter() - started, outcome, bytes_in, len(result.get("data") or b""))
         
         return result
     
+    def _has_transparency(self, image: Image.Image) -> bool:
+        """알파 채널(또는 팔레트 투명색)에 실제로 불투명하지 않은 픽셀이 있는지"""
+        if image.mode == 'P':
+            if 'transparency' not in image.info:
+                return False
+            image = image.convert('RGBA')
+        elif image.mode not in ('RGBA', 'LA'):
+            return False
+        return image.getchannel('A').getextrema()[0] < 255
+    
+    def _is_flat_graphic(self, image: Image.Image) -> bool:
+        """색상 수가 적은 그래픽/일러스트 여부 (썸네일 기준)"""
+        thumb = image.copy()
+        thumb.thumbnail((64, 64))
+        return thumb.getcolors(maxcolors=self.FLAT_GRAPHIC_MAX_COLORS) is not None
+    
+    def encode_image(
+        self,
+        image: Image.Image,
+        target_bytes: Optional[int] = None,
+        output_format: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """
+        이미지 내용에 맞는 포맷으로 인코딩
+        
+        - 투명 영역이 있거나 단색/그래픽 이미지: PNG (무손실)
+        - 사진: WebP (미지원 환경에서는 Progressive JPEG), target_bytes 이하가 될 때까지 품질을 낮춤
+        
+        Args:
+            image: 인코딩할 PIL Image
+            target_bytes: 목표 바이트 수 (None이면 최대 품질)
+            output_format: "auto", "webp", "jpeg", "png" (None이면 인스턴스 기본값)
+            
+        Returns:
+            (인코딩된 bytes, PIL 포맷 이름)
+        """
+        output_format = (output_format or self.output_format).lower()
+        if output_format == "auto":
+            if image.mode in ('RGBA', 'LA') or self._is_flat_graphic(image):
+                output_format = "png"
+            else:
+                output_format = "webp" if self.webp_available else "jpeg"
+        elif output_format == "webp" and not self.webp_available:
+            output_format = "jpeg"
+        
+        if output_format == "png":
+            buffered = io.BytesIO()
+            image.save(buffered, format="PNG", optimize=True)
+            return buffered.getvalue(), "PNG"
+        
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        fmt = "WEBP" if output_format == "webp" else "JPEG"
+        qualities = [q for q in self.QUALITY_STEPS if q <= self.default_quality] or [self.default_quality]
+        data = b""
+        for quality in qualities:
+            buffered = io.BytesIO()
+            if fmt == "WEBP":
+                image.save(buffered, format="WEBP", quality=quality, method=4)
+            else:
+                image.save(buffered, format="JPEG", quality=quality, optimize=True, progressive=True)
+            data = buffered.getvalue()
+            if target_bytes is None or len(data) <= target_bytes:
+                break
+        return data, fmt
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-prepare")
+        return self._executor
+    
     def batch_prepare(
         self, 
-        images: List[Union[Image.Image, str, bytes]],
+        images: List[Union[ImageSource, Image.Image, str, bytes]],
         layout_type: str = "magazine_full",
         slot_infos: Optional[List[Dict]] = None
     ) -> List[Dict[str, Any]]:
         """
-        여러 이미지 일괄 처리
+        여러 이미지 일괄 처리 (스레드 풀에서 병렬 처리, 결과 순서는 입력 순서 유지)
         
         Args:
             images: 이미지 리스트
@@ -362,14 +1234,38 @@ class ImageValidator:
         Returns:
             처리 결과 리스트
         """
-        results = []
-        
-        for i, img in enumerate(images):
-            slot_info = slot_infos[i] if slot_infos and i < len(slot_infos) else None
-            result = self.prepare_for_layout(img, layout_type, slot_info)
-            results.append(result)
+        slots = [slot_infos[i] if slot_infos and i < len(slot_infos) else None for i in range(len(images))]
+        if len(images) <= 1:
+            return [self.prepare_for_layout(img, layout_type, slot) for img, slot in zip(images, slots)]
         
-        return results
+        return list(self._get_executor().map(
+            lambda args: self.prepare_for_layout(args[0], layout_type, args[1]),
+            zip(images, slots)
+        ))
+    
+    async def abatch_prepare(
+        self,
+        images: List[Union[ImageSource, Image.Image, str, bytes]],
+        layout_type: str = "magazine_full",
+        slot_infos: Optional[List[Dict]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        batch_prepare의 비동기 버전 (이벤트 루프를 막지 않음)
+        전체 소요 시간은 합이 아니라 가장 느린 이미지 기준입니다.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        tasks = [
+            loop.run_in_executor(
+                executor,
+                self.prepare_for_layout,
+                img,
+                layout_type,
+                slot_infos[i] if slot_infos and i < len(slot_infos) else None
+            )
+            for i, img in enumerate(images)
+        ]
+        return list(await asyncio.gather(*tasks))
     
     def get_optimal_css(
         self, 
@@ -412,12 +1308,51 @@ class ImageValidator:
         return css
 
 
+def summarize_features(features_list: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    여러 이미지의 extract_features 결과를 페이지 단위로 합산
+    
+    Returns:
+        {"dominant_colors": [hex, ...], "palette": [...], "brightness", "contrast",
+         "orientations": [...], "face_regions": [{"image": i, "box": [...]}, ...]}
+        (특징이 없으면 빈 딕셔너리)
+    """
+    valid = [(i, f) for i, f in enumerate(features_list) if f]
+    if not valid:
+        return {}
+    
+    # 팔레트 비중을 이미지 수로 나누어 합산 (같은 색은 병합)
+    weights: Dict[str, float] = {}
+    for _, features in valid:
+        for color in features["palette"]:
+            weights[color["hex"]] = weights.get(color["hex"], 0.0) + color["ratio"] / len(valid)
+    palette = [
+        {"hex": hex_color, "ratio": round(ratio, 3)}
+        for hex_color, ratio in sorted(weights.items(), key=lambda item: -item[1])
+    ][:ImageValidator.PALETTE_SIZE]
+    
+    return {
+        "dominant_colors": [color["hex"] for color in palette],
+        "palette": palette,
+        "brightness": round(sum(f["brightness"] for _, f in valid) / len(valid), 3),
+        "contrast": round(sum(f["contrast"] for _, f in valid) / len(valid), 3),
+        "orientations": [f["orientation"] for _, f in valid],
+        "face_regions": [{"image": i, "box": f["face_hint"]["box"]} for i, f in valid if f.get("face_hint")]
+    }
+
+
 # 전역 인스턴스
-image_validator = ImageValidator()
+# IMAGE_CACHE_MAX_MB: 메모리 캐시 크기, IMAGE_CACHE_DIR: 디스크 캐시 디렉토리 (미설정 시 메모리만)
+processed_image_cache = ImageCache(
+    max_bytes=int(os.getenv("IMAGE_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    disk_dir=os.getenv("IMAGE_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("IMAGE_CACHE_DISK_MAX_MB", "1024")) * 1024 * 1024
+)
+image_validator = ImageValidator(cache=processed_image_cache)
 
 
 def validate_and_prepare_image(
-    image_data: Union[str, bytes, Image.Image],
+    image_data: Union[ImageSource, str, bytes, Image.Image],
     slot_width: Optional[int] = None,
     slot_height: Optional[int] = None,
     fit_mode: str = "contain"
@@ -0,0 +1,311 @@
+"""
+[Job Queue]
+Background execution of layout generation.
+
+POST /jobs enqueues a request and returns immediately; a fixed pool of worker
+tasks runs the pipeline, and clients poll GET /jobs/{id}. The queue is bounded,
+each user has a cap on queued + running jobs, and jobs can be cancelled.
+Finished jobs are kept for JOB_TTL seconds so results can be collected.
+
+Under the multi-worker launcher each job is also mirrored to the shared state
+store (shared_state.py), so any worker can report or cancel it.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from shared_state import SharedState, shared_state
+
+
+class JobQueueFull(Exception):
+    """The queue is at capacity; the client should retry later."""
+
+
+class JobLimitExceeded(Exception):
+    """The user already has the maximum number of active jobs."""
+
+
+class Job:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, user: str, pages_info: List[Dict[str, Any]], payload: Any = None):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.pages_info = pages_info
+        # Runner input besides the pages (e.g. uploaded ImageSources); dropped once finished
+        self.payload = payload
+        self.status = Job.QUEUED
+        self.results: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+
+    @property
+    def active(self) -> bool:
+        return self.status in (Job.QUEUED, Job.RUNNING)
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        Serializable snapshot for the shared state store (no payload or task). Results
+        are stored separately, one row per page (SharedState.add_result).
+        """
+        return {
+            "id": self.id,
+            "user": self.user,
+            "pages_info": self.pages_info,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "Job":
+        """Read-only view of a job owned by another worker."""
+        job = cls(state["user"], state["pages_info"])
+        job.id = state["id"]
+        job.status = state["status"]
+        job.results = state.get("results", [])
+        job.error = state["error"]
+        job.created_at = state["created_at"]
+        job.started_at = state["started_at"]
+        job.finished_at = state["finished_at"]
+        job.cancel_requested = state.get("cancel_requested", False)
+        return job
+
+    def to_dict(self, include_results: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "pages_total": len(self.pages_info),
+            "pages_done": len(self.results),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_results and self.status == Job.DONE:
+            # Results in page order (workers append them as pages finish)
+            order = {page.get("id"): i for i, page in enumerate(self.pages_info)}
+            data["results"] = sorted(self.results, key=lambda r: order.get(r.get("page_id"), len(order)))
+        return data
+
+
+# runner(job, on_result) -> list of page results; on_result(result) reports each finished page
+Runner = Callable[[Job, Callable[[Dict[str, Any]], None]], Awaitable[List[Dict[str, Any]]]]
+
+
+class JobManager:
+    """Bounded job queue with a fixed pool of asyncio worker tasks."""
+
+    def __init__(
+        self,
+        runner: Runner,
+        workers: int = 2,
+        max_queue: int = 32,
+        max_per_user: int = 2,
+        ttl: float = 3600.0,
+        on_finish: Optional[Callable[[Job], None]] = None,
+        store: Optional[SharedState] = None,
+        cancel_poll: float = 1.0
+    ):
+        """
+        Args:
+            runner: coroutine function that executes one job
+            workers: jobs executed at the same time
+            max_queue: max jobs waiting to start (beyond this, submit raises JobQueueFull)
+            max_per_user: max queued + running jobs per user
+            ttl: seconds a finished job is kept before it is purged
+            on_finish: called once with each job after it reaches a final status
+            store: shared state mirrored for other workers (None = this process only)
+            cancel_poll: seconds between checks for cancellations made through other workers
+        """
+        self.runner = runner
+        self.on_finish = on_finish
+        self.workers = workers
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+        self.store = store
+        self.cancel_poll = cancel_poll
+        self.jobs: Dict[str, Job] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == Job.RUNNING)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+            if self.store is not None:
+                self._tasks.append(asyncio.create_task(self._watch_cancellations()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs still queued here will never run (other workers can't pick them up)
+        for job in self.jobs.values():
+            if job.active:
+                self._finish(job, Job.CANCELLED, "Server shutting down")
+        if self.store is not None:
+            await asyncio.to_thread(self.store.flush)
+
+    def submit(self, user: str, pages_info: List[Dict[str, Any]], payload: Any = None) -> Job:
+        """Enqueue a job. Raises JobLimitExceeded / JobQueueFull instead of waiting."""
+        self._purge_expired()
+        active = sum(1 for job in self.jobs.values() if job.user == user and job.active)
+        if self.store is not None:
+            # The store may not have this worker's latest writes yet: count local jobs too
+            active = max(active, self.store.active_jobs(user))
+        if active >= self.max_per_user:
+            raise JobLimitExceeded(f"{active} jobs already active (max {self.max_per_user})")
+
+        job = Job(user, pages_info, payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self._queue.maxsize} waiting)")
+        self.jobs[job.id] = job
+        self._sync(job)
+        return job
+
+    def get(self, job_id: str, user: Optional[str] = None) -> Optional[Job]:
+        """Look up a job; with user given, other users' jobs are not visible."""
+        job = self.jobs.get(job_id)
+        if job is None and self.store is not None:
+            state = self.store.load_job(job_id)
+            job = Job.from_state(state) if state is not None else None
+        if job is None or (user is not None and job.user != user):
+            return None
+        return job
+
+    def cancel(self, job_id: str, user: Optional[str] = None) -> Optional[Job]:
+        """Cancel a queued or running job. Finished jobs are returned unchanged."""
+        job = self.get(job_id, user)
+        if job is None or not job.active:
+            return job
+        if job.id not in self.jobs:
+            # Owned by another worker: it cancels the job on its next poll
+            self.store.submit(self.store.request_cancel, job.id)
+            job.cancel_requested = True
+            return job
+        job.cancel_requested = True
+        if job.status == Job.RUNNING and job.task is not None:
+            job.task.cancel()
+        else:
+            # Still queued: the worker skips it when it is dequeued
+            self._finish(job, Job.CANCELLED)
+        return job
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != Job.QUEUED:
+                    continue
+                job.status = Job.RUNNING
+                job.started_at = time.time()
+                self._sync(job)
+                print(f"🧵 [Jobs] Worker {index} started {job.id} ({len(job.pages_info)} pages, user {job.user})")
+
+                def on_result(result, job=job):
+                    job.results.append(result)
+                    self._sync_result(job, result)
+
+                job.task = asyncio.create_task(self.runner(job, on_result))
+                try:
+                    results = await job.task
+                    reported = {id(result) for result in job.results}
+                    for result in results:
+                        if id(result) not in reported:
+                            self._sync_result(job, result)
+                    job.results = list(results)
+                    self._finish(job, Job.DONE)
+                except asyncio.CancelledError:
+                    self._finish(job, Job.CANCELLED)
+                    if not job.cancel_requested:
+                        raise  # the worker itself is being stopped
+                except Exception as e:
+                    print(f"❌ [Jobs] {job.id} failed: {e}")
+                    self._finish(job, Job.FAILED, str(e))
+                print(f"🧵 [Jobs] {job.id} -> {job.status} in {job.finished_at - job.started_at:.1f}s")
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        job.task = None
+        job.payload = None
+        self._sync(job)
+        if self.on_finish:
+            self.on_finish(job)
+
+    def _sync(self, job: Job):
+        # Written off the event loop, in order (SharedState.submit)
+        if self.store is not None:
+            self.store.submit(self.store.save_job, job.to_state())
+
+    def _sync_result(self, job: Job, result: Dict[str, Any]):
+        if self.store is not None:
+            self.store.submit(self.store.add_result, job.id, result)
+
+    async def _watch_cancellations(self):
+        """Apply cancellations requested through other workers to jobs running here."""
+        while True:
+            await asyncio.sleep(self.cancel_poll)
+            active = [job.id for job in self.jobs.values() if job.active]
+            try:
+                cancelled = await asyncio.to_thread(self.store.cancel_requested, active)
+            except Exception as e:
+                print(f"⚠️ [Jobs] Cancellation poll failed: {e}")
+                continue
+            for job_id in cancelled:
+                self.cancel(job_id)
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if not job.active and job.finished_at and now - job.finished_at > self.ttl
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+        if self.store is not None:
+            self.store.submit(self.store.purge, self.ttl)
+
+
+def create_job_manager(runner: Runner, on_finish: Optional[Callable[[Job], None]] = None) -> JobManager:
+    """
+    JobManager configured from JOB_WORKERS / JOB_QUEUE_SIZE / JOB_MAX_PER_USER / JOB_TTL,
+    mirrored to the shared state store when one is configured (AURA_STATE_DB).
+    """
+    return JobManager(
+        runner,
+        workers=int(os.getenv("JOB_WORKERS", "2")),
+        max_queue=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+        max_per_user=int(os.getenv("JOB_MAX_PER_USER", "2")),
+        ttl=float(os.getenv("JOB_TTL", "3600")),
+        on_finish=on_finish,
+        store=shared_state
+    )
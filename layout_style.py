@@ -0,0 +1,102 @@
+"""
+[Layout Style]
+측정된 이미지 특징(image_validator.summarize_features)으로 타이포그래피/색상을 결정하는 모듈입니다.
+
+LLM 호출 없이 결정적으로 계산하며, 두 MCP 서버(mcp_server.py, mcp_server_langgraph.py)가
+같은 규칙을 사용합니다. 팔레트가 없으면 None을 반환하고 서버는 기존 LLM 경로를 사용합니다.
+"""
+
+import re
+import colorsys
+from typing import Any, Dict, Optional
+
+
+def hex_to_rgb(hex_color: str) -> tuple:
+    hex_color = hex_color.lstrip("#")
+    return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def relative_luminance(rgb: tuple) -> float:
+    channels = []
+    for c in rgb:
+        c = c / 255
+        channels.append(c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4)
+    return 0.2126 * channels[0] + 0.7152 * channels[1] + 0.0722 * channels[2]
+
+
+def readable_on_white(rgb: tuple, min_ratio: float = 3.0) -> tuple:
+    """흰 배경 대비 min_ratio(WCAG 대형 텍스트 기준) 이상이 될 때까지 어둡게"""
+    while (1.05 / (relative_luminance(rgb) + 0.05)) < min_ratio and max(rgb) > 0:
+        rgb = tuple(int(c * 0.85) for c in rgb)
+    return rgb
+
+
+def style_from_features(features: Optional[Dict[str, Any]], layout_override: str, body: str) -> Optional[dict]:
+    """
+    측정된 이미지 팔레트로 타이포그래피/색상 결정 (LLM 호출 없음)
+
+    Args:
+        features: summarize_features 결과 (palette, brightness, ...)
+        layout_override: "COVER" / "ARTICLE"
+        body: 본문 (인용구를 강조 문구로 사용)
+
+    Returns:
+        headline/subhead/body 클래스, 강조색, 팔레트, 강조 문구, premium touches
+        (팔레트가 없으면 None)
+    """
+    features = features or {}
+    palette = features.get("palette") or []
+    if not palette:
+        return None
+
+    # 강조색: 비중이 작지 않은 색 중 채도 x 명도가 가장 높은 색 (무채색 이미지면 가장 어두운 색)
+    def vividness(color):
+        r, g, b = (c / 255 for c in hex_to_rgb(color["hex"]))
+        _, sat, val = colorsys.rgb_to_hsv(r, g, b)
+        return sat * val
+
+    candidates = [c for c in palette if c.get("ratio", 0) >= 0.03] or palette
+    accent = max(candidates, key=vividness)
+    if vividness(accent) < 0.2:
+        accent = min(candidates, key=lambda c: relative_luminance(hex_to_rgb(c["hex"])))
+    accent_hex = "#%02x%02x%02x" % readable_on_white(hex_to_rgb(accent["hex"]))
+
+    is_cover = (layout_override or "").upper() == "COVER"
+    # 표지는 이미지 위에 제목이 올라가므로 이미지 밝기에 따라 글자색 반전
+    brightness = features.get("brightness")
+    dark_image = brightness is not None and brightness < 0.5
+    headline_color = "text-white" if is_cover and dark_image else "text-slate-900"
+    subhead_color = "text-white/80" if is_cover and dark_image else "text-slate-600"
+    headline_size = "text-7xl" if is_cover else "text-5xl"
+
+    key_phrases = re.findall(r'"([^"]{4,80})"|\u201c([^\u201d]{4,80})\u201d', body or "")
+    key_phrases = [a or b for a, b in key_phrases][:3]
+
+    touches = ["accent_line", "page_number"]
+    if is_cover:
+        touches.append("vertical_edge_text")
+    if key_phrases:
+        touches.append("decorative_quotes")
+
+    return {
+        "headline_classes": f"{headline_size} font-black font-serif {headline_color} tracking-tight",
+        "subhead_classes": f"text-xl {subhead_color} italic",
+        "body_classes": "text-sm leading-relaxed text-slate-800",
+        "accent_color": f"text-[{accent_hex}]",
+        "accent_border": f"border-[{accent_hex}]",
+        "palette": [c["hex"] for c in palette],
+        "key_phrases": key_phrases,
+        "premium_touches": touches
+    }
+
+
+def vision_features(vision_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """vision_context JSON에서 측정된 특징만 추출 (팔레트가 없으면 None)"""
+    if not vision_data.get("palette"):
+        return None
+    return {
+        "palette": vision_data["palette"],
+        "brightness": vision_data.get("brightness"),
+        "contrast": vision_data.get("contrast"),
+        "face_regions": vision_data.get("face_regions", [])
+    }
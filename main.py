@@ -1,31 +1,119 @@
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import json
+import os
+import signal
+import time
 from typing import List, Optional
 import io
 import base64
 from PIL import Image
 # import rag_modules
 import rag_voyage as rag_modules
+from media_store import media_store
+from asset_cache import asset_cache
+from compression import CompressionMiddleware, compression_settings
+from metrics import MetricsMiddleware, gauge_function, register_cache, render_latest, refresh_loop
+from admission import Overloaded, admission_controller, admission_stats, circuit_states
+from tool.mcp_client import mcp_client
+from pipeline import read_uploads, render_pages
+from image_validator import processed_image_cache
+from jobs import Job, JobQueueFull, JobLimitExceeded, create_job_manager
+from progress import progress_bus, TERMINAL_EVENTS
+from extra.publisher import stream_publication, target_articles
+
+# AURA_DEMO_MODE=1 serves canned layouts from datas/ instead of running the pipeline
+DEMO_MODE = os.getenv("AURA_DEMO_MODE", "0") == "1"
+DEMO_DELAY = float(os.getenv("AURA_DEMO_DELAY", "30"))
+
+async def run_job(job: Job, on_result) -> List[dict]:
+    """Job runner: same pipeline as /analyze, reporting pages as they finish."""
+    def on_event(event: dict):
+        progress_bus.publish(job.id, event)
+
+    if DEMO_MODE:
+        results = (await demo_results(job.pages_info))["results"]
+        for result in results:
+            on_result(result)
+            on_event({"page_id": result["page_id"], "type": "page_done", "status": result["status"], "result": result})
+        return results
+    # Jobs are already bounded by the job queue: wait for page capacity without a deadline
+    async with admission_controller.admit(len(job.pages_info), max_wait=None, bounded=False):
+        return await render_pages(job.pages_info, job.payload, on_result=on_result, on_event=on_event)
+
+def job_finished(job: Job):
+    progress_bus.publish(job.id, {"type": "job_finished", "status": job.status})
+
+job_manager = create_job_manager(run_job, on_finish=job_finished)
+
+# Gauges and cache counters read at scrape time
+gauge_function("aura_pages_in_flight", "Pages holding admission slots", lambda: admission_controller.in_flight)
+gauge_function("aura_admission_waiting", "Requests waiting for page capacity", lambda: admission_controller.waiting)
+gauge_function("aura_job_queue_depth", "Jobs waiting for a worker", lambda: job_manager.queue_depth)
+gauge_function("aura_jobs_running", "Jobs being executed", lambda: job_manager.running)
+gauge_function("aura_mcp_pool_queued", "MCP calls waiting for a session",
+               lambda: mcp_client.pool.queued if mcp_client.pool is not None else 0)
+gauge_function("aura_mcp_pool_warm", "Initialized MCP sessions",
+               lambda: mcp_client.pool.warm if mcp_client.pool is not None else 0)
+register_cache("processed_images", lambda: processed_image_cache.stats)
+register_cache("media", lambda: media_store.stats)
+register_cache("assets", lambda: asset_cache.stats)
+
+def supervisor_pid() -> Optional[int]:
+    """pid of the serve.py supervisor when running as one of its workers."""
+    pid = os.getenv("AURA_SUPERVISOR_PID")
+    return int(pid) if pid else None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Load models on startup
     print("Startup: Initializing RAG Modules...")
-    rag_modules.setup_rag()
+    if not DEMO_MODE:
+        rag_modules.setup_rag()
+    watcher = None
+    # Under serve.py's supervisor only the parent watches the dataset
+    if rag_modules.Config.DATASET_WATCH_INTERVAL > 0 and not DEMO_MODE and not supervisor_pid():
+        watcher = asyncio.create_task(rag_modules.watch_dataset())
+    metrics_refresher = asyncio.create_task(refresh_loop())
+    job_manager.start()
+    if mcp_client.pool is not None and not DEMO_MODE:
+        mcp_client.pool.start()  # warm MCP sessions before the first request
     yield
     print("Shutdown: Cleaning up...")
+    await job_manager.stop()
+    if mcp_client.pool is not None:
+        await mcp_client.pool.close()
+    if watcher:
+        watcher.cancel()
+    metrics_refresher.cancel()
 
 app = FastAPI(lifespan=lifespan)
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Fail fast under overload instead of queueing unbounded LLM work."""
+    print(f"🚦 Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        {"status": "error", "message": f"Server busy: {exc}"},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Add session middleware (required for login)
 app.add_middleware(SessionMiddleware, secret_key="aura-secret-key-change-in-production-2024")
 
+# gzip large rendered-HTML responses (results can be several MB of text)
+app.add_middleware(CompressionMiddleware, paths=("/analyze", "/jobs", "/publish"), **compression_settings())
+
+# Per-route latency histogram (outermost, so it includes compression and sessions)
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -47,9 +135,9 @@ def is_authenticated(request: Request) -> bool:
     return request.session.get("authenticated", False)
 
 @app.get("/login")
-async def login_page():
+async def login_page(request: Request):
     """Serve login page"""
-    return FileResponse('static/login.html')
+    return asset_cache.response('static/login.html', request)
 
 @app.post("/login")
 async def login(request: Request):
@@ -88,9 +176,9 @@ async def logout(request: Request):
     return RedirectResponse(url="/login", status_code=302)
 
 @app.get("/signup")
-async def signup_page():
+async def signup_page(request: Request):
     """Serve signup page"""
-    return FileResponse('static/signup.html')
+    return asset_cache.response('static/signup.html', request)
 
 @app.post("/signup")
 async def signup(request: Request):
@@ -143,7 +231,92 @@ async def read_index(request: Request):
     """Main page - requires authentication"""
     if not is_authenticated(request):
         return RedirectResponse(url="/login", status_code=302)
-    return FileResponse('static/index.html')
+    return asset_cache.response('static/index.html', request)
+
+@app.get("/media/{name}")
+async def get_media(name: str, request: Request):
+    """
+    Serve a prepared image by content hash.
+    URLs never change content, so responses are cacheable forever and revalidate via ETag.
+    """
+    # May read from the disk tier
+    entry = await asyncio.to_thread(media_store.get, name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    
+    data, mime, etag = entry
+    headers = {"Cache-Control": media_store.CACHE_CONTROL, "ETag": etag, "X-Content-Type-Options": "nosniff"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=mime, headers=headers)
+
+@app.post("/admin/reload-index")
+async def reload_index(request: Request):
+    """
+    Rebuild the retrieval index from the dataset in the background and swap it in.
+    Searches keep running on the current index until the new one is ready.
+    Under serve.py with several workers the supervisor does the reload (202 Accepted).
+    Requires the admin account.
+    """
+    if not is_authenticated(request) or request.session.get("username") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    if supervisor_pid():
+        # Workers share the supervisor's index: it rebuilds it and replaces the workers
+        os.kill(supervisor_pid(), signal.SIGHUP)
+        return JSONResponse({"status": "accepted", "message": "Reload requested from the supervisor"}, status_code=202)
+    
+    try:
+        new_retriever = await asyncio.to_thread(rag_modules.reload_retriever)
+    except Exception as e:
+        print(f"❌ Index reload failed: {e}")
+        return JSONResponse(
+            {"status": "error", "message": f"Reload failed: {e}"},
+            status_code=500
+        )
+    return JSONResponse({
+        "status": "success",
+        "documents": len(new_retriever.doc_ids)
+    })
+
+@app.get("/admin/stats")
+async def admin_stats(request: Request):
+    """Admission, upstream rate limit, MCP pool and job queue counters (admin only)."""
+    if not is_authenticated(request) or request.session.get("username") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return {
+        "admission": admission_stats(),
+        "mcp_pool": mcp_client.pool.snapshot() if mcp_client.pool is not None else None,
+        "jobs": {"queued": job_manager.queue_depth, "running": job_manager.running}
+    }
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and the event loop is responding."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: the retriever is loaded and the MCP pool has a warm session.
+    Upstream circuit states are reported but don't fail the probe: an upstream
+    outage affects every instance, so taking this one out of rotation wouldn't help.
+    """
+    checks = {
+        "retriever": DEMO_MODE or rag_modules.retriever is not None,
+        "mcp_pool": DEMO_MODE or mcp_client.pool is None or mcp_client.pool.warm > 0
+    }
+    ready = all(checks.values())
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks, "circuits": circuit_states()},
+        status_code=200 if ready else 503
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (latency, queue depth, external calls, image processing, caches)."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
 
 @app.post("/analyze")
 async def analyze_pages(
@@ -159,52 +332,187 @@ async def analyze_pages(
     if not is_authenticated(request):
         raise HTTPException(status_code=401, detail="Unauthorized - Please login")
     
+    pages_info = parse_pages(pages_data)
+
+    # Demo mode: canned layouts without calling Gemini / Voyage / MCP
+    if DEMO_MODE:
+        return await demo_results(pages_info)
+
+    # Wait (briefly) for global page capacity; Overloaded -> 429 + Retry-After
+    async with admission_controller.admit(len(pages_info)):
+        sources = await read_uploads(files)
+        start = time.perf_counter()
+        results = await render_pages(pages_info, sources)
+    failed = sum(1 for r in results if r["status"] != "ok")
+    print(f"✅ Rendered {len(results) - failed}/{len(results)} pages in {time.perf_counter() - start:.1f}s")
+    return {"results": results}
+
+
+@app.post("/publish")
+async def publish(request: Request):
+    """
+    Assemble a multi-page magazine from a publisher state ({"pages": [...], "articles": {...}})
+    and stream it: the <html> shell first, then each page-{i} div in page order as soon as
+    it (and every page before it) is generated.
+    """
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    try:
+        state = await request.json()
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    articles = target_articles(state) if isinstance(state, dict) else []
+    if not articles:
+        raise HTTPException(status_code=400, detail="No articles to publish")
+
+    # A publication is a standalone document (usually saved to a file): reference /media absolutely
+    origin = str(request.base_url)
+    pages = (media_store.absolutize(chunk, origin) async for chunk in stream_publication(state))
+    chunks = admitted_stream(len(articles), pages)
+    # Admission happens on the first chunk, so Overloaded still becomes a 429 before streaming starts
+    first = await chunks.__anext__()
+    return StreamingResponse(prepend(first, chunks), media_type="text/html; charset=utf-8")
+
+async def admitted_stream(pages: int, stream):
+    async with admission_controller.admit(pages):
+        async for chunk in stream:
+            yield chunk
+
+async def prepend(first, rest):
+    yield first
+    async for chunk in rest:
+        yield chunk
+
+def parse_pages(pages_data: str) -> List[dict]:
     try:
         pages_info = json.loads(pages_data)
-        if not pages_info:
-            raise HTTPException(status_code=400, detail="Pages data cannot be empty list")
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON in pages_data")
+    if not pages_info:
+        raise HTTPException(status_code=400, detail="Pages data cannot be empty list")
+    return pages_info
 
-    # ============================================================
-    # HARDCODED OVERRIDE LOGIC START
-    # ============================================================
-    import asyncio
-    print("⏳ [Override] Sleeping for 30 seconds...")
-    await asyncio.sleep(30)
+@app.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    files: List[UploadFile] = File(default=None),
+    pages_data: str = Form(...)
+):
+    """
+    Queue a layout generation job and return its id immediately.
+    Same form fields as /analyze; poll GET /jobs/{job_id} for the results.
+    """
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    pages_info = parse_pages(pages_data)
+    
+    # Uploads must be read now: the request (and its files) is gone before a worker picks the job up
+    sources = await read_uploads(files)
+    try:
+        job = job_manager.submit(request.session.get("username"), pages_info, payload=sources)
+    except JobLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    print(f"📥 [Jobs] Queued {job.id} ({len(pages_info)} pages, queue depth {job_manager.queue_depth})")
+    return JSONResponse(job.to_dict(), status_code=202, headers={"Location": f"/jobs/{job.id}"})
 
-    # Determine requested layout type
-    # We need to load both potential files
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    """Job status, progress (pages_done / pages_total) and, once done, the page results."""
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    job = job_manager.get(job_id, user=request.session.get("username"))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/pages/{page_id}")
+async def get_job_page(job_id: str, page_id: str, request: Request):
+    """
+    Result of one finished page while the job may still be running (progress events
+    replayed from history carry only the page_done summary, not the rendered page).
+    """
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    job = job_manager.get(job_id, user=request.session.get("username"))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    for result in job.results:
+        if str(result.get("page_id")) == page_id:
+            return result
+    raise HTTPException(status_code=404, detail="Page not finished")
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, request: Request):
+    """Cancel a queued or running job."""
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized - Please login")
+    job = job_manager.cancel(job_id, user=request.session.get("username"))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict(include_results=False)
+
+@app.websocket("/ws/progress/{job_id}")
+async def job_progress(websocket: WebSocket, job_id: str):
+    """
+    Live progress events for a job (page_started, images_prepared, node_started /
+    node_finished, retry, page_done, job_finished).
+    Events so far are replayed on connect; the socket closes after job_finished.
+    page_done carries the page result only when delivered live; replayed ones
+    (and all of them with several workers) don't, and the client fetches
+    GET /jobs/{job_id}/pages/{page_id}.
+    """
+    user = websocket.session.get("username") if websocket.session.get("authenticated") else None
+    job = job_manager.get(job_id, user=user) if user else None
+    if job is None:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
     try:
-        with open("datas/cover.html", "r", encoding="utf-8") as f:
-            cover_html = f.read()
-        with open("datas/article.html", "r", encoding="utf-8") as f:
-            article_html = f.read()
+        async with progress_bus.subscribe(job_id) as events:
+            if not job.active and events.empty():
+                # Finished and its history already purged
+                await websocket.send_json({"type": "job_finished", "status": job.status})
+            else:
+                while True:
+                    event = await events.get()
+                    await websocket.send_json(event)
+                    if event["type"] in TERMINAL_EVENTS:
+                        break
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+async def demo_results(pages_info: List[dict]) -> dict:
+    """Canned cover/article HTML for every page (AURA_DEMO_MODE=1)."""
+    print(f"⏳ [Demo] Sleeping for {DEMO_DELAY} seconds...")
+    await asyncio.sleep(DEMO_DELAY)
+
+    try:
+        # Loaded once and kept in memory (reloaded only if the files change)
+        cover_html = asset_cache.text("datas/cover.html")
+        article_html = asset_cache.text("datas/article.html")
     except Exception as e:
-        print(f"❌ [Override] Error reading hardcoded files: {e}")
+        print(f"❌ [Demo] Error reading canned files: {e}")
         return {"results": [{
-            "rendered_html": f"<div style='color:red'>Error reading hardcoded files: {e}</div>"
+            "rendered_html": f"<div style='color:red'>Error reading canned files: {e}</div>"
         }]}
 
     results = []
     for page in pages_info:
-        # Check specific layout for THIS page
         l_type = page.get('layout_type', 'cover')
-        print(f"📄 Processing page {page.get('id')} -> Type: {l_type}")
-        
-        target_html = cover_html if l_type == 'cover' else article_html
-        
+        print(f"📄 [Demo] Page {page.get('id')} -> Type: {l_type}")
         results.append({
             "page_id": page.get('id'),
-            "analysis": {"mode": "HARDCODED_OVERRIDE"},
+            "status": "ok",
+            "analysis": {"mode": "DEMO"},
             "recommendations": [],
-            "rendered_html": target_html
+            "rendered_html": cover_html if l_type == 'cover' else article_html
         })
-        
     return {"results": results}
-    # ============================================================
-    # HARDCODED OVERRIDE LOGIC END
-    # ============================================================
 
 if __name__ == "__main__":
     import uvicorn
@@ -3,17 +3,21 @@
 다중 이미지 지원 및 프롬프트 최적화 버전
 """
 try:
-    from mcp.server.fastmcp import FastMCP
+    from mcp.server.fastmcp import FastMCP, Context
 except ImportError:
     exit(1)
 
 import json
 import sys
 import os
+import time
+import asyncio
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from layout_style import style_from_features, vision_features
+
 # Load environment variables (for API Key)
 load_dotenv()
 
@@ -30,8 +34,45 @@ config = MockConfig()
 
 mcp = FastMCP("Nano Banana Layout Service")
 
-@mcp.tool()
-def generate_magazine_layout(
+# 측정된 팔레트가 없을 때: 타이포그래피/색상을 LLM이 결정
+LLM_STYLE_GUIDE = """**Typography** (Make it STAND OUT):
+    - Headline: BOLD and LARGE (text-5xl to text-7xl, font-black)
+    - Body: Comfortable reading (text-base, leading-relaxed)
+    - Use contrasting fonts: Serif headline + Sans body
+    
+    **COLOR MATCHING FROM IMAGE** (CRITICAL - DO NOT USE RANDOM COLORS):
+    - Use the measured "Dominant colors" (hex) in vision_summary when present
+    - Otherwise extract colors from the vision_summary keywords (e.g., "Deep blue", "Dark background")
+    - Text colors MUST complement the image's dominant colors
+    - Use the image's ACCENT COLOR extensively:
+      → Decorative lines under/beside headline
+      → Drop cap first letter
+      → Pull quote borders
+      → Page numbers and labels
+      → Divider lines between sections
+    - Examples:
+      → Blue watch image → Blue accent line under headline, blue page number
+      → Dark/moody image → White or cream text with subtle accent
+    - DO NOT use random colors like yellow on a blue image
+    - For COVER: Always use white/light text with dark gradient overlay"""
+
+
+def _fixed_style_guide(style: dict) -> str:
+    """layout_style이 결정한 스타일을 프롬프트 지시문으로 변환"""
+    quotes = "; ".join(style["key_phrases"]) or "none"
+    return f"""**Typography & Color** (FIXED - measured from the images, use exactly as given):
+    - Headline classes: {style['headline_classes']}
+    - Subheading classes: {style['subhead_classes']}
+    - Body classes: {style['body_classes']}
+    - Accent: {style['accent_color']} for text, {style['accent_border']} for lines and borders
+      → Decorative lines under/beside headline, drop cap, pull quote borders, page numbers, dividers
+    - Image palette (backgrounds and gradients only): {', '.join(style['palette'])}
+    - Key phrases to highlight with the accent: {quotes}
+    - Premium touches: {', '.join(style['premium_touches'])}
+    - DO NOT introduce other text or accent colors"""
+
+
+def _render_layout(
     headline: str, 
     body: str, 
     image_data: str, 
@@ -40,10 +81,7 @@ def generate_magazine_layout(
     design_spec: str = "{}",
     planner_intent: str = "{}"
 ) -> str:
-    """
-    LLM을 사용하여 동적으로 고품질 매거진 HTML을 생성합니다.
-    image_data는 단일 문자열(플레이스홀더)일 수도 있고, JSON 리스트 문자열일 수도 있습니다.
-    """
+    """generate_magazine_layout 본체 (동기 LLM 호출, 스레드에서 실행)"""
     print(f"🍌 [NanoBanana] Generating Layout for: {headline[:20]}...", file=sys.stderr)
 
     # 이미지 데이터 파싱 (리스트 여부 확인)
@@ -79,6 +117,11 @@ def generate_magazine_layout(
         desc = vision_data.get('description', '')
         style = vision_data.get('visual_style', 'Modern')
         vision_summary = f"Style: {style}, Keywords: {', '.join(keywords) if keywords else 'none'}, Description: {desc}"
+        if isinstance(vision_data.get('dominant_colors'), list):
+            vision_summary += (
+                f", Dominant colors: {', '.join(vision_data['dominant_colors'])}"
+                f", Brightness: {vision_data.get('brightness')}, Contrast: {vision_data.get('contrast')}"
+            )
     
     # Design Spec을 읽기 쉬운 텍스트로 변환
     design_summary = "Standard magazine layout"
@@ -123,6 +166,10 @@ def generate_magazine_layout(
         blueprint_str = "\n".join(blueprint_lines) if blueprint_lines else "No specific coordinates"
         layout_summary = f"Reference: {ref_id}\nStrategy: {strategy}\nStructure: {spatial}\n\n[BLUEPRINT HINTS]\n{blueprint_str}"
 
+    # 타이포그래피/색상: 측정된 팔레트가 있으면 layout_style로 결정 (LLM에게 맡기지 않음)
+    style = style_from_features(vision_features(vision_data), layout_override, body)
+    style_guide = _fixed_style_guide(style) if style is not None else LLM_STYLE_GUIDE
+
     # 최적화된 프롬프트: RAG 레이아웃 + 비전 컨텍스트 활용
     prompt_text = """
     You are 'Nano Banana', a specialized AI for High-End Magazine HTML/CSS generation.
@@ -388,26 +435,8 @@ def generate_magazine_layout(
     - Use text-sm for very long text to fit more content
     - Let text flow below the image rather than cutting it off
     
-    **Typography** (Make it STAND OUT):
-    - Headline: BOLD and LARGE (text-5xl to text-7xl, font-black)
-    - Body: Comfortable reading (text-base, leading-relaxed)
-    - Use contrasting fonts: Serif headline + Sans body
-    
-    **COLOR MATCHING FROM IMAGE** (CRITICAL - DO NOT USE RANDOM COLORS):
-    - Extract colors from the vision_summary keywords (e.g., "Deep blue", "Dark background")
-    - Text colors MUST complement the image's dominant colors
-    - Use the image's ACCENT COLOR extensively:
-      → Decorative lines under/beside headline
-      → Drop cap first letter
-      → Pull quote borders
-      → Page numbers and labels
-      → Divider lines between sections
-    - Examples:
-      → Blue watch image → Blue accent line under headline, blue page number
-      → Dark/moody image → White or cream text with subtle accent
-    - DO NOT use random colors like yellow on a blue image
-    - For COVER: Always use white/light text with dark gradient overlay
-    
+    {style_guide}
+
     **Visual Interest**:
     - Subtle backgrounds and gradients that match image tones
     - Decorative lines and borders in image-complementary colors
@@ -493,15 +522,52 @@ def generate_magazine_layout(
             "layout_override": layout_override,    # COVER or ARTICLE
             "vision_summary": vision_summary,      # 구조화된 텍스트
             "design_summary": design_summary,      # 구조화된 텍스트
-            "layout_summary": layout_summary       # 구조화된 텍스트
+            "layout_summary": layout_summary,      # 구조화된 텍스트
+            "style_guide": style_guide
         })
         
         print(f"🍌 [NanoBanana] Generated HTML Length: {len(html)} chars", file=sys.stderr)
         return html.replace("```html", "").replace("```", "").strip()
         
     except Exception as e:
+        # 예외를 그대로 올려 FastMCP가 isError 결과로 응답 (클라이언트가 페이지를 error로 표시)
         print(f"❌ [NanoBanana] Error: {e}", file=sys.stderr)
-        return f"<div class='p-10 text-red-500'>Error: {e}</div>"
+        raise
+
+async def _report(ctx: Context, step: int, event: dict):
+    """노드 이벤트를 MCP progress 알림(message = JSON)으로 전송 (mcp_server_langgraph와 같은 형식)"""
+    try:
+        await ctx.report_progress(step, 2, message=json.dumps(event, ensure_ascii=False))
+    except Exception as e:
+        print(f"⚠️ [NanoBanana] Progress notification failed: {e}", file=sys.stderr)
+
+@mcp.tool()
+async def generate_magazine_layout(
+    headline: str, 
+    body: str, 
+    image_data: str, 
+    layout_override: str = "None",
+    vision_context: str = "{}",
+    design_spec: str = "{}",
+    planner_intent: str = "{}",
+    ctx: Context = None
+) -> str:
+    """
+    LLM을 사용하여 동적으로 고품질 매거진 HTML을 생성합니다.
+    image_data는 단일 문자열(플레이스홀더)일 수도 있고, JSON 리스트 문자열일 수도 있습니다.
+    단일 프롬프트라 진행 상황은 html_generator 노드의 시작/종료만 MCP progress 알림으로 전송됩니다.
+    """
+    if ctx is not None:
+        await _report(ctx, 1, {"type": "node_started", "node": "html_generator"})
+    start = time.perf_counter()
+    html = await asyncio.to_thread(
+        _render_layout, headline, body, image_data, layout_override,
+        vision_context, design_spec, planner_intent
+    )
+    if ctx is not None:
+        await _report(ctx, 2, {"type": "node_finished", "node": "html_generator",
+                               "elapsed": round(time.perf_counter() - start, 2)})
+    return html
 
 if __name__ == "__main__":
     mcp.run()
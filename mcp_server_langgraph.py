@@ -3,19 +3,24 @@
 LangGraph를 사용한 멀티 노드 아키텍처
 """
 try:
-    from mcp.server.fastmcp import FastMCP
+    from mcp.server.fastmcp import FastMCP, Context
 except ImportError:
     exit(1)
 
 import json
 import sys
 import os
-from typing import TypedDict, List, Optional, Annotated
+import time
+import asyncio
+import contextvars
+from typing import TypedDict, List, Optional, Annotated, Callable
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from langgraph.graph import StateGraph, END
 
+from layout_style import style_from_features, vision_features
+
 load_dotenv()
 
 # ============================================================
@@ -43,6 +48,7 @@ class MagazineState(TypedDict):
     image_placeholders: List[str]
     layout_override: str  # COVER or ARTICLE
     vision_summary: str
+    vision_features: Optional[dict]  # 이미지에서 측정한 팔레트/밝기/대비 (image_validator.summarize_features)
     design_summary: str
     layout_summary: str
     
@@ -288,8 +294,24 @@ Return JSON with your decision:
 # ============================================================
 # NODE 3: Typography Styler
 # ============================================================
+def _style_from_features(state: MagazineState) -> Optional[dict]:
+    """측정된 이미지 팔레트로 타이포그래피/색상 결정 (layout_style, LLM 호출 없음). 팔레트가 없으면 None"""
+    return style_from_features(state.get("vision_features"), state["layout_override"], state["body"])
+
+
 def typography_styler_node(state: MagazineState) -> MagazineState:
     """폰트, 색상, 강조 스타일 결정"""
+    # 이미지 팔레트가 측정되어 있으면 결정적으로 처리 (LLM 호출 생략)
+    style = _style_from_features(state)
+    if style is not None:
+        print(f"🎨 [Node 3] Typography Styler: Using measured image palette...", file=sys.stderr)
+        print(f"   🎨 Palette: {style['palette']}", file=sys.stderr)
+        print(f"   🎨 Accent Color: {style['accent_color']}", file=sys.stderr)
+        print(f"   💬 Key Phrases: {len(style['key_phrases'])} found", file=sys.stderr)
+        print(f"   ✅ Result: TYPOGRAPHY_COMPLETE (no LLM call)", file=sys.stderr)
+        state["typography_style"] = style
+        return state
+    
     llm = config.get_llm(temperature=0.5)
     
     prompt = ChatPromptTemplate.from_template("""
@@ -314,7 +336,7 @@ Page Type: {layout_override}
 - Use contrasting fonts: Serif headline + Sans body
 
 **COLOR MATCHING FROM IMAGE**:
-- Extract colors from vision_summary keywords
+- Use the measured "Dominant colors" in vision_summary when present, else infer from keywords
 - Text colors MUST complement image's dominant colors
 - Use ACCENT COLOR for: decorative lines, drop cap, pull quote borders, page numbers
 
@@ -656,8 +678,9 @@ APPLY THESE FIXES NOW:
         state["html_output"] = html
         
     except Exception as e:
+        # 오류 HTML을 결과로 넘기지 않고 그래프를 실패시킴 (도구 결과가 isError가 됨)
         print(f"❌ [Node 4] Error: {e}", file=sys.stderr)
-        state["html_output"] = f"<div class='p-10 text-red-500'>Error: {e}</div>"
+        raise
     
     return state
 
@@ -919,6 +942,39 @@ def quality_check_router(state: MagazineState) -> str:
         print(f"🔄 [Router] Retrying HTML generation... (attempt {retry_count + 1}/3)", file=sys.stderr)
         return "retry"
 
+# ============================================================
+# Progress Events: 노드 시작/종료, 재시도를 MCP progress 알림으로 전달
+# ============================================================
+# 현재 실행 중인 그래프의 이벤트 수신자 (그래프는 워커 스레드에서 실행되므로 thread-safe 해야 함)
+_progress_sink: contextvars.ContextVar[Optional[Callable[[dict], None]]] = contextvars.ContextVar(
+    "progress_sink", default=None
+)
+
+def _emit(event: dict):
+    sink = _progress_sink.get()
+    if sink is not None:
+        sink(event)
+
+def _traced(name: str, node):
+    """노드 실행 전후로 node_started / node_finished (+ 품질 검사 실패 시 retry) 이벤트 발행"""
+    def run(state: MagazineState) -> MagazineState:
+        _emit({"type": "node_started", "node": name})
+        start = time.perf_counter()
+        state = node(state)
+        _emit({"type": "node_finished", "node": name, "elapsed": round(time.perf_counter() - start, 2)})
+        
+        if name == "html_quality_checker":
+            check = state.get("html_quality_check") or {}
+            # quality_check_router와 같은 조건: 실패 + 재시도 3회 미만이면 html_generator로 돌아감
+            if not check.get("passed", False) and state.get("retry_count", 0) < 3:
+                _emit({
+                    "type": "retry",
+                    "attempt": state.get("retry_count", 0),
+                    "issues": check.get("issues", [])
+                })
+        return state
+    return run
+
 # ============================================================
 # Build LangGraph
 # ============================================================
@@ -926,16 +982,16 @@ def build_magazine_graph():
     graph = StateGraph(MagazineState)
     
     # Guard nodes
-    graph.add_node("intent_classifier", intent_classifier_node)
-    graph.add_node("content_filter", content_filter_node)
+    graph.add_node("intent_classifier", _traced("intent_classifier", intent_classifier_node))
+    graph.add_node("content_filter", _traced("content_filter", content_filter_node))
     
     # Processing nodes
-    graph.add_node("image_analyzer", image_analyzer_node)
-    graph.add_node("layout_planner", layout_planner_node)
-    graph.add_node("typography_styler", typography_styler_node)
-    graph.add_node("html_generator", html_generator_node)
-    graph.add_node("validator", validator_node)
-    graph.add_node("html_quality_checker", html_quality_checker_node)
+    graph.add_node("image_analyzer", _traced("image_analyzer", image_analyzer_node))
+    graph.add_node("layout_planner", _traced("layout_planner", layout_planner_node))
+    graph.add_node("typography_styler", _traced("typography_styler", typography_styler_node))
+    graph.add_node("html_generator", _traced("html_generator", html_generator_node))
+    graph.add_node("validator", _traced("validator", validator_node))
+    graph.add_node("html_quality_checker", _traced("html_quality_checker", html_quality_checker_node))
     
     # Entry point
     graph.set_entry_point("intent_classifier")
@@ -966,23 +1022,64 @@ def build_magazine_graph():
 # Global graph instance
 magazine_graph = build_magazine_graph()
 
+def _invoke_graph(initial_state: MagazineState, sink: Callable[[dict], None]) -> MagazineState:
+    """워커 스레드에서 그래프 실행 (노드 이벤트는 sink로 전달)"""
+    token = _progress_sink.set(sink)
+    try:
+        return magazine_graph.invoke(initial_state)
+    finally:
+        _progress_sink.reset(token)
+
+async def _run_graph_with_progress(initial_state: MagazineState, ctx: Optional[Context]) -> MagazineState:
+    """
+    그래프를 스레드에서 실행하면서 노드 이벤트를 MCP progress 알림(message = JSON)으로 중계
+    클라이언트가 progress 토큰을 보내지 않았으면 report_progress는 아무것도 하지 않음
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def sink(event: dict):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+    
+    async def relay():
+        step = 0
+        while True:
+            event = await events.get()
+            if event is None:
+                return
+            step += 1
+            try:
+                await ctx.report_progress(step, message=json.dumps(event, ensure_ascii=False))
+            except Exception as e:
+                print(f"⚠️ [AURA] Progress notification failed: {e}", file=sys.stderr)
+    
+    relay_task = asyncio.create_task(relay()) if ctx is not None else None
+    try:
+        return await asyncio.to_thread(_invoke_graph, initial_state, sink)
+    finally:
+        if relay_task is not None:
+            events.put_nowait(None)
+            await relay_task
+
 # ============================================================
 # MCP Interface
 # ============================================================
 mcp = FastMCP("AURA Layout Service (LangGraph)")
 
 @mcp.tool()
-def generate_magazine_layout(
+async def generate_magazine_layout(
     headline: str, 
     body: str, 
     image_data: str, 
     layout_override: str = "None",
     vision_context: str = "{}",
     design_spec: str = "{}",
-    planner_intent: str = "{}"
+    planner_intent: str = "{}",
+    ctx: Context = None
 ) -> str:
     """
     LangGraph 멀티 노드를 사용하여 동적으로 고품질 매거진 HTML을 생성합니다.
+    노드 진행 상황은 MCP progress 알림으로 전송됩니다.
     """
     print(f"🍌 [AURA LangGraph] Generating Layout for: {headline[:20]}...", file=sys.stderr)
 
@@ -1015,6 +1112,14 @@ def generate_magazine_layout(
         desc = vision_data.get('description', '')
         style = vision_data.get('visual_style', 'Modern')
         vision_summary = f"Style: {style}, Keywords: {', '.join(keywords) if keywords else 'none'}, Description: {desc}"
+        if isinstance(vision_data.get('dominant_colors'), list):
+            vision_summary += (
+                f", Dominant colors: {', '.join(vision_data['dominant_colors'])}"
+                f", Brightness: {vision_data.get('brightness')}, Contrast: {vision_data.get('contrast')}"
+            )
+    
+    # 측정된 이미지 특징 (팔레트가 있으면 Typography 노드가 LLM 없이 결정)
+    features = vision_features(vision_data)
     
     design_summary = "Standard magazine layout"
     if design_data:
@@ -1038,6 +1143,7 @@ def generate_magazine_layout(
         "image_placeholders": images_list,
         "layout_override": layout_override,
         "vision_summary": vision_summary,
+        "vision_features": features,
         "design_summary": design_summary,
         "layout_summary": layout_summary,
         "intent_valid": None,
@@ -1055,7 +1161,7 @@ def generate_magazine_layout(
 
     try:
         # Run the graph
-        final_state = magazine_graph.invoke(initial_state)
+        final_state = await _run_graph_with_progress(initial_state, ctx)
         
         html = final_state.get("final_html", "")
         validation = final_state.get("validation_result", {})
@@ -1069,8 +1175,9 @@ def generate_magazine_layout(
         return html
         
     except Exception as e:
+        # 예외를 그대로 올려 FastMCP가 isError 결과로 응답 (클라이언트가 페이지를 error로 표시)
         print(f"❌ [AURA] Graph Error: {e}", file=sys.stderr)
-        return f"<div class='p-10 text-red-500'>Error: {e}</div>"
+        raise
 
 if __name__ == "__main__":
     mcp.run()
@@ -1,6 +1,10 @@
 """
 [MCP Server] Google Nano Banana - Dynamic Layout Engine
 다중 이미지 지원 및 프롬프트 최적화 버전
+
+백업용 서버: MCP progress 알림을 보내지 않으므로 /ws/progress에는 노드 이벤트 없이
+page_started / images_prepared / page_done만 표시됩니다 (진행 상황은 mcp_server.py,
+mcp_server_langgraph.py 사용).
 """
 try:
     from mcp.server.fastmcp import FastMCP
@@ -500,8 +504,9 @@ def generate_magazine_layout(
         return html.replace("```html", "").replace("```", "").strip()
         
     except Exception as e:
+        # 예외를 그대로 올려 FastMCP가 isError 결과로 응답 (클라이언트가 페이지를 error로 표시)
         print(f"❌ [NanoBanana] Error: {e}", file=sys.stderr)
-        return f"<div class='p-10 text-red-500'>Error: {e}</div>"
+        raise
 
 if __name__ == "__main__":
     mcp.run()
@@ -0,0 +1,152 @@
+"""
+[Media Store Module]
+처리된 이미지를 콘텐츠 해시로 저장하고 /media/{hash}.{ext} URL로 제공하는 모듈입니다.
+
+HTML에 data URI를 인라인하는 대신 URL을 참조하므로
+- 응답 HTML 크기가 수백 KB → 수 KB로 줄고
+- 이미지는 브라우저에 장기 캐시되며 (내용이 바뀌면 URL도 바뀜)
+- 플레이스홀더 치환(str.replace) 비용도 작아집니다.
+
+URL은 immutable로 캐시되지만 저장소는 LRU이므로, 마지막 계층(MEDIA_DIR가 있으면 디스크,
+없으면 메모리)은 최근 MEDIA_MIN_AGE초(기본 JOB_TTL) 안에 쓰이거나 조회된 항목을 한도를 넘어도
+지우지 않습니다 → 작업 결과가 보관되는 동안 그 HTML의 이미지 참조는 유효합니다.
+그보다 오래 보관할 HTML은 다운로드 시 이미지를 data URI로 인라인합니다 (static/index.html).
+이미지 MIME(EXTENSIONS)만 저장하므로 임의 바이트가 자체 도메인 URL로 제공되지 않습니다.
+"""
+
+import io
+import os
+import re
+import base64
+import hashlib
+from typing import Optional, Tuple, Dict, Any
+
+from PIL import Image
+
+from image_validator import ImageCache
+
+# HTML 속성/CSS url() 안의 상대 미디어 참조
+MEDIA_REF = re.compile(r'(?<=["\'(])/media/')
+
+# 확장자 <-> MIME
+EXTENSIONS = {
+    "image/webp": "webp",
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+}
+
+
+class MediaStore:
+    """
+    콘텐츠 주소 기반 미디어 저장소
+
+    같은 바이트는 항상 같은 URL을 가지므로 한 번만 저장되고,
+    메모리 LRU + 디스크 계층(ImageCache)을 사용하여 여러 워커/재시작 간에도 공유됩니다.
+    """
+
+    # 콘텐츠 해시 URL이므로 내용이 절대 바뀌지 않음 → 1년 immutable 캐시
+    CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, disk_dir: Optional[str] = None, base_url: str = "",
+                 disk_max_bytes: Optional[int] = None, min_age: float = 0.0):
+        """
+        Args:
+            max_bytes: 메모리 계층 최대 바이트 수
+            disk_dir: 디스크 계층 디렉토리 (None이면 메모리만 사용)
+            base_url: URL 접두사 (다운로드한 HTML에서도 이미지가 보이도록 절대 주소를 쓸 때 사용)
+            disk_max_bytes: 디스크 계층 최대 바이트 수 (초과 시 오래 사용하지 않은 파일부터 삭제)
+            min_age: 최근 이 시간(초) 안에 쓰인 항목은 한도를 넘어도 마지막 계층에서 삭제하지 않음
+        """
+        self._store = ImageCache(max_bytes=max_bytes, disk_dir=disk_dir, disk_max_bytes=disk_max_bytes,
+                                 min_age=min_age)
+        self.base_url = base_url.rstrip("/")
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self._store.stats
+
+    def put(self, data: bytes, mime: str) -> str:
+        """
+        바이트를 저장하고 URL을 반환 (이미 있으면 저장 생략)
+        해시 계산과 디스크 쓰기를 하므로 이벤트 루프에서는 asyncio.to_thread로 호출
+        
+        Raises:
+            ValueError: 이미지 MIME(EXTENSIONS)이 아님
+        """
+        if mime not in EXTENSIONS:
+            raise ValueError(f"Unsupported media type: {mime}")
+        key = hashlib.sha256(data).hexdigest()[:32]
+        # 존재 확인은 적중/미스 통계에 넣지 않음 (통계는 /media 조회 기준)
+        if not self._store.contains(key):
+            self._store.put(key, data, {"mime": mime})
+        return f"{self.base_url}/media/{key}.{EXTENSIONS[mime]}"
+
+    def absolutize(self, html: str, origin: str) -> str:
+        """
+        HTML의 상대 /media/ 참조를 origin 기준 절대 URL로 변환
+        (파일로 저장된 HTML에서도 이미지가 보이도록; base_url이 설정되어 있으면 이미 절대 주소)
+        """
+        if self.base_url:
+            return html
+        return MEDIA_REF.sub(origin.rstrip("/") + "/media/", html)
+
+    def get(self, name: str) -> Optional[Tuple[bytes, str, str]]:
+        """
+        Args:
+            name: "{hash}.{ext}" 형식의 파일명
+
+        Returns:
+            (bytes, mime, etag) 또는 None
+        """
+        key = name.split(".", 1)[0]
+        if len(key) != 32 or not all(c in "0123456789abcdef" for c in key):
+            return None
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        data, meta = entry
+        if meta.get("mime") not in EXTENSIONS:
+            # 이전 버전이 저장한 비이미지 항목은 제공하지 않음
+            return None
+        return data, meta["mime"], f'"{key}"'
+
+    def url_for_src(self, src: str) -> str:
+        """
+        이미지 src 문자열을 미디어 URL로 변환
+        http(s) URL은 그대로, data URI / 순수 Base64는 디코딩하여 저장 후 URL 반환
+        
+        Raises:
+            ValueError: 디코딩할 수 없거나 지원하는 이미지 형식이 아님 (선언된 MIME이 아니라 내용으로 판별)
+        """
+        if src.startswith(("http://", "https://", "/")):
+            return src
+
+        mime = None
+        b64_data = src
+        if src.startswith("data:"):
+            header, b64_data = src.split(",", 1)
+            mime = header[5:].split(";", 1)[0] or None
+        data = base64.b64decode(b64_data)
+        # 선언된 MIME은 믿지 않음: 이미지로 열리는 바이트만 그 형식으로 저장
+        return self.put(data, self._sniff_mime(data))
+
+    def _sniff_mime(self, data: bytes) -> str:
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                return Image.MIME.get(img.format, "application/octet-stream")
+        except Exception:
+            return "application/octet-stream"
+
+
+# 전역 인스턴스
+# MEDIA_DIR: 디스크 계층 (기본 ./media_cache, 빈 값이면 메모리만), MEDIA_BASE_URL: URL 접두사
+# MEDIA_DISK_MAX_MB: 디스크 계층 한도 (기본 2048MB)
+# MEDIA_MIN_AGE: 한도를 넘어도 유지하는 최근 사용 기간 (초, 기본 JOB_TTL)
+media_store = MediaStore(
+    max_bytes=int(os.getenv("MEDIA_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    disk_dir=os.getenv("MEDIA_DIR", "./media_cache") or None,
+    base_url=os.getenv("MEDIA_BASE_URL", ""),
+    disk_max_bytes=int(os.getenv("MEDIA_DISK_MAX_MB", "2048")) * 1024 * 1024,
+    min_age=float(os.getenv("MEDIA_MIN_AGE", os.getenv("JOB_TTL", "3600")))
+)
@@ -0,0 +1,270 @@
+"""
+[Metrics]
+Prometheus metrics for the FastAPI service, exposed at /metrics.
+
+- HTTP request latency per route template (histogram) and requests in flight
+- Latency and error counts per external call type
+  (gemini_analyze, voyage_embed, chroma_query, mcp_call)
+- Image processing time and bytes in/out
+- Query encode micro-batching: time queued before encode and queries per batch
+- Gauges for in-flight pages, queue depths and cache hit rates (read on scrape)
+
+prometheus_client is optional: without it every metric is a no-op and
+/metrics reports that the exporter is unavailable.
+
+Under the multi-worker launcher PROMETHEUS_MULTIPROC_DIR is set and every
+worker writes its samples there; a scrape of any worker aggregates all of
+them. Scrape-time gauges and cache counters are then refreshed periodically
+by each worker (refresh_loop) instead of read on scrape, and summed over live
+workers. The cache hit ratio is not exported in that mode (derive it from
+aura_cache_requests_total).
+"""
+
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+try:
+    from prometheus_client import (
+        Counter, Gauge, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+    )
+    from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily, REGISTRY
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+# Must be set before prometheus_client is imported (serve.py does this)
+MULTIPROCESS = PROMETHEUS_AVAILABLE and bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def dec(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def set_function(self, *args, **kwargs):
+        pass
+
+
+def _metric(cls_name: str, *args, **kwargs):
+    if not PROMETHEUS_AVAILABLE:
+        return _NoopMetric()
+    if cls_name == "Gauge":
+        # Sum over live workers (ignored outside multiprocess mode)
+        kwargs.setdefault("multiprocess_mode", "livesum")
+    return {"Counter": Counter, "Gauge": Gauge, "Histogram": Histogram}[cls_name](*args, **kwargs)
+
+
+# LLM / layout calls take seconds to minutes; local work milliseconds
+EXTERNAL_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+HTTP_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600)
+IMAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+HTTP_LATENCY = _metric(
+    "Histogram", "aura_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], buckets=HTTP_BUCKETS
+)
+HTTP_IN_FLIGHT = _metric("Gauge", "aura_http_requests_in_flight", "HTTP requests being handled")
+
+EXTERNAL_LATENCY = _metric(
+    "Histogram", "aura_external_call_duration_seconds", "External call latency",
+    ["call"], buckets=EXTERNAL_BUCKETS
+)
+EXTERNAL_ERRORS = _metric("Counter", "aura_external_call_errors_total", "External call errors", ["call"])
+
+IMAGE_PROCESSING = _metric(
+    "Histogram", "aura_image_processing_seconds", "Time to prepare one image (probe to encode)",
+    ["result"], buckets=IMAGE_BUCKETS
+)
+IMAGE_BYTES = _metric("Counter", "aura_image_bytes_total", "Image bytes read and produced", ["direction"])
+
+ENCODE_QUEUE_WAIT = _metric(
+    "Histogram", "aura_encode_queue_wait_seconds", "Time a query waited for its encode batch",
+    buckets=IMAGE_BUCKETS
+)
+ENCODE_BATCH_SIZE = _metric(
+    "Histogram", "aura_encode_batch_size", "Queries per encode batch", buckets=BATCH_SIZE_BUCKETS
+)
+
+
+@contextmanager
+def track_external(call: str):
+    """Time an external call and count it as an error if the block raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        EXTERNAL_ERRORS.labels(call=call).inc()
+        raise
+    finally:
+        EXTERNAL_LATENCY.labels(call=call).observe(time.perf_counter() - start)
+
+
+def observe_image(seconds: float, result: str, bytes_in: int = 0, bytes_out: int = 0):
+    IMAGE_PROCESSING.labels(result=result).observe(seconds)
+    if bytes_in:
+        IMAGE_BYTES.labels(direction="in").inc(bytes_in)
+    if bytes_out:
+        IMAGE_BYTES.labels(direction="out").inc(bytes_out)
+
+
+def observe_encode_batch(waits: List[float]):
+    """Record one encode batch: the queue wait (seconds) of each of its queries."""
+    ENCODE_BATCH_SIZE.observe(len(waits))
+    for waited in waits:
+        ENCODE_QUEUE_WAIT.observe(waited)
+
+
+_gauges: Dict[str, Tuple[object, Callable[[], float]]] = {}
+
+
+def gauge_function(name: str, documentation: str, fn: Callable[[], float]):
+    """Gauge whose value is read from fn() at scrape time (queue depths, in-flight counts)."""
+    if name not in _gauges:
+        gauge = _metric("Gauge", name, documentation)
+        if not MULTIPROCESS:
+            gauge.set_function(fn)
+        _gauges[name] = (gauge, fn)
+
+
+# cache name -> fn returning its stats dict ({"hits", "misses", ...})
+_caches: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+
+def register_cache(name: str, stats_fn: Callable[[], Dict[str, float]]):
+    """Export a cache's hit/miss counters and hit ratio. stats_fn must be cheap."""
+    _caches[name] = stats_fn
+
+
+def _cache_hits_misses(stats: Dict[str, float]) -> Tuple[float, float]:
+    hits = stats.get("hits", 0) + stats.get("disk_hits", 0)
+    return hits, stats.get("misses", 0)
+
+
+if PROMETHEUS_AVAILABLE and not MULTIPROCESS:
+    class _CacheCollector:
+        def collect(self):
+            requests = CounterMetricFamily("aura_cache_requests", "Cache lookups by result", labels=["cache", "result"])
+            ratio = GaugeMetricFamily("aura_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+            for name, stats_fn in _caches.items():
+                try:
+                    stats = stats_fn()
+                except Exception:
+                    continue
+                hits, misses = _cache_hits_misses(stats)
+                requests.add_metric([name, "hit"], hits)
+                requests.add_metric([name, "miss"], misses)
+                ratio.add_metric([name], hits / (hits + misses) if hits + misses else 0.0)
+            yield requests
+            yield ratio
+
+    REGISTRY.register(_CacheCollector())
+
+CACHE_REQUESTS = _metric("Counter", "aura_cache_requests", "Cache lookups by result", ["cache", "result"]) \
+    if MULTIPROCESS else _NoopMetric()
+_cache_exported: Dict[Tuple[str, str], float] = {}
+
+
+def refresh_gauges():
+    """
+    Multiprocess mode: copy scrape-time gauges and cache counters into this
+    worker's sample files (counters advance by the delta since the last refresh).
+    """
+    if not MULTIPROCESS:
+        return
+    for gauge, fn in _gauges.values():
+        try:
+            gauge.set(fn())
+        except Exception:
+            pass
+    for name, stats_fn in _caches.items():
+        try:
+            hits, misses = _cache_hits_misses(stats_fn())
+        except Exception:
+            continue
+        for result, value in (("hit", hits), ("miss", misses)):
+            delta = value - _cache_exported.get((name, result), 0)
+            if delta > 0:
+                CACHE_REQUESTS.labels(cache=name, result=result).inc(delta)
+                _cache_exported[(name, result)] = value
+
+
+async def refresh_loop(interval: float = 5.0):
+    """Per-worker background task keeping refresh_gauges() current (multiprocess mode only)."""
+    while MULTIPROCESS:
+        refresh_gauges()
+        await asyncio.sleep(interval)
+
+
+def mark_process_dead(pid: int):
+    """Drop a dead worker's live gauges (called by the supervisor)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Body and content type for the /metrics response."""
+    if not PROMETHEUS_AVAILABLE:
+        return b"# prometheus_client is not installed\n", "text/plain; charset=utf-8"
+    if MULTIPROCESS:
+        refresh_gauges()
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def _route_label(scope) -> str:
+    """Route template (/jobs/{job_id}) rather than the raw path, to keep label cardinality bounded."""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if "endpoint" not in scope:
+        return "unmatched"
+    path = scope["path"]
+    for key, value in scope.get("path_params", {}).items():
+        path = path.replace(str(value), "{" + key + "}")
+    return path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and requests in flight."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_LATENCY.labels(
+                method=scope["method"], route=_route_label(scope), status=str(status["code"])
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,193 @@
+"""
+[Page Pipeline]
+Runs the full layout pipeline for a multi-page request:
+    analyze_page (Gemini) -> retriever.search (Voyage) -> aura_render (MCP)
+
+Pages run concurrently under PAGE_CONCURRENCY, each with its own timeout, so a
+magazine takes about as long as its slowest page. A failed or timed-out page
+comes back as an error entry instead of failing the whole request.
+"""
+
+import os
+import time
+import asyncio
+from typing import List, Dict, Any, Optional, Callable
+
+import rag_voyage as rag_modules
+from image_validator import ImageSource, ImageDeduplicator, ImageValidator, image_validator
+
+
+# Max pages rendered at once per request, and the wall-clock limit for one page
+# (the MCP call alone may take up to 300s)
+PAGE_CONCURRENCY = int(os.getenv("PAGE_CONCURRENCY", "4"))
+PAGE_TIMEOUT = float(os.getenv("PAGE_TIMEOUT", "330"))
+# Gemini only needs a preview of each image for mood/category analysis
+ANALYSIS_IMAGE_SIZE = int(os.getenv("ANALYSIS_IMAGE_SIZE", "768"))
+SEARCH_TOP_K = 3
+
+
+async def read_uploads(files: Optional[List[Any]]) -> List[Optional[ImageSource]]:
+    """
+    Read uploaded files into ImageSources (header only, no pixel decode yet).
+    Unreadable or oversized uploads become None so page image indices stay aligned.
+    """
+    sources = []
+    for i, upload in enumerate(files or []):
+        try:
+            sources.append(await ImageSource.from_upload(upload, max_bytes=ImageValidator.MAX_SOURCE_BYTES))
+        except Exception as e:
+            print(f"⚠️ [Upload {i}] Skipped {getattr(upload, 'filename', '')}: {e}")
+            sources.append(None)
+    return sources
+
+
+def _analysis_previews(images: List[ImageSource]) -> List[Any]:
+    """Small RGB previews for Gemini; over-budget images are skipped without decoding."""
+    return [
+        source.thumbnail(ANALYSIS_IMAGE_SIZE)
+        for source in images
+        if image_validator.validate_image(source)["is_valid"]
+    ]
+
+
+def _build_query(analysis: Dict[str, Any]) -> str:
+    keywords = ", ".join(analysis.get("visual_keywords", []))
+    return (
+        f"{analysis.get('mood', '')} {analysis.get('category', '')} magazine layout, "
+        f"{analysis.get('type', '')}. {analysis.get('description', '')} {keywords}"
+    ).strip()
+
+
+async def render_page(
+    page: Dict[str, Any],
+    images: List[ImageSource],
+    dedup: Optional[ImageDeduplicator] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Analyze one page, retrieve a reference layout and render it. Raises on failure,
+    including layout generation failures (CircuitOpen, asyncio.TimeoutError,
+    LayoutGenerationError from the MCP client).
+    """
+    analyzer = rag_modules.analyzer
+    # Read the global once: a hot reload mid-request doesn't change this page's snapshot
+    retriever = rag_modules.retriever
+    if analyzer is None or retriever is None:
+        raise RuntimeError("RAG modules are not initialized")
+
+    title = page.get("title", "Untitled")
+    body = page.get("body", "")
+    layout_type = page.get("layout_type", "article")
+
+    previews = await asyncio.to_thread(_analysis_previews, images)
+    analysis = await analyzer.aanalyze_page(previews, title, body)
+
+    query = _build_query(analysis)
+    filters = {"type": "Cover" if layout_type == "cover" else "Article"}
+    recommendations = await retriever.asearch(query, filters=filters, top_k=SEARCH_TOP_K)
+    if not recommendations:
+        recommendations = await retriever.asearch(query, top_k=SEARCH_TOP_K)
+
+    layout_data = retriever.get_layout(recommendations[0]["image_id"]) if recommendations else {}
+    html = await analyzer.aura_render(
+        layout_data or {},
+        {
+            "title": title,
+            "body": body,
+            "analysis": analysis,
+            "images": images,
+            "layout_type": layout_type
+        },
+        dedup=dedup,
+        on_event=on_event
+    )
+    if not html:
+        raise RuntimeError("Layout generation returned no HTML")
+
+    return {
+        "analysis": analysis,
+        "recommendations": recommendations,
+        "rendered_html": html
+    }
+
+
+def _error_html(message: str) -> str:
+    return f"<div style='color:red'>{message}</div>"
+
+
+async def render_pages(
+    pages_info: List[Dict[str, Any]],
+    sources: List[Optional[ImageSource]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Render every page concurrently and return one result per page, in page order.
+
+    Each result has page_id, status ("ok" / "error" / "timeout"), elapsed, analysis,
+    recommendations and rendered_html (an error notice for failed pages). Timeouts,
+    the page's or the MCP call's, are "timeout"; any other exception, including an
+    open circuit, is "error".
+    on_result, if given, is called with each page's result as soon as it finishes.
+    on_event, if given, receives progress events tagged with page_id
+    (page_started, images_prepared, node_started / node_finished / retry, page_done).
+    """
+    limit = asyncio.Semaphore(concurrency or PAGE_CONCURRENCY)
+    timeout = timeout or PAGE_TIMEOUT
+    # One deduplicator per request: the same photo on several pages is prepared once
+    dedup = ImageDeduplicator()
+
+    # ImageSource objects aren't shared between concurrent pages: an upload referenced
+    # by several pages gets its own (header-only) source per extra reference
+    claimed = set()
+
+    def page_images(page: Dict[str, Any]) -> List[ImageSource]:
+        images = []
+        for i in page.get("image_indices", []):
+            if not (isinstance(i, int) and 0 <= i < len(sources)) or sources[i] is None:
+                continue
+            if i in claimed and sources[i].data is not None:
+                images.append(ImageSource.from_bytes(sources[i].data))
+            else:
+                images.append(sources[i])
+                claimed.add(i)
+        return images
+
+    async def run(page: Dict[str, Any], images: List[ImageSource]) -> Dict[str, Any]:
+        page_id = page.get("id")
+        result = {"page_id": page_id, "status": "ok", "analysis": {}, "recommendations": []}
+
+        def emit(event: Dict[str, Any]):
+            if on_event:
+                on_event({"page_id": page_id, **event})
+
+        async with limit:
+            start = time.perf_counter()
+            print(f"📄 Processing page {page_id} -> Type: {page.get('layout_type')}, {len(images)} image(s)")
+            emit({"type": "page_started"})
+            try:
+                result.update(await asyncio.wait_for(render_page(page, images, dedup, emit), timeout=timeout))
+            except asyncio.TimeoutError as e:
+                # The page deadline, or the MCP call's own timeout
+                message = str(e) or f"Timed out after {timeout:g}s"
+                print(f"⏱️ Page {page_id} timed out: {message}")
+                result.update(status="timeout", error=message,
+                              rendered_html=_error_html(f"Page {page_id} timed out. Please try again."))
+            except Exception as e:
+                print(f"❌ Page {page_id} failed: {e}")
+                result.update(status="error", error=str(e),
+                              rendered_html=_error_html(f"Page {page_id} failed: {e}"))
+            result["elapsed"] = round(time.perf_counter() - start, 2)
+        if on_result:
+            on_result(result)
+        emit({"type": "page_done", "status": result["status"], "result": result})
+        return result
+
+    try:
+        return list(await asyncio.gather(*(run(page, page_images(page)) for page in pages_info)))
+    finally:
+        for source in sources:
+            if source is not None:
+                source.release()
@@ -0,0 +1,116 @@
+"""
+[Progress Events]
+In-process pub/sub for pipeline progress, relayed to browsers over /ws/progress/{channel}.
+
+Events are small dicts with a "type" (page_started, images_prepared, node_started,
+node_finished, retry, page_done, job_finished) plus page_id and type-specific fields.
+Each channel (a job id) keeps a bounded history that is replayed to late subscribers,
+so a client that connects after the job started still sees every page that finished.
+Bulky fields (DETACHED_FIELDS, e.g. the rendered page in page_done["result"]) are
+only handed to subscribers connected when the event is published; history and the
+shared store keep the event without them, and replayed clients fetch the page result
+from the job instead (GET /jobs/{job_id}/pages/{page_id}).
+
+Under the multi-worker launcher events also go to the shared state store and
+subscribers read them from there, so a socket can be served by any worker.
+"""
+
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional, Set
+
+from shared_state import SharedState, shared_state
+
+# Events that end a channel's stream
+TERMINAL_EVENTS = ("job_finished",)
+# Event fields sent live only, never kept in history or the store
+DETACHED_FIELDS = ("result",)
+
+
+class ProgressBus:
+    def __init__(self, history: int = 256, ttl: float = 900.0, queue_size: int = 1024,
+                 store: Optional[SharedState] = None, poll_interval: float = 0.25):
+        """
+        Args:
+            history: events kept per channel for replay
+            ttl: seconds an idle channel's history is kept
+            queue_size: events buffered per subscriber (a stalled client drops events beyond this)
+            store: shared state that events are written to and subscribers poll (None = in-process only)
+            poll_interval: seconds between store polls per subscriber
+        """
+        self.store = store
+        self.poll_interval = poll_interval
+        self.history = history
+        self.ttl = ttl
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._history: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._updated: Dict[str, float] = {}
+
+    def publish(self, channel: str, event: Dict[str, Any]):
+        """Record an event and hand it to current subscribers. Never blocks."""
+        event = {"ts": round(time.time(), 3), **event}
+        summary = {key: value for key, value in event.items() if key not in DETACHED_FIELDS}
+        if self.store is not None:
+            self.store.submit(self.store.append_event, channel, summary)
+            return
+        self._history.setdefault(channel, deque(maxlen=self.history)).append(summary)
+        self._updated[channel] = time.monotonic()
+        for queue in self._subscribers.get(channel, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+        self._purge_expired()
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        """Queue receiving the channel's past events followed by new ones."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.store is not None:
+            # Seed with what is already stored so callers can tell an empty channel apart
+            seq = 0
+            for seq, event in await asyncio.to_thread(self.store.events_after, channel, 0, self.queue_size):
+                queue.put_nowait(event)
+            poller = asyncio.create_task(self._poll_store(channel, queue, seq))
+            try:
+                yield queue
+            finally:
+                poller.cancel()
+            return
+        for event in list(self._history.get(channel, ()))[-self.queue_size:]:
+            queue.put_nowait(event)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    async def _poll_store(self, channel: str, queue: asyncio.Queue, seq: int):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for seq, event in await asyncio.to_thread(self.store.events_after, channel, seq):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    pass
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [
+            channel for channel, updated in self._updated.items()
+            if now - updated > self.ttl and channel not in self._subscribers
+        ]
+        for channel in expired:
+            self._history.pop(channel, None)
+            self._updated.pop(channel, None)
+
+
+# Global instance
+progress_bus = ProgressBus(store=shared_state)
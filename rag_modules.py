@@ -1,14 +1,21 @@
 
 import os
 import json
+import time
+import queue
+import asyncio
+import threading
 import chromadb
 import google.generativeai as genai
 from typing import List, Dict, Any, Tuple
+from concurrent.futures import Future
 from FlagEmbedding import BGEM3FlagModel
 from collections import defaultdict
 from dotenv import load_dotenv
 import numpy as np
 
+from metrics import observe_encode_batch
+
 # Load environment variables
 load_dotenv()
 
@@ -24,6 +31,9 @@ class Config:
     CHROMA_DB_PATH = "./chroma_db"
     COLLECTION_NAME = "magazine_layouts"
     DATASET_PATH = "./datas/dataset.json"
+    # Query micro-batching: max queries per encode() call and how long to wait for a batch to fill
+    ENCODE_MAX_BATCH_SIZE = int(os.getenv("ENCODE_MAX_BATCH_SIZE", "16"))
+    ENCODE_MAX_WAIT_MS = float(os.getenv("ENCODE_MAX_WAIT_MS", "5"))
 
     @staticmethod
     def validate():
@@ -91,8 +101,9 @@ class GeminiAnalyzer:
         Optimized to provide rich context for superior results.
         이미지 검수 모듈을 통해 이미지가 잘리지 않도록 처리합니다.
         """
-        from tool.mcp_client import mcp_client
-        from image_validator import image_validator
+        from tool.mcp_client import mcp_client, LayoutGenerationError
+        from admission import CircuitOpen, Overloaded
+        from image_validator import image_validator, summarize_features
         
         headline = user_content.get('title', 'Untitled')
         body = user_content.get('body', '')
@@ -101,6 +112,7 @@ class GeminiAnalyzer:
         # 🖼️ 이미지 검수 및 처리
         raw_images = user_content.get('images', [])
         user_images = []
+        image_features = []
         
         # Calculate max height based on image count (width is calculated per-image based on aspect ratio)
         image_count = len(raw_images)
@@ -157,6 +169,7 @@ class GeminiAnalyzer:
                 
                 if result["success"]:
                     user_images.append(result["base64"])
+                    image_features.append(result.get("features"))
                 else:
                     user_images.append(img_b64)
                     print(f"  ⚠️ [Image {i}] Validation failed, using original: {result.get('error')}")
@@ -169,8 +182,9 @@ class GeminiAnalyzer:
         vision_context = {
             "keywords": analysis.get('visual_keywords', []),
             "description": analysis.get('description', ''),
-            "dominant_colors": "Analyze from keywords",  # Hint for LLM
-            "visual_style": analysis.get('mood', 'Modern')
+            "visual_style": analysis.get('mood', 'Modern'),
+            # Measured palette / brightness (without it the server infers colors from the keywords)
+            **summarize_features(image_features)
         }
         
         # Enhanced Design Spec (with visual harmony)
@@ -268,6 +282,8 @@ class GeminiAnalyzer:
                 html = tailwind_script + html
 
             return html
+        except (CircuitOpen, Overloaded, asyncio.TimeoutError, LayoutGenerationError):
+            raise  # MCP failures: the caller reports the page as error / timeout
         except Exception as e:
             print(f"❌ [NanoBanana] Integration Error: {e}")
             return ""
@@ -315,6 +331,97 @@ class GeminiAnalyzer:
         return layout_desc
 
 
+class QueryEncodeBatcher:
+    """
+    Collects queries from concurrent searches and encodes them together.
+
+    A single worker thread drains the queue: it blocks for the first query, then
+    keeps collecting for up to `max_wait_ms` (or until `max_batch_size`) and runs
+    one `model.encode()` for the whole batch. Callers get a Future per query, so
+    the model runs off the event loop and at its batch throughput.
+    """
+    def __init__(self, model, max_batch_size: int = None, max_wait_ms: float = None):
+        self.model = model
+        self.max_batch_size = max_batch_size or Config.ENCODE_MAX_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else Config.ENCODE_MAX_WAIT_MS) / 1000
+        self._queue: "queue.Queue[Tuple[str, float, Future]]" = queue.Queue()
+        
+        # Queue-time stats (seconds); each batch is also exported to /metrics
+        self._stats_lock = threading.Lock()
+        self._stats = {"queries": 0, "batches": 0, "queue_time_total": 0.0, "queue_time_max": 0.0}
+        
+        self._worker = threading.Thread(target=self._run, name="bge-m3-encoder", daemon=True)
+        self._worker.start()
+
+    def submit(self, query: str) -> Future:
+        """Enqueue a query. The Future resolves to (dense_vec, lexical_weights)."""
+        future = Future()
+        self._queue.put((query, time.perf_counter(), future))
+        return future
+
+    def encode(self, query: str) -> Tuple[Any, Dict[str, float]]:
+        """Blocking encode of a single query through the shared batch."""
+        return self.submit(query).result()
+
+    async def aencode(self, query: str) -> Tuple[Any, Dict[str, float]]:
+        """Awaitable encode of a single query; the event loop is never blocked."""
+        return await asyncio.wrap_future(self.submit(query))
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_time_avg"] = stats["queue_time_total"] / stats["queries"] if stats["queries"] else 0.0
+        stats["avg_batch_size"] = stats["queries"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _collect_batch(self) -> List[Tuple[str, float, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Drop queries whose callers already gave up (e.g. cancelled aencode);
+            # the rest are marked running so they can no longer be cancelled mid-batch
+            batch = [item for item in self._collect_batch() if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            
+            waits = [started - enqueued for _, enqueued, _ in batch]
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["queries"] += len(waits)
+                self._stats["queue_time_total"] += sum(waits)
+                self._stats["queue_time_max"] = max(self._stats["queue_time_max"], *waits)
+            observe_encode_batch(waits)
+            
+            try:
+                output = self.model.encode([q for q, _, _ in batch], return_dense=True, return_sparse=True)
+            except Exception as e:
+                logger.error(f"Batch encode failed ({len(batch)} queries): {e}")
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            # Delivered one by one: a problem with one result must not fail the others
+            for i, (_, _, future) in enumerate(batch):
+                try:
+                    future.set_result((output['dense_vecs'][i], output['lexical_weights'][i]))
+                except Exception as e:
+                    logger.error(f"Failed to deliver encoded query: {e}")
+                    if not future.done():
+                        future.set_exception(e)
+
+
 class ChromaHybridRetriever:
     def __init__(self):
         """
@@ -322,6 +429,7 @@ class ChromaHybridRetriever:
         """
         print(f"Loading Model: {Config.MODEL_NAME}...")
         self.model = BGEM3FlagModel(Config.MODEL_NAME, use_fp16=True)
+        self.batcher = QueryEncodeBatcher(self.model)
         
         print(f"Connecting to ChromaDB at {Config.CHROMA_DB_PATH}...")
         self.client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
@@ -497,10 +605,17 @@ class ChromaHybridRetriever:
     def search(self, query: str, filters: Dict[str, Any] = None, top_k: int = 5) -> List[Dict[str, Any]]:
         print(f"Searching: {query} | Filters: {filters}")
         
-        q_output = self.model.encode([query], return_dense=True, return_sparse=True)
-        q_dense = q_output['dense_vecs'][0]
-        q_sparse = q_output['lexical_weights'][0]
+        q_dense, q_sparse = self.batcher.encode(query)
+        return self._search_encoded(q_dense, q_sparse, filters, top_k)
+
+    async def asearch(self, query: str, filters: Dict[str, Any] = None, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Async search: query encoding is batched with concurrent requests, scoring runs in a thread."""
+        print(f"Searching: {query} | Filters: {filters}")
+        
+        q_dense, q_sparse = await self.batcher.aencode(query)
+        return await asyncio.to_thread(self._search_encoded, q_dense, q_sparse, filters, top_k)
 
+    def _search_encoded(self, q_dense, q_sparse, filters: Dict[str, Any] = None, top_k: int = 5) -> List[Dict[str, Any]]:
         # 1. Dense Search (with Chroma Filtering)
         if len(self.doc_ids) == 0:
              return []
@@ -2,16 +2,26 @@
 RAG Module with Voyage AI voyage-3.5 Embedding
 ==============================================
 Original: rag_modules.py (BGE-M3 + Hybrid Search)
-Changed: Voyage-3.5 + Dense Only (Dot Product / Inner Product)
+Changed: Voyage-3.5 Dense (Dot Product / Inner Product) + in-process BM25, fused with RRF
 """
 
 import os
+import re
 import json
+import time
+import asyncio
+import hashlib
+import threading
 import chromadb
 import google.generativeai as genai
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Callable
 from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from admission import gemini_bucket, voyage_bucket, gemini_breaker, voyage_breaker, CircuitOpen, Overloaded
+from metrics import track_external
+from bm25 import BM25Index
 import numpy as np
 
 # Load environment variables
@@ -32,6 +42,16 @@ class Config:
     DATASET_PATH = "./datas/final_final_dataset.json"
     VOYAGE_MODEL = "voyage-3.5"  # Model selection
     VOYAGE_DIMENSIONS = 512  # Dimension (256, 512, 1024, 2048 available)
+    # Poll interval (seconds) for hot-reloading the index when DATASET_PATH changes. 0 disables.
+    DATASET_WATCH_INTERVAL = float(os.getenv("DATASET_WATCH_INTERVAL", "0"))
+    # Async path: max concurrent upstream calls and threads for local (ChromaDB) work
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    VOYAGE_MAX_CONCURRENCY = int(os.getenv("VOYAGE_MAX_CONCURRENCY", "8"))
+    RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+    # Fuse BM25 (lexical) ranks with the dense ranks. Set HYBRID_SEARCH=0 for dense-only.
+    HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+    # Maximal Marginal Relevance trade-off (1.0 = pure relevance / MMR off, lower = more diverse)
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "1.0"))
 
     @staticmethod
     def validate():
@@ -41,6 +61,12 @@ class Config:
             raise ValueError("VOY_API_KEY not found in .env file")
 
 
+# Bounded concurrency for the async path, so one slow upstream can't pile up unbounded work
+_gemini_limit = asyncio.Semaphore(Config.GEMINI_MAX_CONCURRENCY)
+_voyage_limit = asyncio.Semaphore(Config.VOYAGE_MAX_CONCURRENCY)
+_retrieval_executor = ThreadPoolExecutor(max_workers=Config.RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+
 class GeminiAnalyzer:
     """Same as original - Uses Gemini for content analysis"""
     def __init__(self):
@@ -51,6 +77,30 @@ class GeminiAnalyzer:
 
     def analyze_page(self, images: List[Any], title: str, body: str) -> Dict[str, str]:
         """Analyze a single page's content (Images + Text) to extract metadata."""
+        try:
+            response = self.model.generate_content(self._build_analysis_inputs(images, title, body))
+            return self._parse_analysis(response.text)
+        except Exception as e:
+            print(f"Gemini Analysis Error: {e}")
+            return self._default_analysis()
+
+    async def aanalyze_page(self, images: List[Any], title: str, body: str) -> Dict[str, str]:
+        """Async version of analyze_page. Doesn't block the event loop; concurrency is bounded."""
+        try:
+            # Open circuit: skip the call (and its rate-limit token) and use the default analysis
+            with gemini_breaker.guard():
+                await gemini_bucket.acquire()
+                async with _gemini_limit:
+                    with track_external("gemini_analyze"):
+                        response = await self.model.generate_content_async(
+                            self._build_analysis_inputs(images, title, body)
+                        )
+            return self._parse_analysis(response.text)
+        except Exception as e:
+            print(f"Gemini Analysis Error: {e}")
+            return self._default_analysis()
+
+    def _build_analysis_inputs(self, images: List[Any], title: str, body: str) -> List[Any]:
         prompt = f"""
         You are an expert design assistant. Analyze these images and the provided text content for a magazine layout.
         
@@ -74,102 +124,64 @@ class GeminiAnalyzer:
         }}
         """
         
-        try:
-            inputs = [prompt]
-            if images:
-                inputs.extend(images)
-                
-            response = self.model.generate_content(inputs)
-            text = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(text)
-        except Exception as e:
-            print(f"Gemini Analysis Error: {e}")
-            return {
-                "mood": "General",
-                "category": "General",
-                "type": "Balanced",
-                "description": "Standard layout",
-                "visual_keywords": []
-            }
+        inputs = [prompt]
+        if images:
+            inputs.extend(images)
+        return inputs
+
+    def _parse_analysis(self, text: str) -> Dict[str, str]:
+        text = text.replace("```json", "").replace("```", "").strip()
+        return json.loads(text)
+
+    def _default_analysis(self) -> Dict[str, str]:
+        return {
+            "mood": "General",
+            "category": "General",
+            "type": "Balanced",
+            "description": "Standard layout",
+            "visual_keywords": []
+        }
 
-    async def aura_render(self, layout_data: Dict[str, Any], user_content: Dict[str, Any]) -> str:
+    async def aura_render(
+        self,
+        layout_data: Dict[str, Any],
+        user_content: Dict[str, Any],
+        dedup: Optional["ImageDeduplicator"] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> str:
         """
         Integration with AURA MCP Service for high-quality layout generation.
+        Pass the same ImageDeduplicator for every page of a request so near-identical
+        uploads are processed once per slot size and share one media URL.
+        on_event, if given, receives progress events (images_prepared, then the MCP
+        server's node_started / node_finished / retry events).
         """
-        from tool.mcp_client import mcp_client
-        from image_validator import image_validator
+        from tool.mcp_client import mcp_client, LayoutGenerationError
+        from image_validator import summarize_features
         
         headline = user_content.get('title', 'Untitled')
         body = user_content.get('body', '')
         analysis = user_content.get('analysis', {})
         
-        # 🖼️ Image validation and processing
-        raw_images = user_content.get('images', [])
-        user_images = []
-        
-        image_count = len(raw_images)
-        if image_count == 1:
-            max_height = 600
-        elif image_count == 2:
-            max_height = 400
-        elif image_count <= 4:
-            max_height = 280
-        else:
-            max_height = 220
-        
-        print(f"  📐 Max height for {image_count} images: {max_height}px")
-        
-        for i, img_b64 in enumerate(raw_images):
-            try:
-                from PIL import Image
-                import io
-                import base64 as b64
-                
-                if img_b64.startswith("data:"):
-                    base64_data = img_b64.split(",")[1]
-                else:
-                    base64_data = img_b64
-                image_bytes = b64.b64decode(base64_data)
-                temp_img = Image.open(io.BytesIO(image_bytes))
-                orig_width, orig_height = temp_img.size
-                
-                aspect_ratio = orig_width / orig_height
-                slot_height = max_height
-                slot_width = int(slot_height * aspect_ratio)
-                
-                max_width = 400
-                if slot_width > max_width:
-                    slot_width = max_width
-                    slot_height = int(slot_width / aspect_ratio)
-                
-                print(f"  📐 [Image {i}] Original: {orig_width}x{orig_height}, Slot: {slot_width}x{slot_height}")
-                
-                result = image_validator.prepare_for_layout(
-                    img_b64,
-                    layout_type="magazine_full",
-                    slot_info={
-                        "width": slot_width,
-                        "height": slot_height,
-                        "fit_mode": "contain"
-                    }
-                )
-                
-                if result["success"]:
-                    user_images.append(result["base64"])
-                else:
-                    user_images.append(img_b64)
-                    print(f"  ⚠️ [Image {i}] Validation failed, using original")
-            except Exception as e:
-                user_images.append(img_b64)
-                print(f"  ⚠️ [Image {i}] Error during validation: {e}")
+        # 🖼️ Image validation and processing (parallel, off the event loop)
+        # images: base64 strings / data URIs, raw bytes or ImageSource objects
+        user_images, object_positions, image_features = await self._prepare_images(user_content.get('images', []), dedup)
+        if on_event:
+            on_event({
+                "type": "images_prepared",
+                "count": len(user_images),
+                "rejected": sum(1 for url in user_images if not url)
+            })
         
         placeholders = [f"__IMAGE_{i}__" for i in range(len(user_images))]
         
+        # Measured palette / brightness / subject hints from the prepared images; without
+        # them the server infers colors from the keywords
         vision_context = {
             "keywords": analysis.get('visual_keywords', []),
             "description": analysis.get('description', ''),
-            "dominant_colors": "Analyze from keywords",
-            "visual_style": analysis.get('mood', 'Modern')
+            "visual_style": analysis.get('mood', 'Modern'),
+            **summarize_features(image_features)
         }
         
         page_layout_type = user_content.get('layout_type', 'article')
@@ -210,7 +222,8 @@ class GeminiAnalyzer:
                 layout_override=page_layout_type.upper(),
                 vision_json=json.dumps(vision_context),
                 design_json=json.dumps(design_spec),
-                plan_json=json.dumps(plan_json)
+                plan_json=json.dumps(plan_json),
+                on_event=on_event
             )
             
             # Image Placeholder Injection
@@ -242,12 +255,16 @@ class GeminiAnalyzer:
                 if not injected:
                     print(f"  ⚠️ [Image {i}] No placeholder found! Forcing injection...")
                     img_tag = f'<img src="{img_b64}" class="w-[30%] h-[120px] object-cover inline-block mx-2 my-2" alt="Image {i}" />'
+                    img_tag = self._apply_object_position(img_tag, img_b64, object_positions[i])
                     
                     if '</div>' in html:
                         last_div_pos = html.rfind('</div>')
                         html = html[:last_div_pos] + img_tag + html[last_div_pos:]
                     else:
                         html = html + img_tag
+                else:
+                    # Keep the subject in frame when the template crops with object-cover
+                    html = self._apply_object_position(html, img_b64, object_positions[i])
             
             # Tailwind CSS Script Injection
             tailwind_script = '<script src="https://cdn.tailwindcss.com"></script>\n'
@@ -259,10 +276,181 @@ class GeminiAnalyzer:
                 html = tailwind_script + html
 
             return html
+        except (CircuitOpen, Overloaded, asyncio.TimeoutError, LayoutGenerationError):
+            raise  # MCP failures: the caller reports the page as error / timeout
         except Exception as e:
             print(f"❌ [AURA] Integration Error: {e}")
             return ""
     
+    async def _prepare_images(
+        self,
+        raw_images: List[Any],
+        dedup: Optional["ImageDeduplicator"] = None
+    ) -> Tuple[List[str], List[Optional[str]], List[Optional[Dict]]]:
+        """
+        Size a slot for each image and prepare them all concurrently.
+        Returns image URLs, their CSS object-position focal points and local visual features
+        (None if unknown), in input order.
+        """
+        from PIL import Image
+        from image_validator import image_validator, ImageSource, ImageDeduplicator
+        
+        image_count = len(raw_images)
+        if image_count == 1:
+            max_height = 600
+        elif image_count == 2:
+            max_height = 400
+        elif image_count <= 4:
+            max_height = 280
+        else:
+            max_height = 220
+        
+        print(f"  📐 Max height for {image_count} images: {max_height}px")
+        
+        # Slot sizing only needs the header; pixels are decoded once inside the worker pool
+        sources, slot_infos, fallbacks = [], [], []
+        for i, raw_image in enumerate(raw_images):
+            try:
+                source = ImageSource.from_any(raw_image)
+                orig_width, orig_height = source.size
+                
+                aspect_ratio = orig_width / orig_height
+                slot_height = max_height
+                slot_width = int(slot_height * aspect_ratio)
+                
+                max_width = 400
+                if slot_width > max_width:
+                    slot_width = max_width
+                    slot_height = int(slot_width / aspect_ratio)
+                
+                print(f"  📐 [Image {i}] Original: {orig_width}x{orig_height}, Slot: {slot_width}x{slot_height}")
+                sources.append(source)
+                slot_infos.append({
+                    "width": slot_width,
+                    "height": slot_height,
+                    "fit_mode": "contain"
+                })
+                fallbacks.append(None)
+            except Exception as e:
+                sources.append(None)
+                slot_infos.append(None)
+                # Decompression bombs are refused by Pillow at header time; don't inline them either
+                bomb = isinstance(e, Image.DecompressionBombError)
+                fallbacks.append(raw_image if isinstance(raw_image, str) and not bomb else "")
+                print(f"  ⚠️ [Image {i}] Error during validation: {e}")
+        
+        valid = [i for i, source in enumerate(sources) if source is not None]
+        
+        # Near-identical images (within this page and, with a shared dedup, across pages)
+        # share one prepare per slot size. Over-budget images are never hashed (no decode).
+        dedup = dedup or ImageDeduplicator()
+        
+        def canonical_ids():
+            return [
+                dedup.canonical_id(sources[i]) if image_validator.validate_image(sources[i])["is_valid"] else None
+                for i in valid
+            ]
+        
+        ids = await asyncio.to_thread(canonical_ids)
+        loop = asyncio.get_running_loop()
+        shared, to_run = [], []
+        for i, canonical_id in zip(valid, ids):
+            mine = loop.create_future()
+            future, key = mine, None
+            if canonical_id is not None:
+                slot = slot_infos[i]
+                key = (canonical_id, slot["width"], slot["height"], slot["fit_mode"])
+                future = dedup.claim(key, mine)
+            if future is mine:
+                to_run.append((i, key, mine))
+            shared.append(future)
+        if len(to_run) < len(valid):
+            print(f"  ♻️ {len(valid) - len(to_run)} duplicate image(s) reuse an already prepared asset")
+        
+        try:
+            prepared = await self._prepare_and_store(
+                [sources[i] for i, _, _ in to_run], [slot_infos[i] for i, _, _ in to_run]
+            )
+            for (_, _, future), result in zip(to_run, prepared):
+                future.set_result(result)
+        except BaseException as e:
+            # Other pages may be waiting on these assets. Errors are passed on; on cancellation
+            # (e.g. this page timed out) the assets are released so waiting pages prepare them
+            for _, key, future in to_run:
+                if future.done():
+                    continue
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                else:
+                    dedup.forget(key, future)
+                    future.cancel()
+            raise
+        
+        results = list(await asyncio.gather(*shared, return_exceptions=True))
+        orphaned = [n for n, result in enumerate(results) if isinstance(result, asyncio.CancelledError)]
+        if orphaned:
+            print(f"  ♻️ {len(orphaned)} shared image(s) were abandoned by a cancelled page, preparing here")
+            redone = await self._prepare_and_store(
+                [sources[valid[n]] for n in orphaned], [slot_infos[valid[n]] for n in orphaned]
+            )
+            for n, result in zip(orphaned, redone):
+                results[n] = result
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        
+        # Prepared images are served by URL from /media instead of being inlined as data URIs
+        user_images = list(fallbacks)
+        object_positions = [None] * image_count
+        features = [None] * image_count
+        for i, result in zip(valid, results):
+            source = sources[i]
+            if result["success"]:
+                user_images[i] = result["url"]
+                object_positions[i] = result.get("object_position")
+                features[i] = result.get("features")
+            elif result.get("rejected"):
+                # Over the pixel/byte budget: never inline the original
+                user_images[i] = ""
+                print(f"  ⛔ [Image {i}] Rejected: {result.get('error')}")
+            else:
+                user_images[i] = source.to_data_uri()
+                print(f"  ⚠️ [Image {i}] Validation failed, using original: {result.get('error')}")
+            source.release()
+        return user_images, object_positions, features
+    
+    async def _prepare_and_store(self, sources: List[Any], slot_infos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Prepare images for their slots and upload the successful ones (URL in result["url"])."""
+        from image_validator import image_validator
+        from media_store import media_store
+        
+        prepared = await image_validator.abatch_prepare(sources, layout_type="magazine_full", slot_infos=slot_infos)
+        for result in prepared:
+            if result["success"]:
+                # Upload once so every page referencing this asset gets the same URL
+                result["url"] = await asyncio.to_thread(media_store.put, result["data"], result["mime"])
+        return prepared
+    
+    def _apply_object_position(self, html: str, src: str, position: Optional[str]) -> str:
+        """Add an object-position style to the <img> tags using src (existing object-position wins)."""
+        if not position or not src:
+            return html
+        
+        tag_pattern = re.compile(r'<img\b[^>]*?\bsrc=(["\'])' + re.escape(src) + r'\1[^>]*>', re.IGNORECASE)
+        
+        def add_style(match):
+            tag = match.group(0)
+            if 'object-position' in tag:
+                return tag
+            style_match = re.search(r'\bstyle=(["\'])(.*?)\1', tag, re.IGNORECASE | re.DOTALL)
+            if style_match:
+                quote, style = style_match.group(1), style_match.group(2).rstrip().rstrip(';')
+                new_style = f'style={quote}{style}; object-position: {position};{quote}' if style else f'style={quote}object-position: {position};{quote}'
+                return tag[:style_match.start()] + new_style + tag[style_match.end():]
+            return tag[:4] + f' style="object-position: {position};"' + tag[4:]
+        
+        return tag_pattern.sub(add_style, html)
+
     def _suggest_typography(self, category: str) -> str:
         typography_map = {
             "Fashion": "Elegant serif, high contrast",
@@ -305,46 +493,219 @@ class GeminiAnalyzer:
 class VoyageRetriever:
     """
     Voyage AI voyage-3.5 based retriever.
-    Uses Dense Only search with Dot Product (Inner Product).
+    Dense search with Dot Product (Inner Product) in ChromaDB, optionally fused
+    with an in-memory BM25 index (Config.HYBRID_SEARCH) via Reciprocal Rank Fusion.
+    
+    Every build writes a new versioned collection ("{COLLECTION_NAME}_v{n}"), so a
+    hot reload never modifies the collection the serving snapshot is querying; the
+    old one is dropped by retire() once its in-flight queries have finished.
     """
-    def __init__(self):
-        import voyageai
-        
+    COLLECTION_METADATA = {"hnsw:space": "ip"}  # Inner Product (Dot Product) similarity
+    
+    def __init__(self, previous: Optional["VoyageRetriever"] = None):
+        """
+        Args:
+            previous: Currently serving retriever. When given (hot reload), its
+                clients are reused and unchanged documents are not re-embedded.
+        """
         print(f"🚀 Initializing Voyage AI Retriever...")
         print(f"   Model: {Config.VOYAGE_MODEL}")
         print(f"   Dimensions: {Config.VOYAGE_DIMENSIONS}")
         
-        # Initialize Voyage client
-        self.client = voyageai.Client(api_key=Config.VOYAGE_API_KEY)
+        self.client = self.async_client = self.chroma_client = self.collection = None
+        self.collection_name = Config.COLLECTION_NAME
+        # Dense search over the in-memory embedding matrix instead of ChromaDB (pre-fork workers)
+        self.in_memory_dense = False
+        if previous is not None:
+            # Hot reload: share clients with the serving snapshot (but never its collection)
+            self.client = previous.client
+            self.async_client = previous.async_client
+            self.chroma_client = previous.chroma_client
+            self.in_memory_dense = previous.in_memory_dense
+        self._connect_voyage()
         
-        # Initialize ChromaDB
-        print(f"   Connecting to ChromaDB at {Config.CHROMA_DB_PATH}...")
-        self.chroma_client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
-        self.collection = self.chroma_client.get_or_create_collection(
-            name=Config.COLLECTION_NAME,
-            metadata={"hnsw:space": "ip"}  # Inner Product (Dot Product) similarity
-        )
+        # ChromaDB queries in flight on this snapshot (retire() waits for them)
+        self._usage = threading.Condition()
+        self._active_queries = 0
+        self._retired = False
         
         self.doc_ids: List[str] = []
         self.doc_map: Dict[str, Any] = {}
+        self.doc_hashes: Dict[str, str] = {}  # doc_id -> hash of indexed text (for incremental reload)
+        self.embeddings: np.ndarray = np.zeros((0, Config.VOYAGE_DIMENSIONS), dtype=np.float32)
+        self.dataset_mtime: float = 0.0
         
         # Cache management
         self.cache_path = "./index_cache_voyage.pkl"
         
-        import hashlib
         import inspect
         logic_source = inspect.getsource(self.index_data)
         logic_hash = hashlib.md5(logic_source.encode()).hexdigest()[:8]
         # Include distance metric in version to invalidate cache when it changes
-        distance_metric = self.collection.metadata.get('hnsw:space', 'unknown')
+        distance_metric = self.COLLECTION_METADATA.get('hnsw:space', 'unknown')
         self.CACHE_VERSION = f"voyage-1.0-{distance_metric}-{logic_hash}"
         
         if self._load_from_cache():
             logger.info(f"✅ Loaded Voyage index from cache (v{self.CACHE_VERSION}).")
+            self._open_collection()
+            if self.collection.count() != len(self.doc_ids):
+                # Collection lost or partially written: restore it from the cached embeddings
+                logger.info(f"Collection {self.collection_name} is out of sync with the cache. Rewriting...")
+                self._write_collection(self._new_collection_name())
+                self._save_to_cache()
+                if previous is None:
+                    self._drop_stale_collections()
         else:
             logger.info("⚡ Voyage index not found. Re-indexing...")
-            self.index_data()
+            self.index_data(previous=previous)
             self._save_to_cache()
+        
+        if os.path.exists(Config.DATASET_PATH):
+            self.dataset_mtime = os.path.getmtime(Config.DATASET_PATH)
+        
+        self._build_lexical_index()
+        self.connect()
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None
+
+    def connect(self):
+        """
+        Create the Voyage clients and, unless dense search runs in memory, the
+        ChromaDB client. Clients that already exist are kept.
+        """
+        self._connect_voyage()
+        if not self.in_memory_dense:
+            self._open_collection()
+
+    def _connect_voyage(self):
+        if self.client is None:
+            import voyageai
+            self.client = voyageai.Client(api_key=Config.VOYAGE_API_KEY)
+            self.async_client = voyageai.AsyncClient(api_key=Config.VOYAGE_API_KEY)
+
+    def _connect_chroma(self):
+        if self.chroma_client is None:
+            print(f"   Connecting to ChromaDB at {Config.CHROMA_DB_PATH}...")
+            self.chroma_client = chromadb.PersistentClient(path=Config.CHROMA_DB_PATH)
+
+    def _open_collection(self):
+        if self.collection is not None:
+            return
+        self._connect_chroma()
+        self.collection = self.chroma_client.get_or_create_collection(
+            name=self.collection_name,
+            metadata=self.COLLECTION_METADATA
+        )
+
+    def _new_collection_name(self) -> str:
+        return f"{Config.COLLECTION_NAME}_v{time.time_ns() // 1_000_000}"
+
+    def _write_collection(self, name: str):
+        """Write every document (embeddings from the in-memory matrix) into a new collection."""
+        self._connect_chroma()
+        self.collection = self.chroma_client.create_collection(name=name, metadata=self.COLLECTION_METADATA)
+        self.collection_name = name
+        print(f"💾 Writing {len(self.doc_ids)} documents to ChromaDB collection {name}...")
+        batch_size = 1000
+        for start in range(0, len(self.doc_ids), batch_size):
+            ids = self.doc_ids[start:start + batch_size]
+            items = [self.doc_map[doc_id] for doc_id in ids]
+            self.collection.add(
+                ids=ids,
+                embeddings=self.embeddings[start:start + batch_size].tolist(),
+                metadatas=[self._doc_metadata(item) for item in items],
+                documents=[self._format_layout_text(item) for item in items]
+            )
+
+    def _drop_stale_collections(self):
+        """Remove collections other than this snapshot's (left over by crashes, drain timeouts or older versions)."""
+        prefix = f"{Config.COLLECTION_NAME}_v"
+        for collection in self.chroma_client.list_collections():
+            name = getattr(collection, "name", collection)
+            if (name.startswith(prefix) or name == Config.COLLECTION_NAME) and name != self.collection_name:
+                try:
+                    self.chroma_client.delete_collection(name)
+                    print(f"🧹 Dropped stale collection {name}")
+                except Exception as e:
+                    logger.warning(f"Failed to drop collection {name}: {e}")
+
+    @contextmanager
+    def _collection_in_use(self):
+        """The ChromaDB collection for one query, or None once this snapshot is retired."""
+        with self._usage:
+            collection = None if self._retired else self.collection
+            if collection is not None:
+                self._active_queries += 1
+        try:
+            yield collection
+        finally:
+            if collection is not None:
+                with self._usage:
+                    self._active_queries -= 1
+                    self._usage.notify_all()
+
+    def retire(self, successor: "VoyageRetriever", timeout: float = 60.0):
+        """
+        Called after a hot swap: stop using this snapshot's collection and drop it
+        once in-flight queries have finished. Searches still running on this snapshot
+        fall back to the in-memory dense search.
+        """
+        with self._usage:
+            self._retired = True
+            drained = self._usage.wait_for(lambda: self._active_queries == 0, timeout=timeout)
+        # A preloaded (disconnected) snapshot has no client of its own
+        client = self.chroma_client or successor.chroma_client
+        if client is None or self.collection_name == successor.collection_name:
+            return
+        if not drained:
+            logger.warning(f"Queries on {self.collection_name} still running after {timeout}s; "
+                           f"leaving it for the next rebuild to drop")
+            return
+        try:
+            client.delete_collection(self.collection_name)
+            print(f"🧹 Dropped previous collection {self.collection_name}")
+        except Exception as e:
+            logger.warning(f"Failed to drop collection {self.collection_name}: {e}")
+
+    def disconnect(self):
+        """
+        Drop the API and ChromaDB clients but keep the loaded index (doc_map, embeddings, BM25).
+        Used before fork: HTTP connection pools, SQLite handles and Chroma's background
+        threads must not be shared across processes, so each worker calls connect() again.
+        """
+        if self.chroma_client is not None:
+            try:
+                self.chroma_client.clear_system_cache()
+            except Exception as e:
+                logger.warning(f"Failed to stop ChromaDB client: {e}")
+        self.client = self.async_client = self.chroma_client = self.collection = None
+
+    def _build_lexical_index(self):
+        """Build the BM25 index and metadata filter columns from doc_map (cheap, so not cached)."""
+        texts = [self._format_layout_text(self.doc_map[doc_id]) for doc_id in self.doc_ids]
+        self.lexical_index = BM25Index(texts)
+        self._doc_positions = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+        
+        # Column arrays for vectorized filter masks
+        filter_keys = ["category", "type", "mood", "image_count", "layout_ratio"]
+        self._filter_columns = {
+            key: np.array([self.doc_map[doc_id].get(key) for doc_id in self.doc_ids], dtype=object)
+            for key in filter_keys
+        }
+        print(f"   BM25 index: {len(self.lexical_index.vocab)} terms over {len(texts)} documents")
+
+    def _filter_mask(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not filters:
+            return None
+        mask = np.ones(len(self.doc_ids), dtype=bool)
+        for k, v in filters.items():
+            column = self._filter_columns.get(k)
+            if column is None:
+                column = np.array([self.doc_map[doc_id].get(k) for doc_id in self.doc_ids], dtype=object)
+            mask &= (column == v)
+        return mask
 
     def _save_to_cache(self):
         try:
@@ -352,7 +713,10 @@ class VoyageRetriever:
                 pickle.dump({
                     'version': self.CACHE_VERSION,
                     'doc_map': self.doc_map,
-                    'doc_ids': self.doc_ids
+                    'doc_ids': self.doc_ids,
+                    'doc_hashes': self.doc_hashes,
+                    'embeddings': self.embeddings,
+                    'collection_name': self.collection_name
                 }, f)
             logger.info(f"Saved Voyage index to {self.cache_path}")
         except Exception as e:
@@ -377,6 +741,9 @@ class VoyageRetriever:
                 
                 self.doc_map = data['doc_map']
                 self.doc_ids = data['doc_ids']
+                self.doc_hashes = data['doc_hashes']
+                self.embeddings = data['embeddings']
+                self.collection_name = data.get('collection_name', Config.COLLECTION_NAME)
             return True
         except Exception as e:
             logger.error(f"Failed to load cache: {e}")
@@ -420,12 +787,13 @@ class VoyageRetriever:
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i+batch_size]
             
-            result = self.client.embed(
-                batch,
-                model=Config.VOYAGE_MODEL,
-                input_type=input_type,
-                output_dimension=Config.VOYAGE_DIMENSIONS  # Matryoshka dimension
-            )
+            with track_external("voyage_embed"):
+                result = self.client.embed(
+                    batch,
+                    model=Config.VOYAGE_MODEL,
+                    input_type=input_type,
+                    output_dimension=Config.VOYAGE_DIMENSIONS  # Matryoshka dimension
+                )
             
             all_embeddings.extend(result.embeddings)
             
@@ -434,8 +802,27 @@ class VoyageRetriever:
         
         return all_embeddings
 
-    def index_data(self):
-        """Load JSON, generate Voyage embeddings, and populate ChromaDB."""
+    async def _aget_voyage_embeddings(self, texts: List[str], input_type: str = "query") -> List[List[float]]:
+        """Async version of _get_voyage_embeddings for the request path (single batch, bounded concurrency)."""
+        with voyage_breaker.guard():
+            await voyage_bucket.acquire()
+            async with _voyage_limit:
+                with track_external("voyage_embed"):
+                    result = await self.async_client.embed(
+                        texts,
+                        model=Config.VOYAGE_MODEL,
+                        input_type=input_type,
+                        output_dimension=Config.VOYAGE_DIMENSIONS
+                    )
+        return result.embeddings
+
+    def index_data(self, previous: Optional["VoyageRetriever"] = None):
+        """
+        Load JSON, generate Voyage embeddings, and populate a new ChromaDB collection.
+        
+        With `previous`, only new or changed documents are embedded; the others reuse
+        its embeddings. The collection `previous` serves from is never modified.
+        """
         if not os.path.exists(Config.DATASET_PATH):
             print(f"Dataset not found at {Config.DATASET_PATH}")
             return
@@ -444,10 +831,11 @@ class VoyageRetriever:
         with open(Config.DATASET_PATH, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
+        embed_ids = []
         doc_texts = []
-        doc_metadatas = []
         self.doc_ids = []
         self.doc_map = {}
+        self.doc_hashes = {}
         
         for item in data:
             doc_id = item['image_id']
@@ -474,22 +862,32 @@ class VoyageRetriever:
             item['image_count'] = img_count
             item['layout_ratio'] = layout_ratio
             
+            metadata = self._doc_metadata(item)
+            doc_hash = hashlib.md5(
+                (text_chunk + json.dumps(metadata, sort_keys=True)).encode()
+            ).hexdigest()
+            
             self.doc_ids.append(doc_id)
             self.doc_map[doc_id] = item
-            doc_texts.append(text_chunk)
+            self.doc_hashes[doc_id] = doc_hash
             
-            doc_metadatas.append({
-                "image_id": doc_id,
-                "category": item.get('category', ''),
-                "type": item.get('type', ''),
-                "mood": item.get('mood', ''),
-                "image_count": img_count,
-                "layout_ratio": layout_ratio
-            })
+            # Incremental: skip documents whose text and metadata are unchanged
+            if previous is not None and previous.doc_hashes.get(doc_id) == doc_hash:
+                continue
+            
+            embed_ids.append(doc_id)
+            doc_texts.append(text_chunk)
+
+        if previous is not None:
+            removed = sum(1 for d in previous.doc_ids if d not in self.doc_hashes)
+            print(f"♻️  Incremental re-index: {len(embed_ids)} changed, "
+                  f"{len(self.doc_ids) - len(embed_ids)} reused, {removed} removed")
 
         # Generate Voyage embeddings
-        print(f"🔄 Generating Voyage embeddings for {len(doc_texts)} documents...")
-        embeddings = self._get_voyage_embeddings(doc_texts, input_type="document")
+        embeddings = []
+        if embed_ids:
+            print(f"🔄 Generating Voyage embeddings for {len(doc_texts)} documents...")
+            embeddings = self._get_voyage_embeddings(doc_texts, input_type="document")
         
         # Verify embeddings are normalized for dot product (optional but recommended)
         # Voyage AI embeddings should be pre-normalized
@@ -497,26 +895,59 @@ class VoyageRetriever:
             sample_norm = sum(x**2 for x in embeddings[0]) ** 0.5
             if abs(sample_norm - 1.0) > 0.01:
                 logger.warning(f"⚠️ Embeddings may not be normalized (norm={sample_norm:.4f}). Dot product may not work as expected.")
-
-        # Upsert to ChromaDB
-        print("💾 Upserting to ChromaDB...")
-        self.collection.upsert(
-            ids=self.doc_ids,
-            embeddings=embeddings,
-            metadatas=doc_metadatas,
-            documents=doc_texts
-        )
+        
+        # In-memory embedding matrix aligned with doc_ids (used for MMR reranking)
+        new_vectors = dict(zip(embed_ids, embeddings))
+        rows = []
+        for doc_id in self.doc_ids:
+            if doc_id in new_vectors:
+                rows.append(new_vectors[doc_id])
+            else:
+                rows.append(previous.embeddings[previous._doc_positions[doc_id]])
+        self.embeddings = np.asarray(rows, dtype=np.float32).reshape(len(self.doc_ids), -1)
+        
+        # Reuse the serving collection only if nothing changed; otherwise write a new version
+        if previous is not None and not embed_ids and self.doc_ids == previous.doc_ids:
+            self.collection_name = previous.collection_name
+            self._open_collection()
+        else:
+            self._write_collection(self._new_collection_name())
+        if previous is None:
+            self._drop_stale_collections()
         
         print(f"✅ Voyage indexing complete! {len(self.doc_ids)} documents indexed.")
 
+    @staticmethod
+    def _doc_metadata(item: Dict[str, Any]) -> Dict[str, Any]:
+        """ChromaDB metadata of a layout (image_count / layout_ratio set by index_data)."""
+        return {
+            "image_id": item['image_id'],
+            "category": item.get('category', ''),
+            "type": item.get('type', ''),
+            "mood": item.get('mood', ''),
+            "image_count": item['image_count'],
+            "layout_ratio": item['layout_ratio']
+        }
+
     def get_layout(self, doc_id: str) -> Dict[str, Any]:
         """Retrieve raw layout data by ID."""
         return self.doc_map.get(doc_id)
 
-    def search(self, query: str, filters: Dict[str, Any] = None, top_k: int = 5) -> List[Dict[str, Any]]:
+    def compute_rrf(self, dense_results: List[str], sparse_results: List[str], k: int = 60) -> List[Tuple[str, float]]:
+        scores = defaultdict(float)
+        for rank, doc_id in enumerate(dense_results):
+            scores[doc_id] += 1 / (k + rank + 1)
+        for rank, doc_id in enumerate(sparse_results):
+            scores[doc_id] += 1 / (k + rank + 1)
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+    def search(self, query: str, filters: Dict[str, Any] = None, top_k: int = 5,
+               hybrid: Optional[bool] = None, mmr_lambda: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Search for similar layouts using Voyage embeddings.
-        Uses Dense Only search with Dot Product (Inner Product).
+        Dense search with Dot Product (Inner Product), fused with BM25 when hybrid
+        (defaults to Config.HYBRID_SEARCH). With mmr_lambda < 1 (defaults to
+        Config.MMR_LAMBDA) the candidates are reranked for diversity.
         """
         print(f"🔍 [Voyage] Searching: {query}")
         if filters:
@@ -524,6 +955,34 @@ class VoyageRetriever:
         
         # Get query embedding
         query_embedding = self._get_voyage_embeddings([query], input_type="query")[0]
+        return self._search_by_embedding(query_embedding, filters, top_k, query=query,
+                                         hybrid=hybrid, mmr_lambda=mmr_lambda)
+
+    async def asearch(self, query: str, filters: Dict[str, Any] = None, top_k: int = 5,
+                      hybrid: Optional[bool] = None, mmr_lambda: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Async version of search for FastAPI handlers.
+        The Voyage call uses the async client; the ChromaDB query runs on the retrieval thread pool.
+        """
+        print(f"🔍 [Voyage] Searching (async): {query}")
+        if filters:
+            print(f"   Filters: {filters}")
+        
+        query_embedding = (await self._aget_voyage_embeddings([query], input_type="query"))[0]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _retrieval_executor,
+            lambda: self._search_by_embedding(query_embedding, filters, top_k, query=query,
+                                              hybrid=hybrid, mmr_lambda=mmr_lambda)
+        )
+
+    def _search_by_embedding(self, query_embedding: List[float], filters: Dict[str, Any] = None, top_k: int = 5,
+                             query: Optional[str] = None, hybrid: Optional[bool] = None,
+                             mmr_lambda: Optional[float] = None) -> List[Dict[str, Any]]:
+        if hybrid is None:
+            hybrid = Config.HYBRID_SEARCH
+        if mmr_lambda is None:
+            mmr_lambda = Config.MMR_LAMBDA
         
         # Prepare ChromaDB where clause
         chroma_where = None
@@ -540,43 +999,188 @@ class VoyageRetriever:
         # Query ChromaDB (Dot Product/Inner Product is configured at collection level)
         candidate_k = min(50, len(self.doc_ids)) if self.doc_ids else top_k
         
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=candidate_k,
-            where=chroma_where
-        )
+        with self._collection_in_use() as collection:
+            if collection is None:
+                dense_ids, distances = self._dense_search_in_memory(query_embedding, filters, candidate_k)
+            else:
+                with track_external("chroma_query"):
+                    results = collection.query(
+                        query_embeddings=[query_embedding],
+                        n_results=candidate_k,
+                        where=chroma_where
+                    )
+                dense_ids = results['ids'][0] if results['ids'] else []
+                distances = results['distances'][0] if results.get('distances') else []
+        
+        # ChromaDB's "ip" space returns distances (1 - dot product): lower = more similar.
+        # Convert to similarity so higher is better for ranking, MMR relevance and the output.
+        dense_scores = {doc_id: 1.0 - distance for doc_id, distance in zip(dense_ids, distances)}
+        
+        # Ranked candidates: (doc_id, score), best first
+        if hybrid and query:
+            # Lexical channel: BM25 over the same texts, same filters, fused by rank
+            lexical_ids = [
+                self.doc_ids[i]
+                for i in self.lexical_index.top_n(query, candidate_k, self._filter_mask(filters))
+            ]
+            ranked = self.compute_rrf(dense_ids, lexical_ids)
+            print(f"   Hybrid: {len(dense_ids)} dense + {len(lexical_ids)} lexical candidates")
+        else:
+            ranked = [(doc_id, dense_scores.get(doc_id, 0)) for doc_id in dense_ids]
+        ranked = [(doc_id, score) for doc_id, score in ranked if doc_id in self.doc_map]
+        
+        if mmr_lambda < 1.0 and len(ranked) > top_k:
+            # Diversify: near-duplicate layouts (e.g. _left/_right spreads) don't crowd the top-k
+            scores = dict(ranked)
+            ranked = [(doc_id, scores[doc_id])
+                      for doc_id in self._mmr_select(query_embedding, ranked, top_k, mmr_lambda)]
         
         # Format results
         output = []
-        if results['ids'] and results['ids'][0]:
-            for i, doc_id in enumerate(results['ids'][0][:top_k]):
-                doc_data = self.doc_map.get(doc_id)
-                if doc_data:
-                    # ChromaDB returns distances
-                    # For inner product (dot product), the distance IS the similarity score
-                    # Higher values = more similar (unlike cosine distance where lower is better)
-                    distance = results['distances'][0][i] if results.get('distances') else 0
-                    similarity = distance  # For inner product, distance = similarity
-                    
-                    output.append({
-                        "image_id": doc_id,
-                        "similarity_score": round(similarity, 4),
-                        "category": doc_data.get('category'),
-                        "mood": doc_data.get('mood'),
-                        "type": doc_data.get('type')
-                    })
+        for doc_id, score in ranked[:top_k]:
+            doc_data = self.doc_map[doc_id]
+            record = {
+                "image_id": doc_id,
+                "similarity_score": round(dense_scores[doc_id], 4) if doc_id in dense_scores else None,
+                "category": doc_data.get('category'),
+                "mood": doc_data.get('mood'),
+                "type": doc_data.get('type')
+            }
+            if hybrid and query:
+                record["rrf_score"] = round(score, 6)
+            output.append(record)
         
         print(f"   Found {len(output)} results")
         return output
 
+    def _dense_search_in_memory(self, query_embedding: List[float], filters: Optional[Dict[str, Any]],
+                                n: int) -> Tuple[List[str], List[float]]:
+        """
+        Exact inner-product search over the embedding matrix, for processes that
+        share the preloaded index instead of opening ChromaDB (and its HNSW index).
+        Returns ids best first and distances in ChromaDB's "ip" convention (1 - dot).
+        """
+        sims = self.embeddings @ np.asarray(query_embedding, dtype=np.float32)
+        mask = self._filter_mask(filters)
+        if mask is not None:
+            sims = np.where(mask, sims, -np.inf)
+        n = min(n, int(np.isfinite(sims).sum()))
+        if n <= 0:
+            return [], []
+        top = np.argpartition(-sims, n - 1)[:n]
+        top = top[np.argsort(-sims[top])]
+        return [self.doc_ids[i] for i in top], (1.0 - sims[top]).tolist()
+
+    def _mmr_select(self, query_embedding: List[float], ranked: List[Tuple[str, float]],
+                    top_k: int, mmr_lambda: float) -> List[str]:
+        """
+        Maximal Marginal Relevance over the candidate set using the stored embedding matrix.
+        
+        All pairwise similarities come from one matrix product; the greedy loop only
+        runs top_k vectorized steps. Relevance is the candidate's ranking score scaled
+        to [0, 1] so it is comparable with the cosine similarities.
+        """
+        candidate_ids = [doc_id for doc_id, _ in ranked]
+        vectors = self.embeddings[[self._doc_positions[doc_id] for doc_id in candidate_ids]]
+        pairwise = vectors @ vectors.T
+        
+        scores = np.array([score for _, score in ranked], dtype=np.float32)
+        span = scores.max() - scores.min()
+        relevance = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+        
+        selected = [int(np.argmax(relevance))]
+        max_sim = pairwise[selected[0]].copy()
+        for _ in range(1, min(top_k, len(candidate_ids))):
+            mmr = mmr_lambda * relevance - (1 - mmr_lambda) * max_sim
+            mmr[selected] = -np.inf
+            best = int(np.argmax(mmr))
+            selected.append(best)
+            max_sim = np.maximum(max_sim, pairwise[best])
+        
+        return [candidate_ids[i] for i in selected]
+
 
 # Global instance placeholders
 analyzer = None
 retriever = None
 
+_reload_lock = threading.Lock()
+
 def setup_rag():
-    """Initialize RAG components with Voyage embeddings."""
+    """
+    Initialize RAG components with Voyage embeddings.
+    Idempotent: an index loaded by preload_index() is reused and only its clients are connected.
+    """
     global analyzer, retriever
-    analyzer = GeminiAnalyzer()
-    retriever = VoyageRetriever()
+    if analyzer is None:
+        analyzer = GeminiAnalyzer()
+    if retriever is None:
+        retriever = VoyageRetriever()
+    else:
+        retriever.connect()
     print("✅ Voyage RAG system initialized!")
+
+
+def preload_index() -> VoyageRetriever:
+    """
+    Load the retrieval index in a pre-fork parent process and disconnect its clients.
+    Forked workers share the index pages copy-on-write and connect their own
+    Voyage clients (and create the Gemini analyzer) in setup_rag(). They search
+    the shared embedding matrix in memory and never open ChromaDB, so the HNSW
+    index is not loaded once per worker; only the parent builds and writes it.
+    Also called again by the supervisor after it reloads the index.
+    """
+    global retriever
+    if retriever is None:
+        retriever = VoyageRetriever()
+    retriever.in_memory_dense = True
+    retriever.disconnect()
+    return retriever
+
+
+def reload_retriever(background: bool = True) -> VoyageRetriever:
+    """
+    Build a fresh index from Config.DATASET_PATH and atomically swap the global `retriever`.
+    
+    The new snapshot is fully built (into its own collection) before the swap, so requests
+    keep being served by the old one in the meantime. Callers should read `retriever` once
+    per request so in-flight searches finish on the snapshot they started with; the old
+    collection is dropped once those have drained (VoyageRetriever.retire), in a
+    background thread, or before returning with background=False (a pre-fork parent
+    must not fork while that thread runs, and disconnects the new snapshot right after).
+    Blocking - run it off the event loop (e.g. asyncio.to_thread).
+    """
+    global retriever
+    with _reload_lock:
+        start = time.time()
+        old_retriever = retriever
+        new_retriever = VoyageRetriever(previous=old_retriever)
+        retriever = new_retriever  # single reference assignment = atomic swap
+        print(f"🔁 Voyage index reloaded: {len(new_retriever.doc_ids)} documents in {time.time() - start:.2f}s")
+    if old_retriever is None:
+        return new_retriever
+    if not background:
+        old_retriever.retire(new_retriever)
+    else:
+        # Drop the old collection in the background once its searches have drained
+        threading.Thread(target=old_retriever.retire, args=(new_retriever,),
+                         name="retire-collection", daemon=True).start()
+    return new_retriever
+
+
+async def watch_dataset(interval: float = None):
+    """Poll Config.DATASET_PATH and hot-reload the index in the background when it changes."""
+    interval = interval or Config.DATASET_WATCH_INTERVAL
+    print(f"👀 Watching {Config.DATASET_PATH} for changes (every {interval}s)")
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if retriever is None or not os.path.exists(Config.DATASET_PATH):
+                continue
+            if os.path.getmtime(Config.DATASET_PATH) > retriever.dataset_mtime:
+                logger.info("Dataset change detected. Reloading index in background...")
+                await asyncio.to_thread(reload_retriever)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Dataset reload failed, keeping current index: {e}")
@@ -0,0 +1,93 @@
+"""
+Hybrid vs Dense-only Retrieval Benchmark
+========================================
+Voyage dense 검색과 Dense + BM25 (RRF) 하이브리드 검색의 Recall / Latency를 비교합니다.
+
+각 레이아웃의 OCR 텍스트(elements[].text) 일부를 쿼리로 사용하고,
+해당 레이아웃이 top-k 안에 들어오는지(Recall@k)를 측정합니다.
+쿼리 임베딩은 한 번만 계산하므로 두 모드의 차이는 검색/퓨전 단계의 비용만 반영됩니다.
+
+Usage:
+    python scripts/benchmark_hybrid_search.py [num_queries] [words_per_query]
+"""
+
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rag_voyage
+
+TOP_KS = [1, 5, 10]
+
+
+def build_queries(retriever, num_queries: int, words_per_query: int):
+    """Sample (query, target_doc_id) pairs from the OCR text of indexed layouts."""
+    random.seed(42)
+    candidates = []
+    for doc_id in retriever.doc_ids:
+        words = []
+        for elem in retriever.doc_map[doc_id].get('elements', []):
+            if elem.get('text'):
+                words.extend(elem['text'].split())
+        if len(words) >= words_per_query:
+            candidates.append((doc_id, words))
+
+    random.shuffle(candidates)
+    queries = []
+    for doc_id, words in candidates[:num_queries]:
+        start = random.randint(0, len(words) - words_per_query)
+        queries.append((" ".join(words[start:start + words_per_query]), doc_id))
+    return queries
+
+
+def run_mode(retriever, queries, embeddings, hybrid: bool):
+    hits = {k: 0 for k in TOP_KS}
+    latencies = []
+    for (query, target), embedding in zip(queries, embeddings):
+        start = time.perf_counter()
+        results = retriever._search_by_embedding(
+            embedding, top_k=max(TOP_KS), query=query, hybrid=hybrid
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        ranked = [r["image_id"] for r in results]
+        for k in TOP_KS:
+            if target in ranked[:k]:
+                hits[k] += 1
+    return hits, latencies
+
+
+def main():
+    num_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    words_per_query = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    retriever = rag_voyage.VoyageRetriever()
+    queries = build_queries(retriever, num_queries, words_per_query)
+    if not queries:
+        print("❌ No layouts with enough OCR text to build queries.")
+        return
+
+    print(f"🔄 Embedding {len(queries)} queries...")
+    start = time.perf_counter()
+    embeddings = retriever._get_voyage_embeddings([q for q, _ in queries], input_type="query")
+    embed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    print()
+    print("=" * 60)
+    print(f"📊 {len(queries)} queries, {words_per_query} OCR words each "
+          f"(query embedding: {embed_ms:.1f} ms/query, excluded below)")
+    print("=" * 60)
+    for label, hybrid in [("Dense only", False), ("Dense + BM25", True)]:
+        hits, latencies = run_mode(retriever, queries, embeddings, hybrid)
+        recall = ", ".join(f"R@{k}={hits[k] / len(queries):.2f}" for k in TOP_KS)
+        p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+        print(f"{label:<14} {recall} | "
+              f"median {statistics.median(latencies):.2f} ms, p95 {p95:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Image Fit Benchmark
+===================
+ImageValidator.fit_to_slot 경로의 처리량(images/sec)과 최대 RSS를 측정합니다.
+
+- baseline: 전체 해상도 디코딩 + 전체 해상도 LANCZOS 리사이징 (기존 방식)
+- reduced : JPEG draft() 축소 디코딩 + reduce()/LANCZOS (reducing_gap)
+
+각 (방식, 슬롯 크기) 조합은 별도 프로세스에서 실행하여 최대 RSS가 섞이지 않게 합니다.
+테스트 이미지는 합성 사진(노이즈 + 그라디언트) JPEG입니다.
+
+Usage:
+    python scripts/benchmark_image_fit.py [width] [height] [iterations]
+"""
+
+import io
+import os
+import sys
+import time
+import resource
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+# aura_render의 슬롯 크기 (이미지 수별 max_height 기준)
+SLOT_SIZES = [(400, 600), (266, 400), (186, 280), (146, 220)]
+
+
+def make_test_jpeg(width: int, height: int) -> bytes:
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 40, (height, width, 3)).astype(np.float32)
+    pixels = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+    buffered = io.BytesIO()
+    Image.fromarray(pixels).save(buffered, format="JPEG", quality=90)
+    return buffered.getvalue()
+
+
+def _baseline(data: bytes, slot_width: int, slot_height: int):
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    ratio = min(slot_width / img.width, slot_height / img.height)
+    return img.resize((int(img.width * ratio), int(img.height * ratio)), Image.Resampling.LANCZOS)
+
+
+def _reduced(data: bytes, slot_width: int, slot_height: int):
+    from image_validator import ImageSource, image_validator
+    source = ImageSource.from_bytes(data)
+    img = source.decode(draft_size=image_validator._required_source_size(source.size, slot_width, slot_height))
+    return image_validator.fit_to_slot(img.convert("RGB"), slot_width, slot_height, mode="contain")
+
+
+def peak_rss_mb() -> float:
+    """프로세스 최대 RSS (MB). ru_maxrss는 exec 이전 부모 값을 물려받으므로 VmHWM 우선 사용"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss: Linux는 KB 단위
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _worker(method: str, data: bytes, slot, iterations: int, queue):
+    fn = _baseline if method == "baseline" else _reduced
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(data, *slot)
+    elapsed = time.perf_counter() - start
+    queue.put((iterations / elapsed, peak_rss_mb()))
+
+
+def run(method: str, data: bytes, slot, iterations: int):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(method, data, slot, iterations, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 6000
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    print(f"🖼️  Generating {width}x{height} test JPEG...")
+    data = make_test_jpeg(width, height)
+    print(f"   {len(data) / 1024 / 1024:.1f} MB")
+    print()
+    print(f"{'slot':>10} | {'baseline img/s':>14} {'RSS MB':>8} | {'reduced img/s':>13} {'RSS MB':>8} | speedup")
+    print("-" * 76)
+    for slot in SLOT_SIZES:
+        base_ips, base_rss = run("baseline", data, slot, iterations)
+        red_ips, red_rss = run("reduced", data, slot, iterations)
+        print(f"{slot[0]:>4}x{slot[1]:<5} | {base_ips:>14.2f} {base_rss:>8.0f} | "
+              f"{red_ips:>13.2f} {red_rss:>8.0f} | {red_ips / base_ips:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
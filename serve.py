@@ -0,0 +1,243 @@
+"""
+[Production Server]
+Pre-fork launcher: python serve.py --workers 4 --port 8000
+
+- One worker by default (WEB_WORKERS / --workers raise it).
+- The parent imports the app and loads the retrieval index (doc_map, embeddings,
+  BM25) once, then freezes the GC so the loaded objects are not rewritten by
+  collections, and forks the workers. Workers share those pages copy-on-write
+  instead of each holding its own copy, and run dense search over the shared
+  embedding matrix, so ChromaDB (and its HNSW index) is opened by the parent only.
+- API clients, the Gemini analyzer and the MCP session pool are created in each
+  worker after the fork (app lifespan), so no sockets, SQLite handles or threads
+  are shared between processes.
+- All workers accept on one listening socket. Upstream rate limits are split
+  across workers; MCP_POOL_SIZE and MAX_INFLIGHT_PAGES apply per worker.
+- With more than one worker, job status/results and progress events go through
+  a shared SQLite file (AURA_STATE_DB, see shared_state.py) and Prometheus runs in
+  multiprocess mode (PROMETHEUS_MULTIPROC_DIR), so any worker can answer
+  /jobs, /ws/progress and /metrics for all of them.
+- Only the parent watches the dataset (DATASET_WATCH_INTERVAL) and writes the index
+  and its cache file. On a change, or SIGHUP (what /admin/reload-index sends from a
+  worker), it rebuilds the index and replaces the workers one by one; jobs still
+  running on a replaced worker are cancelled.
+- Workers that die are restarted; SIGTERM / SIGINT stop all of them.
+
+`python main.py` is still the single-process development server (auto-reload).
+"""
+
+import os
+import gc
+import sys
+import time
+import shutil
+import signal
+import tempfile
+import argparse
+
+import uvicorn
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AURA production server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", "1")))
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    return parser.parse_args()
+
+
+def prepare_shared_state() -> list:
+    """
+    Point the job store and Prometheus at per-run shared locations (unless set by the
+    environment). Must run before the app (and prometheus_client) is imported.
+    Returns the directories created here, removed again on exit.
+    """
+    created = []
+    if not os.getenv("AURA_STATE_DB"):
+        state_dir = tempfile.mkdtemp(prefix="aura-state-")
+        created.append(state_dir)
+        os.environ["AURA_STATE_DB"] = os.path.join(state_dir, "state.db")
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        # Samples of a previous run would be summed into this one
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+    else:
+        metrics_dir = tempfile.mkdtemp(prefix="aura-metrics-")
+        created.append(metrics_dir)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    return created
+
+
+def run_worker(config: uvicorn.Config, sock, workers: int):
+    """Worker process body: serve the app on the inherited socket until told to stop."""
+    # uvicorn installs its own SIGINT / SIGTERM handlers for graceful shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+    from admission import share_upstream_limits
+    share_upstream_limits(workers)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    def __init__(self, config: uvicorn.Config, workers: int, watch_interval: float = 0):
+        self.config = config
+        self.workers = workers
+        self.watch_interval = watch_interval
+        self.sock = config.bind_socket()
+        self.children = {}  # pid -> worker index
+        self.retiring = set()  # pids replaced after a reload (not restarted when they exit)
+        self.stopping = False
+        self.reload_requested = False
+
+    def spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            # Own process group: a terminal Ctrl-C reaches only the parent, which then stops
+            # each worker once (a second signal would make uvicorn skip graceful shutdown)
+            os.setpgid(0, 0)
+            status = 0
+            try:
+                run_worker(self.config, self.sock, self.workers)
+            except BaseException as e:
+                print(f"❌ [Serve] Worker {index} crashed: {e}")
+                status = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(status)
+        self.children[pid] = index
+        print(f"👷 [Serve] Worker {index} started (pid {pid})")
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def reload(self):
+        """Rebuild the index here, then replace the workers one by one (new one first)."""
+        import rag_voyage as rag_modules
+        try:
+            # Old collection dropped before disconnecting the new snapshot and forking
+            rag_modules.reload_retriever(background=False)
+            rag_modules.preload_index()
+        except Exception as e:
+            print(f"❌ [Serve] Index reload failed, keeping current workers: {e}")
+            return
+        gc.collect()
+        gc.freeze()
+        for pid, index in list(self.children.items()):
+            if self.stopping:
+                return
+            self.spawn(index)
+            self.retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def dataset_changed(self) -> bool:
+        import rag_voyage as rag_modules
+        path = rag_modules.Config.DATASET_PATH
+        retriever = rag_modules.retriever
+        return retriever is not None and os.path.exists(path) and os.path.getmtime(path) > retriever.dataset_mtime
+
+    def reap(self, pid: int, status: int):
+        from metrics import mark_process_dead
+        from shared_state import shared_state
+        mark_process_dead(pid)
+        if shared_state is not None:
+            orphaned = shared_state.fail_orphaned(pid)
+            if orphaned:
+                print(f"⚠️ [Serve] {len(orphaned)} jobs of pid {pid} marked failed")
+
+        index = self.children.pop(pid, None)
+        if pid in self.retiring:
+            self.retiring.discard(pid)
+            return
+        if index is None or self.stopping:
+            return
+        print(f"⚠️ [Serve] Worker {index} (pid {pid}) exited with code {os.waitstatus_to_exitcode(status)}, restarting")
+        time.sleep(1)  # don't spin if workers fail on startup
+        self.spawn(index)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, self.request_reload)
+        # Lets workers ask for a reload (/admin/reload-index) instead of rebuilding the index themselves
+        os.environ["AURA_SUPERVISOR_PID"] = str(os.getpid())
+        for index in range(self.workers):
+            self.spawn(index)
+
+        next_check = time.monotonic() + self.watch_interval
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.reap(pid, status)
+                continue
+
+            if self.watch_interval > 0 and time.monotonic() >= next_check and not self.stopping:
+                next_check = time.monotonic() + self.watch_interval
+                try:
+                    if self.dataset_changed():
+                        print("👀 [Serve] Dataset change detected")
+                        self.reload_requested = True
+                except OSError as e:
+                    print(f"⚠️ [Serve] Dataset check failed: {e}")
+            if self.reload_requested and not self.stopping:
+                self.reload_requested = False
+                self.reload()
+            time.sleep(0.2)
+
+        self.sock.close()
+        print("👋 [Serve] All workers stopped")
+
+
+def main():
+    args = parse_args()
+    workers = max(1, args.workers)
+    multi_worker = workers > 1 and hasattr(os, "fork")
+
+    created_dirs = prepare_shared_state() if multi_worker else []
+
+    import main as aura
+    import rag_voyage as rag_modules
+
+    if not aura.DEMO_MODE:
+        print("Preload: loading retrieval index before forking workers...")
+        start = time.perf_counter()
+        retriever = rag_modules.preload_index()
+        print(f"✅ Index ready: {len(retriever.doc_ids)} documents in {time.perf_counter() - start:.1f}s")
+
+    config = uvicorn.Config(aura.app, host=args.host, port=args.port, log_level=args.log_level)
+
+    if not multi_worker:
+        uvicorn.Server(config).run()
+        return
+
+    # Everything loaded so far is long-lived: keep the collector from touching (and copying) it
+    gc.collect()
+    gc.freeze()
+    print(f"🚀 [Serve] http://{args.host}:{args.port} with {workers} workers")
+    watch_interval = 0 if aura.DEMO_MODE else rag_modules.Config.DATASET_WATCH_INTERVAL
+    try:
+        Supervisor(config, workers, watch_interval).run()
+    finally:
+        for path in created_dirs:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
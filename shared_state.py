@@ -0,0 +1,198 @@
+"""
+[Shared State]
+SQLite-backed job and progress state shared by the pre-fork workers (serve.py).
+
+Each worker still runs the jobs it accepted, but mirrors their status and
+results and every progress event into one SQLite file, so GET /jobs/{id},
+DELETE /jobs/{id} and /ws/progress/{id} work whichever worker the request
+lands on. Cancelling a job owned by another worker sets a flag that the
+owning worker picks up.
+
+Writes from the event loop go through submit(), which runs them in order on one
+background thread, so a slow disk never stalls request handling. Page results are
+appended as their own rows instead of rewriting the job snapshot for every page.
+
+Enabled by AURA_STATE_DB (serve.py sets it when running more than one worker).
+A single process keeps everything in memory and never touches this module.
+"""
+
+import os
+import json
+import time
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner INTEGER NOT NULL,
+    cancel INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user, status);
+CREATE TABLE IF NOT EXISTS results (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_job ON results (job_id, seq);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    ts REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_channel ON events (channel, seq);
+"""
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class SharedState:
+    """
+    Jobs and progress events in one SQLite file (WAL mode, so readers don't block the writer).
+
+    A connection is opened per operation: connections must not cross fork() or
+    threads, and every statement here is a single small read or write.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Threads start on first submit(), i.e. in the worker that writes, never before fork()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _execute(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def submit(self, write: Callable[..., Any], *args) -> Future:
+        """Run a write on the writer thread (writes are applied in submission order)."""
+        future = self._writer.submit(write, *args)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def flush(self):
+        """Block until every write submitted so far has been applied."""
+        self._writer.submit(lambda: None).result()
+
+    @staticmethod
+    def _log_failure(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"⚠️ [SharedState] Write failed: {future.exception()}")
+
+    # --- Jobs ---
+
+    def save_job(self, state: Dict[str, Any]):
+        """
+        Insert or update a job (Job.to_state(), without its results). A pending cancel
+        flag is kept.
+        """
+        self._execute(
+            "INSERT INTO jobs (id, user, status, owner, updated, data) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET status = excluded.status, updated = excluded.updated, data = excluded.data",
+            (state["id"], state["user"], state["status"], os.getpid(), time.time(), json.dumps(state))
+        )
+
+    def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._execute("SELECT data, cancel FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        state = json.loads(rows[0][0])
+        state["cancel_requested"] = bool(rows[0][1])
+        state["results"] = [
+            json.loads(data) for (data,) in
+            self._execute("SELECT data FROM results WHERE job_id = ? ORDER BY seq", (job_id,))
+        ]
+        return state
+
+    def add_result(self, job_id: str, result: Dict[str, Any]):
+        """Append one finished page's result to a job."""
+        self._execute("INSERT INTO results (job_id, data) VALUES (?, ?)", (job_id, json.dumps(result)))
+
+    def active_jobs(self, user: str) -> int:
+        """Queued + running jobs of a user across all workers."""
+        rows = self._execute(
+            "SELECT COUNT(*) FROM jobs WHERE user = ? AND status IN (?, ?)", (user, *ACTIVE_STATUSES)
+        )
+        return rows[0][0]
+
+    def request_cancel(self, job_id: str):
+        self._execute("UPDATE jobs SET cancel = 1 WHERE id = ?", (job_id,))
+
+    def cancel_requested(self, job_ids: List[str]) -> List[str]:
+        """Which of the given (locally running) jobs were cancelled through another worker."""
+        if not job_ids:
+            return []
+        placeholders = ",".join("?" * len(job_ids))
+        rows = self._execute(f"SELECT id FROM jobs WHERE cancel = 1 AND id IN ({placeholders})", tuple(job_ids))
+        return [row[0] for row in rows]
+
+    def fail_orphaned(self, owner: int) -> List[str]:
+        """
+        Mark the active jobs of a worker that died without finishing them as failed
+        and end their progress streams. Called by the supervisor. Returns the job ids.
+        """
+        rows = self._execute(
+            "SELECT data FROM jobs WHERE owner = ? AND status IN (?, ?)", (owner, *ACTIVE_STATUSES)
+        )
+        job_ids = []
+        for (data,) in rows:
+            state = json.loads(data)
+            state.update(status="failed", error="Worker process exited", finished_at=time.time())
+            self.save_job(state)
+            self.append_event(state["id"], {"ts": round(time.time(), 3), "type": "job_finished", "status": "failed"})
+            job_ids.append(state["id"])
+        return job_ids
+
+    # --- Progress events ---
+
+    def append_event(self, channel: str, event: Dict[str, Any]):
+        self._execute(
+            "INSERT INTO events (channel, ts, data) VALUES (?, ?, ?)",
+            (channel, time.time(), json.dumps(event))
+        )
+
+    def events_after(self, channel: str, seq: int = 0, limit: int = 1024) -> List[Tuple[int, Dict[str, Any]]]:
+        """(seq, event) pairs of a channel newer than seq, oldest first."""
+        rows = self._execute(
+            "SELECT seq, data FROM events WHERE channel = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (channel, seq, limit)
+        )
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def purge(self, ttl: float):
+        """Drop finished jobs and events older than ttl seconds."""
+        cutoff = time.time() - ttl
+        self._execute(
+            "DELETE FROM jobs WHERE updated < ? AND status NOT IN (?, ?)", (cutoff, *ACTIVE_STATUSES)
+        )
+        self._execute("DELETE FROM results WHERE job_id NOT IN (SELECT id FROM jobs)")
+        self._execute("DELETE FROM events WHERE ts < ?", (cutoff,))
+
+
+def shared_state_from_env() -> Optional[SharedState]:
+    """SharedState at AURA_STATE_DB, or None for a single in-memory process."""
+    path = os.getenv("AURA_STATE_DB")
+    return SharedState(path) if path else None
+
+
+# Global instance (None unless running under the multi-worker launcher)
+shared_state = shared_state_from_env()
@@ -0,0 +1,153 @@
+"""
+Admission control primitives: TokenBucket rate limiting, CircuitBreaker state
+transitions and AdmissionController capacity / queue bounds.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, CircuitBreaker, CircuitOpen, Overloaded, TokenBucket
+
+
+def test_bucket_allows_burst_then_paces():
+    bucket = TokenBucket("test", rate=50, burst=2)
+
+    async def run():
+        return [await bucket.acquire() for _ in range(3)]
+
+    waits = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert 0 < waits[2] <= 1 / 50
+    assert bucket.stats["acquired"] == 3 and bucket.stats["delayed"] == 1
+
+
+def test_bucket_rejects_beyond_max_wait_without_taking_tokens():
+    bucket = TokenBucket("test", rate=1, burst=1)
+
+    async def run():
+        await bucket.acquire()
+        with pytest.raises(Overloaded) as excinfo:
+            await bucket.acquire(max_wait=0.1)
+        return excinfo.value
+
+    error = asyncio.run(run())
+    assert error.retry_after == 1
+    assert bucket.stats["rejected"] == 1 and bucket.stats["acquired"] == 1
+    assert bucket.tokens >= 0
+
+
+def test_bucket_with_zero_rate_is_unlimited():
+    bucket = TokenBucket("test", rate=0, burst=1)
+
+    async def run():
+        return [await bucket.acquire() for _ in range(5)]
+
+    assert asyncio.run(run()) == [0.0] * 5
+
+
+def fail(breaker, error=RuntimeError("upstream down")):
+    with pytest.raises(type(error)):
+        with breaker.guard():
+            raise error
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    fail(breaker)
+    with breaker.guard():
+        pass  # a success resets the count
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    called = []
+    with pytest.raises(CircuitOpen) as excinfo:
+        with breaker.guard():
+            called.append(1)
+    assert not called
+    assert excinfo.value.retry_after >= 59
+    assert breaker.stats["opened"] == 1 and breaker.stats["rejected"] == 1
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    fail(breaker)
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    with breaker.guard():
+        # a second call while the probe is running is rejected
+        with pytest.raises(CircuitOpen):
+            with breaker.guard():
+                pass
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        fail(breaker)
+    time.sleep(0.06)
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_local_overload_is_not_an_upstream_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    fail(breaker, Overloaded("no session free"))
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats["failures"] == 0
+
+
+def test_admission_waits_for_capacity():
+    controller = AdmissionController(max_inflight_pages=2, max_queue=4, max_wait=2)
+    order = []
+
+    async def page(name, hold):
+        async with controller.admit(2):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def run():
+        first = asyncio.create_task(page("first", 0.05))
+        await asyncio.sleep(0)
+        await asyncio.gather(first, page("second", 0))
+
+    asyncio.run(run())
+    assert order == ["first", "second"]
+    assert controller.in_flight == 0
+    assert controller.stats["queued"] == 1 and controller.stats["admitted"] == 2
+
+
+def test_admission_rejects_on_timeout_and_full_queue():
+    controller = AdmissionController(max_inflight_pages=1, max_queue=1, max_wait=0.05)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(controller.admit().__aenter__())
+        await asyncio.sleep(0)
+        assert controller.waiting == 1
+
+        # queue full: rejected without waiting
+        with pytest.raises(Overloaded, match="queue full"):
+            async with controller.admit():
+                pass
+        # the waiter gives up after max_wait
+        with pytest.raises(Overloaded, match="No capacity"):
+            await waiter
+        release.set()
+        await holder
+
+    asyncio.run(run())
+    assert controller.waiting == 0 and controller.in_flight == 0
+    assert controller.stats["rejected"] == 2
@@ -0,0 +1,92 @@
+"""
+AssetCache: precompressed variants with their own ETags, Accept-Encoding
+negotiation, 304 on a matching If-None-Match, and reload when the file changes.
+"""
+
+import gzip
+import os
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from starlette.requests import Request
+
+from asset_cache import AssetCache
+
+PAGE = ("<html><body>" + "<p>magazine layout</p>" * 200 + "</body></html>").encode()
+
+
+def request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+@pytest.fixture
+def page(tmp_path):
+    path = tmp_path / "index.html"
+    path.write_bytes(PAGE)
+    return str(path)
+
+
+def test_gzip_variant_is_negotiated(page):
+    cache = AssetCache()
+
+    response = cache.response(page, request(accept_encoding="gzip, deflate"))
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == PAGE
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    plain = cache.response(page, request())
+    assert "content-encoding" not in plain.headers
+    assert plain.body == PAGE
+    assert plain.headers["etag"] != response.headers["etag"]
+
+    refused = cache.response(page, request(accept_encoding="gzip;q=0"))
+    assert "content-encoding" not in refused.headers
+
+
+def test_matching_etag_gets_304(page):
+    cache = AssetCache()
+    etag = cache.response(page, request(accept_encoding="gzip")).headers["etag"]
+
+    response = cache.response(page, request(accept_encoding="gzip", if_none_match=f'W/{etag}'))
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+    assert cache.stats["not_modified"] == 1
+
+    stale = cache.response(page, request(if_none_match='"other"'))
+    assert stale.status_code == 200
+
+
+def test_file_is_read_once_and_reloaded_on_change(page):
+    cache = AssetCache()
+    first = cache.get(page)
+    assert cache.get(page) is first
+    assert cache.stats == {"hits": 1, "misses": 1, "not_modified": 0}
+
+    with open(page, "ab") as f:
+        f.write(b"<!-- edited -->")
+    reloaded = cache.get(page)
+    assert reloaded is not first
+    assert reloaded.text.endswith("<!-- edited -->")
+    assert reloaded.etags.isdisjoint(first.etags)
+
+
+def test_incompressible_file_has_no_gzip_variant(tmp_path):
+    path = tmp_path / "blob.bin"
+    path.write_bytes(os.urandom(256))
+
+    asset = AssetCache().get(str(path), "application/octet-stream")
+    assert "gzip" not in asset.variants
+
+
+def test_brotli_preferred_when_accepted(page):
+    brotli = pytest.importorskip("brotli")
+    cache = AssetCache()
+
+    response = cache.response(page, request(accept_encoding="gzip, br"))
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(response.body) == PAGE
+    assert cache.response(page, request(accept_encoding="gzip")).headers["content-encoding"] == "gzip"
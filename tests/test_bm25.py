@@ -0,0 +1,59 @@
+"""
+BM25Index scoring, ranking and filter masks on a handful of layout texts.
+"""
+
+import numpy as np
+
+from bm25 import BM25Index
+
+TEXTS = [
+    "Summer travel guide to the Alps",
+    "Alps alps ALPS hiking",
+    "Minimal fashion editorial",
+    "Travel notes from Seoul, travel diary",
+]
+
+
+def test_tokenize_is_case_insensitive():
+    assert BM25Index.tokenize("Seoul, TRAVEL diary!") == ["seoul", "travel", "diary"]
+
+
+def test_score_matches_only_documents_with_query_terms():
+    index = BM25Index(TEXTS)
+    scores = index.score("alps")
+
+    assert scores.shape == (len(TEXTS),)
+    assert scores[0] > 0 and scores[1] > 0
+    assert scores[2] == 0 and scores[3] == 0
+    # repeated terms (saturating tf) outweigh a single mention
+    assert scores[1] > scores[0]
+
+
+def test_unknown_terms_score_zero():
+    index = BM25Index(TEXTS)
+    assert not index.score("unknownword").any()
+    assert index.top_n("unknownword", 3) == []
+
+
+def test_top_n_orders_by_score_and_skips_zero_scores():
+    index = BM25Index(TEXTS)
+    scores = index.score("travel alps")
+
+    top = index.top_n("travel alps", 10)
+    assert top == sorted(np.flatnonzero(scores).tolist(), key=lambda i: -scores[i])
+    assert 2 not in top
+    assert index.top_n("travel alps", 1) == top[:1]
+
+
+def test_mask_excludes_filtered_documents():
+    index = BM25Index(TEXTS)
+    mask = np.array([False, False, True, True])
+
+    assert index.top_n("alps travel", 5, mask=mask) == [3]
+    assert index.top_n("alps", 5, mask=mask) == []
+
+
+def test_empty_index():
+    index = BM25Index([])
+    assert index.score("anything").shape == (0,)
+    assert index.top_n("anything", 3) == []
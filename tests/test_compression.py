@@ -0,0 +1,109 @@
+"""
+CompressionMiddleware: what gets gzipped (size threshold, content type, path,
+Accept-Encoding, existing encoding) and streamed responses compressed per chunk.
+"""
+
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from compression import THREAD_THRESHOLD, CompressionMiddleware
+
+HTML = "text/html; charset=utf-8"
+
+
+def app_sending(chunks, content_type=HTML, extra_headers=()):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type.encode()), *extra_headers]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def call(app, path="/jobs/1", accept="gzip", **options):
+    middleware = CompressionMiddleware(app, paths=("/jobs",), **options)
+    headers = [(b"accept-encoding", accept.encode())] if accept else []
+    scope = {"type": "http", "method": "GET", "path": path, "headers": headers}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    start = messages[0]
+    return dict((k.decode(), v.decode()) for k, v in start["headers"]), messages[1:]
+
+
+def body_of(messages) -> bytes:
+    return b"".join(m.get("body", b"") for m in messages)
+
+
+def test_large_response_is_gzipped():
+    page = b"<p>layout</p>" * 500
+    headers, messages = call(app_sending([page]), minimum_size=1024)
+
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(body_of(messages)) == page
+    assert int(headers["content-length"]) == len(body_of(messages))
+    assert float(headers["x-compression-ratio"]) > 1
+
+
+def test_threshold_is_inclusive():
+    headers, _ = call(app_sending([b"x" * 1024]), minimum_size=1024)
+    assert headers["content-encoding"] == "gzip"
+
+    headers, messages = call(app_sending([b"x" * 1023]), minimum_size=1024)
+    assert "content-encoding" not in headers
+    assert body_of(messages) == b"x" * 1023
+
+
+def test_body_above_thread_threshold():
+    page = b"abcdefgh" * (THREAD_THRESHOLD // 8 + 1)
+    headers, messages = call(app_sending([page]))
+    assert gzip.decompress(body_of(messages)) == page
+
+
+PNG = b"\x89PNG" * 1000
+TEXT = b"x" * 4096
+
+
+@pytest.mark.parametrize("app, body, kwargs", [
+    (app_sending([PNG], content_type="image/png"), PNG, {}),
+    (app_sending([TEXT], extra_headers=[(b"content-encoding", b"br")]), TEXT, {}),
+    (app_sending([TEXT]), TEXT, {"accept": ""}),
+    (app_sending([TEXT]), TEXT, {"accept": "br"}),
+    (app_sending([TEXT]), TEXT, {"path": "/static/index.html"}),
+])
+def test_passthrough(app, body, kwargs):
+    headers, messages = call(app, **kwargs)
+    assert headers.get("content-encoding") != "gzip"
+    assert body_of(messages) == body
+
+
+def test_streamed_response_is_compressed_per_chunk():
+    chunks = [b"<section>page %d</section>" % i * 50 for i in range(3)]
+    headers, messages = call(app_sending(chunks, extra_headers=[(b"content-length", b"999999")]))
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert [m["more_body"] for m in messages] == [True, True, False]
+
+    # each chunk is decodable on arrival (sync flush)
+    decoder = zlib.decompressobj(31)
+    for chunk, message in zip(chunks, messages):
+        assert decoder.decompress(message["body"]) == chunk
+
+
+def test_short_streamed_response_is_not_compressed():
+    headers, messages = call(app_sending([b"a", b"b"], extra_headers=[(b"content-length", b"2")]))
+    assert "content-encoding" not in headers
+    assert body_of(messages) == b"ab"
@@ -0,0 +1,97 @@
+"""
+QueryEncodeBatcher: concurrent queries share one encode() call, cancelled queries
+are dropped before encoding, and an encode failure reaches every caller in the batch.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+# rag_modules imports the embedding model, vector store and API clients at module level
+pytest.importorskip("chromadb")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("FlagEmbedding")
+pytest.importorskip("dotenv")
+
+from rag_modules import QueryEncodeBatcher
+
+
+class FakeModel:
+    """Records each batch; optionally blocks until released so queries pile up."""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def encode(self, queries, return_dense=True, return_sparse=True):
+        self.batches.append(list(queries))
+        self.entered.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("encode failed")
+        return {
+            "dense_vecs": [[float(len(q))] for q in queries],
+            "lexical_weights": [{q: 1.0} for q in queries],
+        }
+
+
+def test_concurrent_queries_share_a_batch():
+    model = FakeModel()
+    batcher = QueryEncodeBatcher(model, max_batch_size=8, max_wait_ms=200)
+
+    async def run():
+        return await asyncio.gather(*(batcher.aencode(q) for q in ["a", "bb", "ccc"]))
+
+    results = asyncio.run(run())
+
+    assert model.batches == [["a", "bb", "ccc"]]
+    assert results[1] == ([2.0], {"bb": 1.0})
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["queries"] == 3
+    assert stats["avg_batch_size"] == 3
+
+
+def test_batch_size_is_capped():
+    model = FakeModel()
+    batcher = QueryEncodeBatcher(model, max_batch_size=2, max_wait_ms=200)
+
+    futures = [batcher.submit(q) for q in ["a", "b", "c"]]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert [len(batch) for batch in model.batches] == [2, 1]
+
+
+def test_cancelled_query_is_not_encoded():
+    model = FakeModel()
+    model.release.clear()
+    batcher = QueryEncodeBatcher(model, max_batch_size=8, max_wait_ms=0)
+
+    # Hold the worker in encode() so the next queries wait in the queue
+    first = batcher.submit("first")
+    assert model.entered.wait(5)
+    kept = batcher.submit("kept")
+    dropped = batcher.submit("dropped")
+    assert dropped.cancel()
+    model.release.set()
+
+    first.result(timeout=5)
+    kept.result(timeout=5)
+    assert model.batches == [["first"], ["kept"]]
+
+
+def test_encode_failure_reaches_every_caller():
+    model = FakeModel(fail=True)
+    model.release.clear()
+    batcher = QueryEncodeBatcher(model, max_batch_size=8, max_wait_ms=200)
+
+    futures = [batcher.submit(q) for q in ["a", "b"]]
+    model.release.set()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="encode failed"):
+            future.result(timeout=5)
@@ -0,0 +1,73 @@
+"""
+encode_image: format choice by content and the byte budget (quality steps down
+until the output fits target_bytes).
+"""
+
+import numpy as np
+from PIL import Image
+
+from image_validator import ImageValidator
+
+
+def noisy_photo(size=(160, 120)):
+    rng = np.random.default_rng(0)
+    base = np.linspace(0, 255, size[0], dtype=np.float32)[None, :, None]
+    pixels = np.clip(base + rng.normal(0, 40, (size[1], size[0], 3)), 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
+
+def test_no_budget_uses_highest_quality():
+    validator = ImageValidator(output_format="jpeg")
+    best, fmt = validator.encode_image(noisy_photo())
+    smaller, _ = validator.encode_image(noisy_photo(), target_bytes=len(best) - 1)
+
+    assert fmt == "JPEG"
+    assert len(smaller) < len(best)
+
+
+def test_budget_picks_first_quality_that_fits():
+    validator = ImageValidator(output_format="jpeg")
+    image = noisy_photo()
+    sizes = {q: len(ImageValidator(default_quality=q, output_format="jpeg").encode_image(image)[0])
+             for q in ImageValidator.QUALITY_STEPS}
+    target = sizes[65]
+
+    data, _ = validator.encode_image(image, target_bytes=target)
+
+    assert len(data) == target
+    assert all(sizes[q] > target for q in (95, 85, 75))
+
+
+def test_unreachable_budget_returns_lowest_quality():
+    validator = ImageValidator(output_format="jpeg")
+    image = noisy_photo()
+    lowest, _ = ImageValidator(default_quality=ImageValidator.QUALITY_STEPS[-1], output_format="jpeg").encode_image(image)
+
+    data, _ = validator.encode_image(image, target_bytes=1)
+
+    assert data == lowest
+
+
+def test_auto_format_follows_content():
+    validator = ImageValidator()
+    flat = Image.new("RGB", (64, 64), (30, 60, 90))
+    transparent = Image.new("RGBA", (64, 64), (30, 60, 90, 0))
+
+    assert validator.encode_image(flat)[1] == "PNG"
+    assert validator.encode_image(transparent)[1] == "PNG"
+    expected = "WEBP" if validator.webp_available else "JPEG"
+    assert validator.encode_image(noisy_photo(), target_bytes=10_000)[1] == expected
+
+
+def test_prepare_for_layout_budget_scales_with_slot():
+    validator = ImageValidator(output_format="jpeg")
+    result = validator.prepare_for_layout(noisy_photo((320, 240)), slot_info={"width": 160, "height": 120})
+
+    assert result["success"] and result["format"] == "JPEG"
+    budget = int(160 * 120 * ImageValidator.TARGET_BYTES_PER_PIXEL)
+    assert f"(목표 {budget / 1024:.1f}KB)" in result["adjustments"][-1]
+
+    explicit = validator.prepare_for_layout(
+        noisy_photo((320, 240)), slot_info={"width": 160, "height": 120, "target_bytes": 1}
+    )
+    assert len(explicit["data"]) < len(result["data"])
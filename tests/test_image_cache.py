@@ -0,0 +1,111 @@
+"""
+ImageCache: memory LRU by byte budget, the disk tier (shared across instances and
+restarts, LRU by disk_max_bytes), temp-file writes and min_age retention.
+"""
+
+import os
+
+from image_validator import ImageCache
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = ImageCache(max_bytes=10)
+    cache.put("a", b"aaaa", {})
+    cache.put("b", b"bbbb", {})
+    assert cache.get("a") == (b"aaaa", {})
+
+    cache.put("c", b"cccc", {})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.current_bytes == 8
+    assert cache.stats["evictions"] == 1
+
+
+def test_oversized_entry_is_not_kept_in_memory():
+    cache = ImageCache(max_bytes=4)
+    cache.put("big", b"12345", {})
+    assert cache.get("big") is None
+    assert cache.current_bytes == 0
+
+
+def test_contains_does_not_count_as_lookup():
+    cache = ImageCache(max_bytes=10)
+    cache.put("a", b"a", {})
+    assert cache.contains("a") and not cache.contains("b")
+    assert cache.stats["hits"] == 0 and cache.stats["misses"] == 0
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    ImageCache(max_bytes=100, disk_dir=str(tmp_path)).put("k", b"data", {"mime": "image/png"})
+
+    fresh = ImageCache(max_bytes=100, disk_dir=str(tmp_path))
+    assert fresh.get("k") == (b"data", {"mime": "image/png"})
+    assert fresh.stats["disk_hits"] == 1
+    # promoted to memory
+    assert fresh.get("k") is not None
+    assert fresh.stats["hits"] == 1
+
+
+def test_disk_writes_leave_no_temp_files(tmp_path):
+    cache = ImageCache(max_bytes=100, disk_dir=str(tmp_path))
+    for i in range(3):
+        cache.put(f"k{i}", b"x" * 10, {"i": i})
+        cache.put(f"k{i}", b"y" * 10, {"i": i})
+
+    names = sorted(os.listdir(tmp_path))
+    assert names == ["k0", "k0.json", "k1", "k1.json", "k2", "k2.json"]
+    assert (tmp_path / "k1").read_bytes() == b"y" * 10
+
+
+def test_failed_disk_write_cleans_up(tmp_path, monkeypatch):
+    cache = ImageCache(max_bytes=100, disk_dir=str(tmp_path))
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    cache.put("k", b"data", {})
+
+    assert os.listdir(tmp_path) == []
+    # still served from memory
+    assert cache.get("k") == (b"data", {})
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ImageCache(max_bytes=100, disk_dir=str(tmp_path), disk_max_bytes=8)
+    cache.put("a", b"aaaa", {})
+    cache.put("b", b"bbbb", {})
+    cache.put("c", b"cccc", {})
+
+    assert not (tmp_path / "a").exists() and not (tmp_path / "a.json").exists()
+    assert (tmp_path / "b").exists() and (tmp_path / "c").exists()
+    assert cache.disk_bytes == 8
+    assert cache.stats["disk_evictions"] == 1
+
+
+def test_restart_rescans_disk_budget(tmp_path):
+    cache = ImageCache(max_bytes=100, disk_dir=str(tmp_path))
+    for key in ("a", "b", "c"):
+        cache.put(key, b"1234", {})
+    os.utime(tmp_path / "a", (1, 1))
+
+    ImageCache(max_bytes=100, disk_dir=str(tmp_path), disk_max_bytes=8)
+
+    assert not (tmp_path / "a").exists()
+    assert (tmp_path / "b").exists() and (tmp_path / "c").exists()
+
+
+def test_min_age_keeps_recent_entries_in_last_tier(tmp_path):
+    memory_only = ImageCache(max_bytes=4, min_age=60)
+    memory_only.put("a", b"aaaa", {})
+    memory_only.put("b", b"bbbb", {})
+    assert memory_only.get("a") is not None and memory_only.get("b") is not None
+
+    # with a disk tier only the disk is protected; memory still evicts
+    tiered = ImageCache(max_bytes=4, disk_dir=str(tmp_path), disk_max_bytes=4, min_age=60)
+    tiered.put("a", b"aaaa", {})
+    tiered.put("b", b"bbbb", {})
+    assert tiered.current_bytes == 4
+    assert (tmp_path / "a").exists() and (tmp_path / "b").exists()
+    assert tiered.get("a") == (b"aaaa", {})
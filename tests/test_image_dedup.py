@@ -0,0 +1,103 @@
+"""
+ImageDeduplicator: near-identical images share a canonical id, memo() runs the
+factory once per key (retrying after a failure), and claim()/forget() share and
+release in-flight work.
+"""
+
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+from image_validator import ImageDeduplicator, ImageSource
+
+
+def photo(size, fmt="PNG", quality=90):
+    """Horizontal gradient with a dark block: distinctive dHash, stable under re-encoding."""
+    image = Image.linear_gradient("L").rotate(90).resize(size).convert("RGB")
+    image.paste((20, 20, 20), (size[0] // 4, size[1] // 4, size[0] // 2, size[1] // 2))
+    buffered = io.BytesIO()
+    image.save(buffered, format=fmt, quality=quality)
+    return ImageSource.from_bytes(buffered.getvalue())
+
+
+def test_reencoded_and_resized_copies_share_an_id():
+    dedup = ImageDeduplicator()
+    original = dedup.canonical_id(photo((256, 192)))
+
+    assert dedup.canonical_id(photo((256, 192), fmt="JPEG", quality=60)) == original
+    assert dedup.canonical_id(photo((128, 96))) == original
+    assert dedup.stats == {"images": 3, "duplicates": 2}
+
+
+def test_different_image_or_crop_gets_a_new_id():
+    dedup = ImageDeduplicator()
+    original = dedup.canonical_id(photo((256, 192)))
+
+    flipped = ImageSource(image=photo((256, 192)).image.transpose(Image.Transpose.FLIP_LEFT_RIGHT))
+    assert dedup.canonical_id(flipped) != original
+    # same content, different aspect ratio (a crop) is not merged
+    assert dedup.canonical_id(photo((256, 128))) != original
+
+
+def test_memo_runs_factory_once_per_key():
+    dedup = ImageDeduplicator()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return "url"
+
+    assert dedup.memo("k", factory) == "url"
+    assert dedup.memo("k", factory) == "url"
+    assert len(calls) == 1
+
+
+def test_memo_concurrent_callers_wait_for_the_first():
+    dedup = ImageDeduplicator()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(dedup.memo("k", slow)))
+    owner.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=lambda: results.append(dedup.memo("k", slow)))
+    waiter.start()
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert results == ["value", "value"]
+    assert len(calls) == 1
+
+
+def test_memo_failure_is_retried():
+    dedup = ImageDeduplicator()
+
+    def fail():
+        raise RuntimeError("encode failed")
+
+    with pytest.raises(RuntimeError):
+        dedup.memo("k", fail)
+    assert dedup.memo("k", lambda: "ok") == "ok"
+
+
+def test_claim_and_forget():
+    dedup = ImageDeduplicator()
+    first, second = object(), object()
+
+    assert dedup.claim("k", first) is first
+    assert dedup.claim("k", second) is first
+    # only the registered value can be forgotten
+    dedup.forget("k", second)
+    assert dedup.claim("k", second) is first
+    dedup.forget("k", first)
+    assert dedup.claim("k", second) is second
@@ -0,0 +1,64 @@
+"""
+Header probe: limits are checked before any pixel decode, the decode strategy is
+picked from the header alone, and no dHash is computed on the way.
+"""
+
+import io
+
+from PIL import Image
+
+from image_validator import ImageSource, ImageValidator
+
+
+def encoded(size, fmt="PNG", color=(200, 80, 40)):
+    buffered = io.BytesIO()
+    Image.new("RGB", size, color).save(buffered, format=fmt)
+    return buffered.getvalue()
+
+
+def test_too_many_pixels_is_rejected_without_decoding():
+    validator = ImageValidator()
+    validator.MAX_PIXELS = 100 * 100
+    source = ImageSource.from_bytes(encoded((200, 100)))
+
+    result = validator.prepare_for_layout(source, slot_info={"width": 50, "height": 50})
+
+    assert result["rejected"] and not result["success"]
+    assert "MP" in result["error"]
+    assert not source._decoded
+    assert result["probe"]["decode_strategy"] == "full"
+
+
+def test_too_many_bytes_is_rejected_without_decoding():
+    validator = ImageValidator()
+    data = encoded((64, 64))
+    validator.MAX_SOURCE_BYTES = len(data) - 1
+    source = ImageSource.from_bytes(data)
+
+    result = validator.prepare_for_layout(source, slot_info={"width": 32, "height": 32})
+
+    assert result["rejected"]
+    assert not source._decoded
+
+
+def test_probe_reads_header_only():
+    validator = ImageValidator()
+    source = ImageSource.from_bytes(encoded((400, 300), fmt="JPEG"))
+
+    info = validator.probe(source, (100, 75, "contain"))
+
+    assert (info["format"], info["width"], info["height"]) == ("JPEG", 400, 300)
+    assert info["decode_strategy"] == "draft"
+    assert info["draft_size"] == (200, 150)
+    assert "dhash" not in info
+    assert not source._decoded and source._dhash is None
+
+
+def test_probe_full_decode_when_draft_does_not_apply():
+    validator = ImageValidator()
+    png = ImageSource.from_bytes(encoded((400, 300)))
+    small_jpeg = ImageSource.from_bytes(encoded((120, 90), fmt="JPEG"))
+
+    assert validator.probe(png, (100, 75, "contain"))["decode_strategy"] == "full"
+    assert validator.probe(small_jpeg, (100, 75, "contain"))["decode_strategy"] == "full"
+    assert validator.probe(png)["draft_size"] is None
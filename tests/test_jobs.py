@@ -0,0 +1,151 @@
+"""
+JobManager: per-user and queue limits, cancellation of queued and running jobs,
+TTL purge, and the job mirrored to the shared state store for other workers.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from jobs import Job, JobLimitExceeded, JobManager, JobQueueFull
+from shared_state import SharedState
+
+PAGES = [{"id": 2}, {"id": 1}]
+
+
+def blocking_runner(release: asyncio.Event):
+    async def runner(job, on_result):
+        results = []
+        for page in job.pages_info:
+            await release.wait()
+            result = {"page_id": page["id"], "status": "ok"}
+            on_result(result)
+            results.append(result)
+        return results
+    return runner
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_job_runs_and_results_are_in_page_order():
+    async def run():
+        release = asyncio.Event()
+        release.set()
+        finished = []
+        manager = JobManager(blocking_runner(release), workers=1, on_finish=finished.append)
+        manager.start()
+        job = manager.submit("alice", PAGES)
+        await wait_for(lambda: not job.active)
+        await manager.stop()
+        return job, finished
+
+    job, finished = asyncio.run(run())
+
+    assert job.status == Job.DONE and finished == [job]
+    data = job.to_dict()
+    assert data["pages_done"] == 2
+    assert [r["page_id"] for r in data["results"]] == [2, 1]
+
+
+def test_per_user_and_queue_limits():
+    async def run():
+        manager = JobManager(blocking_runner(asyncio.Event()), workers=1, max_queue=2, max_per_user=2)
+        manager.submit("alice", PAGES)
+        manager.submit("alice", PAGES)
+        with pytest.raises(JobLimitExceeded):
+            manager.submit("alice", PAGES)
+        with pytest.raises(JobQueueFull):
+            manager.submit("bob", PAGES)
+        assert manager.queue_depth == 2
+
+    asyncio.run(run())
+
+
+def test_cancel_queued_and_running_jobs():
+    async def run():
+        manager = JobManager(blocking_runner(asyncio.Event()), workers=1, max_per_user=3)
+        manager.start()
+        running = manager.submit("alice", PAGES)
+        queued = manager.submit("alice", PAGES)
+        await wait_for(lambda: running.status == Job.RUNNING)
+
+        assert manager.cancel(queued.id, user="bob") is None
+        manager.cancel(queued.id, user="alice")
+        manager.cancel(running.id)
+        await wait_for(lambda: not running.active)
+        # a cancelled job frees the user's slots
+        manager.submit("alice", PAGES)
+        manager.submit("alice", PAGES)
+        await manager.stop()
+        return running, queued
+
+    running, queued = asyncio.run(run())
+    assert queued.status == Job.CANCELLED and queued.started_at is None
+    assert running.status == Job.CANCELLED
+
+
+def test_failed_job_records_error():
+    async def failing(job, on_result):
+        raise RuntimeError("boom")
+
+    async def run():
+        manager = JobManager(failing, workers=1)
+        manager.start()
+        job = manager.submit("alice", PAGES)
+        await wait_for(lambda: not job.active)
+        await manager.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == Job.FAILED and job.error == "boom"
+
+
+def test_finished_jobs_expire_after_ttl():
+    async def run():
+        release = asyncio.Event()
+        release.set()
+        manager = JobManager(blocking_runner(release), workers=1, ttl=60)
+        manager.start()
+        old = manager.submit("alice", PAGES)
+        await wait_for(lambda: not old.active)
+        old.finished_at -= 120
+        manager.submit("bob", PAGES)
+        await manager.stop()
+        return manager, old
+
+    manager, old = asyncio.run(run())
+    assert manager.get(old.id) is None
+
+
+def test_store_mirrors_jobs_for_other_workers(tmp_path):
+    store = SharedState(str(tmp_path / "state.db"))
+
+    async def run():
+        release = asyncio.Event()
+        owner = JobManager(blocking_runner(release), workers=1, max_per_user=1, store=store)
+        other = JobManager(blocking_runner(release), workers=1, max_per_user=1, store=store)
+        owner.start()
+        job = owner.submit("alice", PAGES)
+        await wait_for(lambda: job.status == Job.RUNNING)
+        await asyncio.to_thread(store.flush)
+
+        # the limit counts jobs held by other workers
+        with pytest.raises(JobLimitExceeded):
+            other.submit("alice", PAGES)
+        seen = other.get(job.id, user="alice")
+        assert seen.status == Job.RUNNING and other.get(job.id, user="bob") is None
+
+        release.set()
+        await wait_for(lambda: not job.active)
+        await owner.stop()
+        return other.get(job.id)
+
+    seen = asyncio.run(run())
+    assert seen.status == Job.DONE
+    assert [r["page_id"] for r in seen.to_dict()["results"]] == [2, 1]
@@ -0,0 +1,97 @@
+"""
+MCPSessionPool queueing with in-process fake sessions: results are returned, a
+caller that gets no session within acquire_timeout fails with Overloaded (and its
+call is never run), and a session whose caller gave up is not reused.
+"""
+
+import asyncio
+
+import pytest
+
+from admission import Overloaded
+from tool.mcp_client import MCPSessionPool
+
+
+class FakeSession:
+    def __init__(self, index, gate):
+        self.index = index
+        self.gate = gate
+        self.calls = []
+
+    async def call_tool(self, name, arguments=None, progress_callback=None):
+        self.calls.append(arguments["n"])
+        await self.gate.wait()
+        return (self.index, arguments["n"])
+
+
+class FakePool(MCPSessionPool):
+    """Sessions are in-process objects instead of MCP server subprocesses."""
+
+    def __init__(self, **kwargs):
+        super().__init__(server_params=None, **kwargs)
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.sessions = []
+
+    async def _session_worker(self, index):
+        while True:
+            session = FakeSession(len(self.sessions), self.gate)
+            self.sessions.append(session)
+            await self._serve(session)
+            self.stats["restarts"] += 1
+
+
+def test_calls_return_session_results():
+    async def run():
+        pool = FakePool(size=2)
+        try:
+            return await asyncio.gather(*(pool.call_tool("t", {"n": n}) for n in range(4))), pool
+        finally:
+            await pool.close()
+
+    results, pool = asyncio.run(run())
+    assert [n for _, n in results] == [0, 1, 2, 3]
+    assert pool.stats["calls"] == 4 and pool.stats["restarts"] == 0
+
+
+def test_acquire_timeout_raises_overloaded_and_skips_the_call():
+    async def run():
+        pool = FakePool(size=1, acquire_timeout=0.05)
+        pool.gate.clear()
+        busy = asyncio.create_task(pool.call_tool("t", {"n": 1}))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(Overloaded):
+            await pool.call_tool("t", {"n": 2})
+
+        pool.gate.set()
+        first = await busy
+        after = await pool.call_tool("t", {"n": 3})
+        await pool.close()
+        return pool, first, after
+
+    pool, first, after = asyncio.run(run())
+    assert first == (0, 1) and after == (0, 3)
+    assert pool.sessions[0].calls == [1, 3]
+    assert pool.stats["acquire_timeouts"] == 1
+
+
+def test_abandoned_call_restarts_the_session():
+    async def run():
+        pool = FakePool(size=1)
+        pool.gate.clear()
+        call = asyncio.create_task(pool.call_tool("t", {"n": 1}))
+        await asyncio.sleep(0.01)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+
+        pool.gate.set()
+        result = await pool.call_tool("t", {"n": 2})
+        await pool.close()
+        return pool, result
+
+    pool, result = asyncio.run(run())
+    # the next call ran on a fresh session, not the one still busy with the abandoned call
+    assert result == (1, 2)
+    assert pool.stats["abandoned"] == 1 and pool.stats["restarts"] == 1
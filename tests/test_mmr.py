@@ -0,0 +1,75 @@
+"""
+Dense-only retrieval + MMR ordering with fixed vectors.
+
+ChromaDB's "ip" space returns distances (1 - dot product), so the retriever must
+turn them back into similarities before MMR uses them as relevance.
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+# rag_voyage imports the vector store and API clients at module level
+pytest.importorskip("chromadb")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("dotenv")
+
+from rag_voyage import VoyageRetriever
+
+QUERY = [1.0, 0.0, 0.0]
+
+# a and a_dup are near-duplicates (a _left/_right spread); b is relevant but different
+VECTORS = {
+    "a": [0.96, 0.28, 0.0],
+    "a_dup": [0.95, 0.312, 0.0],
+    "b": [0.8, 0.0, 0.6],
+    "c": [0.0, 1.0, 0.0],
+}
+
+
+class FakeCollection:
+    """Answers like a ChromaDB collection in "ip" space: ids best first, distances = 1 - dot."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def query(self, query_embeddings, n_results, where=None):
+        query = np.asarray(query_embeddings[0])
+        sims = {doc_id: float(np.dot(query, vec)) for doc_id, vec in self.vectors.items()}
+        ids = sorted(sims, key=sims.get, reverse=True)[:n_results]
+        return {"ids": [ids], "distances": [[1.0 - sims[doc_id] for doc_id in ids]]}
+
+
+def make_retriever(in_memory: bool) -> VoyageRetriever:
+    retriever = VoyageRetriever.__new__(VoyageRetriever)
+    retriever.doc_ids = list(VECTORS)
+    retriever.doc_map = {
+        doc_id: {"image_id": doc_id, "category": "Travel", "type": "Layout", "mood": "Calm", "description": doc_id}
+        for doc_id in VECTORS
+    }
+    retriever.embeddings = np.asarray(list(VECTORS.values()), dtype=np.float32)
+    retriever.collection = None if in_memory else FakeCollection(VECTORS)
+    retriever._usage = threading.Condition()
+    retriever._active_queries = 0
+    retriever._retired = False
+    retriever._build_lexical_index()
+    return retriever
+
+
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_dense_only_ranks_by_similarity(in_memory):
+    retriever = make_retriever(in_memory)
+    results = retriever._search_by_embedding(QUERY, top_k=3, hybrid=False, mmr_lambda=1.0)
+
+    assert [r["image_id"] for r in results] == ["a", "a_dup", "b"]
+    assert results[0]["similarity_score"] == pytest.approx(0.96)
+    assert results[2]["similarity_score"] == pytest.approx(0.8)
+
+
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_mmr_keeps_most_relevant_first_and_skips_near_duplicate(in_memory):
+    retriever = make_retriever(in_memory)
+    results = retriever._search_by_embedding(QUERY, top_k=2, hybrid=False, mmr_lambda=0.5)
+
+    assert [r["image_id"] for r in results] == ["a", "b"]
@@ -0,0 +1,68 @@
+"""
+A layout tool that fails on the MCP server must fail the page, not come back as an
+"ok" page whose HTML is an error notice.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+# pipeline imports rag_voyage, which imports the vector store and API clients at module level
+pytest.importorskip("chromadb")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("dotenv")
+
+import pipeline
+import rag_voyage
+import tool.mcp_client as mcp_module
+from admission import CircuitBreaker
+
+
+class FailingPool:
+    """Session pool whose tool call returns what FastMCP sends for a raised exception."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def usable(self) -> bool:
+        return True
+
+    async def call_tool(self, name, arguments, progress_callback=None):
+        self.calls += 1
+        return SimpleNamespace(
+            isError=True,
+            content=[SimpleNamespace(type="text", text="Error executing tool generate_magazine_layout: boom")]
+        )
+
+
+class FakeRetriever:
+    async def asearch(self, query, filters=None, top_k=3):
+        return [{"image_id": "ref"}]
+
+    def get_layout(self, doc_id):
+        return {"image_id": doc_id, "elements": []}
+
+
+async def fake_analysis(images, title, body):
+    return {"mood": "Calm", "category": "Travel", "type": "Article", "description": "", "visual_keywords": []}
+
+
+def test_tool_error_fails_the_page(monkeypatch):
+    analyzer = rag_voyage.GeminiAnalyzer.__new__(rag_voyage.GeminiAnalyzer)
+    monkeypatch.setattr(analyzer, "aanalyze_page", fake_analysis, raising=False)
+    monkeypatch.setattr(rag_voyage, "analyzer", analyzer)
+    monkeypatch.setattr(rag_voyage, "retriever", FakeRetriever())
+
+    pool = FailingPool()
+    breaker = CircuitBreaker("mcp-test", failure_threshold=5)
+    monkeypatch.setattr(mcp_module, "MCP_AVAILABLE", True)
+    monkeypatch.setattr(mcp_module, "mcp_breaker", breaker)
+    monkeypatch.setattr(mcp_module.mcp_client, "pool", pool)
+
+    results = asyncio.run(pipeline.render_pages([{"id": 1, "title": "T", "body": "B"}], []))
+
+    assert pool.calls == 1
+    assert results[0]["status"] == "error"
+    assert "boom" in results[0]["error"]
+    assert breaker.stats["failures"] == 1
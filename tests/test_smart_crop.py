@@ -0,0 +1,51 @@
+"""
+Saliency crop: the crop window keeps the detailed region, falls back to a centre
+crop on flat images, and the focal point follows the detail.
+"""
+
+import numpy as np
+from PIL import Image
+
+from image_validator import ImageValidator
+
+
+def detail_at_right(size=(400, 200)):
+    """Flat grey canvas with a checkerboard patch near the right edge."""
+    pixels = np.full((size[1], size[0], 3), 128, dtype=np.uint8)
+    yy, xx = np.mgrid[0:size[1], 0:size[0]]
+    patch = (xx >= 320) & (xx < 390) & (yy >= 60) & (yy < 140)
+    checker = ((xx // 5 + yy // 5) % 2).astype(bool)
+    pixels[patch & checker] = 255
+    pixels[patch & ~checker] = 0
+    return Image.fromarray(pixels, "RGB")
+
+
+def test_crop_window_follows_detail():
+    validator = ImageValidator()
+    image = detail_at_right()
+
+    left, top = validator._best_crop_offset(image, 200, 200)
+    assert left >= 190 and top == 0
+
+    cropped = validator.fit_to_slot(image, 100, 100, mode="smart_crop")
+    assert cropped.size == (100, 100)
+    # the checkerboard survives the crop (a centre crop would be flat grey)
+    assert np.asarray(cropped.convert("L")).std() > 20
+    centre = validator.fit_to_slot(image, 100, 100, mode="cover")
+    assert np.asarray(centre.convert("L")).std() < 5
+
+
+def test_flat_image_crops_centre():
+    validator = ImageValidator()
+    flat = Image.new("RGB", (400, 200), (90, 90, 90))
+
+    assert validator._best_crop_offset(flat, 200, 200) == (100, 0)
+    assert validator._best_crop_offset(flat, 400, 200) == (0, 0)
+
+
+def test_focal_point():
+    validator = ImageValidator()
+
+    fx, fy = validator.compute_focal_point(detail_at_right())
+    assert fx > 0.75 and 0.35 < fy < 0.65
+    assert validator.compute_focal_point(Image.new("RGB", (100, 100), (0, 0, 0))) == (0.5, 0.5)
@@ -6,7 +6,10 @@ Google Nano Banana (External Service)와의 통신을 담당합니다.
 import asyncio
 import os
 import json
-from typing import List, Union
+from typing import List, Union, Optional, Dict, Any, Callable
+
+from admission import mcp_bucket, mcp_breaker, CircuitOpen, Overloaded
+from metrics import track_external
 
 try:
     from mcp import ClientSession, StdioServerParameters
@@ -14,7 +17,151 @@ try:
     MCP_AVAILABLE = True
 except ImportError:
     MCP_AVAILABLE = False
+
+
+class LayoutGenerationError(Exception):
+    """MCP 레이아웃 생성 실패 (서버/세션 오류 또는 서버가 오류 결과를 반환)"""
+
+    
+class MCPSessionPool:
+    """
+    상주 MCP 세션 풀
+    
+    호출마다 mcp_server.py 서브프로세스를 띄우는 대신 size개의 세션을 유지하고
+    요청을 큐로 분배합니다. 동시 MCP 호출(= 서브프로세스) 수가 size로 제한됩니다.
+    각 세션은 전용 태스크에서 열고 닫으며 (stdio_client 컨텍스트는 같은 태스크에서 종료되어야 함),
+    오류/타임아웃이 난 세션은 재시작합니다.
+    세션을 acquire_timeout초 안에 얻지 못하면 Overloaded로 실패하고, 호출자가 취소/포기한
+    호출의 세션은 서버가 아직 도구를 실행 중일 수 있으므로 재사용하지 않고 재시작합니다.
+    """
+    
+    def __init__(self, server_params, size: int = 2, call_timeout: float = 300.0, acquire_timeout: float = 120.0):
+        self.server_params = server_params
+        self.size = size
+        self.call_timeout = call_timeout
+        self.acquire_timeout = acquire_timeout
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.warm = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.stats = {"calls": 0, "errors": 0, "timeouts": 0, "restarts": 0,
+                      "acquire_timeouts": 0, "abandoned": 0}
+    
+    def start(self):
+        """현재 이벤트 루프에서 세션 태스크 시작 (이미 시작했으면 무시)"""
+        if self._workers:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._session_worker(i)) for i in range(self.size)]
+    
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.loop = None
+    
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue else 0
     
+    def usable(self) -> bool:
+        """현재 루프에서 사용할 수 있는지 (다른 루프 = 스레드별 asyncio.run에서는 사용 불가)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return self.loop is None or self.loop is loop
+    
+    async def call_tool(self, name: str, arguments: Dict[str, Any], progress_callback=None):
+        """
+        Raises:
+            Overloaded: acquire_timeout초 안에 세션이 배정되지 않음
+        """
+        self.start()
+        started = self.loop.create_future()  # 세션이 호출을 꺼내면 완료
+        future = self.loop.create_future()
+        await self._queue.put((name, arguments, progress_callback, started, future))
+        try:
+            await asyncio.wait_for(asyncio.shield(started), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # 세션이 꺼내도 건너뜀
+            self.stats["acquire_timeouts"] += 1
+            raise Overloaded(f"No MCP session free after {self.acquire_timeout:g}s",
+                             retry_after=self.acquire_timeout)
+        except BaseException:
+            future.cancel()
+            raise
+        return await future  # 여기서 취소되면 future도 취소됨 → 세션이 호출을 버리고 재시작
+    
+    async def _session_worker(self, index: int):
+        backoff = 1.0
+        while True:
+            try:
+                async with stdio_client(self.server_params) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        self.warm += 1
+                        backoff = 1.0
+                        print(f"🔌 [MCP Pool] Session {index} ready")
+                        try:
+                            await self._serve(session)
+                        finally:
+                            self.warm -= 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [MCP Pool] Session {index} error: {e}")
+            # 세션 종료/오류 → 재시작
+            self.stats["restarts"] += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+    
+    async def _serve(self, session):
+        while True:
+            name, arguments, progress_callback, started, future = await self._queue.get()
+            if future.cancelled():
+                continue
+            if not started.done():
+                started.set_result(None)
+            self.stats["calls"] += 1
+            call = asyncio.ensure_future(asyncio.wait_for(
+                session.call_tool(name, arguments=arguments, progress_callback=progress_callback),
+                timeout=self.call_timeout
+            ))
+            try:
+                await asyncio.wait({call, future}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not call.done():
+                    call.cancel()
+                    await asyncio.gather(call, return_exceptions=True)
+            if future.cancelled():
+                # 호출자가 취소/포기: 서버가 아직 도구를 실행 중일 수 있으므로 세션을 버림
+                self.stats["abandoned"] += 1
+                return
+            try:
+                result = call.result()
+            except asyncio.TimeoutError as e:
+                # 응답이 밀린 세션은 재사용하지 않음
+                self.stats["timeouts"] += 1
+                if not future.done():
+                    future.set_exception(e)
+                return
+            except Exception as e:
+                self.stats["errors"] += 1
+                if not future.done():
+                    future.set_exception(e)
+                return
+            if not future.done():
+                future.set_result(result)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats.update(size=self.size, warm=self.warm, queued=self.queued)
+        return stats
+
+
 class AURAClient:
     def __init__(self):
         # Resolve absolute path to mcp_server.py
@@ -23,6 +170,21 @@ class AURAClient:
         default_server = os.path.join(os.path.dirname(script_dir), "mcp_server.py")
         self.server_script = os.getenv("MCP_SERVER_SCRIPT", default_server) 
         self.is_connected = False
+        self.call_timeout = 300.0  # 300초 타임아웃 (LLM Judge + retry loop 대응)
+        # MCP_POOL_SIZE > 0: 상주 세션 풀 사용 (동시 서브프로세스 수 제한), 0: 호출마다 서브프로세스
+        pool_size = int(os.getenv("MCP_POOL_SIZE", "2"))
+        self.pool = None
+        if MCP_AVAILABLE and pool_size > 0:
+            # MCP_ACQUIRE_TIMEOUT: 세션 배정 대기 한도 (초과 시 Overloaded)
+            self.pool = MCPSessionPool(self._server_params(), size=pool_size, call_timeout=self.call_timeout,
+                                       acquire_timeout=float(os.getenv("MCP_ACQUIRE_TIMEOUT", "120")))
+    
+    def _server_params(self):
+        return StdioServerParameters(
+            command="python",
+            args=[self.server_script], 
+            env=os.environ.copy()
+        )
 
     async def generate_layout(self, 
                               headline: str, 
@@ -31,54 +193,99 @@ class AURAClient:
                               layout_override: str,
                               vision_json: str,
                               design_json: str,
-                              plan_json: str) -> str:
+                              plan_json: str,
+                              on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+        """
+        on_event: 서버의 progress 알림(노드 시작/종료, 재시도)을 dict 이벤트로 받는 콜백
+        
+        실패는 HTML이 아니라 예외로 알립니다 (호출자가 페이지 상태를 error/timeout으로 표시):
+        - CircuitOpen: MCP 회로가 열려 있음
+        - asyncio.TimeoutError: call_timeout 초과
+        - Overloaded: 세션 풀에서 세션을 얻지 못함 (MCP_ACQUIRE_TIMEOUT)
+        - LayoutGenerationError: 그 밖의 MCP 오류
+        """
         
         if not MCP_AVAILABLE:
             return self._mock_generation(headline, layout_override)
 
-        server_params = StdioServerParameters(
-            command="python",
-            args=[self.server_script], 
-            env=os.environ.copy()
-        )
-
+        arguments = {
+            "headline": headline,
+            "body": body,
+            "image_data": json.dumps(image_data) if isinstance(image_data, list) else image_data,
+            "layout_override": layout_override,
+            "vision_context": vision_json,
+            "design_spec": design_json,
+            "planner_intent": plan_json
+        }
+        
+        progress_callback = None
+        if on_event is not None:
+            async def progress_callback(progress: float, total: Optional[float], message: Optional[str]):
+                on_event(self._progress_event(message))
+        
+        # 회로가 열려 있으면 토큰을 쓰지 않고 바로 실패
+        if mcp_breaker.state == mcp_breaker.OPEN:
+            print("⛔ [AURA Client] MCP circuit open, skipping call")
+            raise CircuitOpen("mcp circuit is open", retry_after=mcp_breaker.reset_timeout)
+        
+        # 업스트림 호출 속도 제한 (MCP 호출 1회 = 서버 내부 Gemini 호출 여러 번)
+        await mcp_bucket.acquire()
+        
         try:
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    
-                    # Tool 실행 (with Timeout)
-                    try:
-                        result = await asyncio.wait_for(
-                            session.call_tool(
-                                "generate_magazine_layout",
-                                arguments={
-                                    "headline": headline,
-                                    "body": body,
-                                    "image_data": json.dumps(image_data) if isinstance(image_data, list) else image_data,
-                                    "layout_override": layout_override,
-                                    "vision_context": vision_json,
-                                    "design_spec": design_json,
-                                    "planner_intent": plan_json
-                                }
-                            ),
-                            timeout=300.0 # 300초 타임아웃 (LLM Judge + retry loop 대응)
-                        )
-                    except asyncio.TimeoutError:
-                        print("❌ [AURA Client] Timeout detected!")
-                        return "<div>Layout generation timed out. Please try again.</div>"
-                    
-                    final_html = ""
-                    for content in result.content:
-                        if content.type == 'text':
-                            final_html += content.text
-                            
-                    return final_html
+            if self.pool is not None and self.pool.usable():
+                with mcp_breaker.guard(), track_external("mcp_call"):
+                    result = await self.pool.call_tool("generate_magazine_layout", arguments, progress_callback)
+                    return self._result_text(result)
+
+            with mcp_breaker.guard():
+                async with stdio_client(self._server_params()) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        
+                        # Tool 실행 (with Timeout)
+                        with track_external("mcp_call"):
+                            result = await asyncio.wait_for(
+                                session.call_tool(
+                                    "generate_magazine_layout",
+                                    arguments=arguments,
+                                    progress_callback=progress_callback
+                                ),
+                                timeout=self.call_timeout
+                            )
+                            return self._result_text(result)
                     
+        except CircuitOpen:
+            print("⛔ [AURA Client] MCP circuit open, skipping call")
+            raise
+        except asyncio.TimeoutError:
+            print("❌ [AURA Client] Timeout detected!")
+            raise asyncio.TimeoutError(f"Layout generation timed out after {self.call_timeout:g}s")
+        except (LayoutGenerationError, Overloaded):
+            raise
         except Exception as e:
             print(f"❌ [AURA Client] Error: {e}")
             print(f"   Server script path: {self.server_script}")
-            return f"<div style='color:red'>MCP Error: {e}</div>"
+            raise LayoutGenerationError(f"MCP Error: {e}") from e
+
+    def _progress_event(self, message: Optional[str]) -> Dict[str, Any]:
+        """progress 알림 message (mcp_server_langgraph는 JSON 이벤트를 보냄) -> 이벤트 dict"""
+        try:
+            event = json.loads(message or "")
+            if isinstance(event, dict) and "type" in event:
+                return event
+        except (TypeError, ValueError):
+            pass
+        return {"type": "progress", "message": message}
+    
+    def _result_text(self, result) -> str:
+        final_html = ""
+        for content in result.content:
+            if content.type == 'text':
+                final_html += content.text
+        if getattr(result, "isError", False):
+            # 도구 실행 실패 (서버가 오류 결과를 반환) -> 회로 차단기에도 실패로 기록됨
+            raise LayoutGenerationError(f"MCP tool error: {final_html[:500]}")
+        return final_html
 
     def _mock_generation(self, headline, layout_override):
         return f"<div>Mock: MCP Client not available. ({headline})</div>"